@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+#
+# Description:
+# Generates a directory of small MyPL programs (half of them copies of
+# others, as in a test suite) and compares running them one hw7.py
+# process at a time with mypl_batch.py on one worker and on one
+# worker per cpu (without, and then with, the AST cache: cold, so
+# only the copies are reused, and then warm).
+#
+# Usage: python3 benchmarks/bench_batch.py [programs]
+#----------------------------------------------------------------------
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, arg_parser
+
+PROGRAM = '''
+struct Node
+    var value = 0;
+    var next = nil;
+end
+
+fun int sum(node: Node)
+    var total = 0;
+    while node != nil do
+        set total = total + node.value;
+        set node = node.next;
+    end
+    return total;
+end
+
+var head = nil;
+var i = 0;
+while i < %i do
+    var node = new Node;
+    set node.value = i;
+    set node.next = head;
+    set head = node;
+    set i = i + 1;
+end
+print(itos(sum(head)) + "\\n");
+'''
+
+def make_programs(directory, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, 'p%04i.mypl' % i)
+        with open(path, 'w') as program_file:
+            program_file.write(PROGRAM % (100 + i // 2))
+        paths.append(path)
+    return paths
+
+def time_command(command, env):
+    with open(os.devnull, 'w') as devnull:
+        start = time.perf_counter()
+        subprocess.run(command, stdout=devnull, stderr=devnull, env=env)
+        return time.perf_counter() - start
+
+def main(count):
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, MYPL_CACHE_DIR=os.path.join(directory, 'cache'))
+    try:
+        paths = make_programs(directory, count)
+        hw7 = os.path.join(ROOT, 'hw7.py')
+        batch = [sys.executable, os.path.join(ROOT, 'mypl_batch.py'),
+                 os.path.join(directory, '*.mypl'), '--no-cache']
+        sequential = sum(time_command([sys.executable, hw7, '--no-cache',
+                                       path], env) for path in paths)
+        jobs = os.cpu_count() or 1
+        runs = [
+            ('hw7.py per file', sequential),
+            ('batch -j 1', time_command(batch + ['-j', '1'], env)),
+        ]
+        if jobs > 1:
+            runs.append(('batch -j %i' % jobs,
+                         time_command(batch + ['-j', str(jobs)], env)))
+        # with the cache, each worker prepares a copied program once, and
+        # then (warm) no program is prepared
+        cached = batch[:-1] + ['-j', str(jobs)]
+        runs.append(('batch cold cache', time_command(cached, env)))
+        runs.append(('batch warm cache', time_command(cached, env)))
+        print('%i programs, %i cpus' % (count, jobs))
+        print('%-18s %10s %12s %10s' % ('runner', 'time (s)', 'programs/s',
+                                        'speedup'))
+        for name, elapsed in runs:
+            print('%-18s %10.3f %12.1f %9.2fx' % (name, elapsed,
+                                                  count / elapsed,
+                                                  sequential / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    args = arg_parser('Compare running many programs with hw7.py and '
+                      'mypl_batch.py.', 'programs', 200,
+                      'programs to generate').parse_args()
+    main(args.programs)
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+#
+# Description:
+# Generates a large MyPL script (many small functions and structs) and
+# compares the startup cost of preparing it (parse, type check, resolve,
+# and purity analysis) with loading the prepared tree from the AST
+# cache, plus the one time cost of storing it.
+#
+# Usage: python3 benchmarks/bench_cache.py [functions]
+#----------------------------------------------------------------------
+import io
+import os
+import shutil
+import tempfile
+
+from common import arg_parser, best
+
+import hw7
+import mypl_cache as cache
+
+FUNCTION = '''
+struct S%(i)i
+    var x = %(i)i;
+    var y = "s%(i)i";
+end
+
+fun int f%(i)i(n: int, m: int)
+    var s = new S%(i)i;
+    var total = 0;
+    while n > 0 do
+        if n %% 2 == 0 then
+            set total = total + s.x * m;
+        elif n %% 3 == 0 then
+            set total = total - m;
+        else
+            set total = total + n;
+        end
+        set n = n - 1;
+    end
+    return total;
+end
+'''
+
+OPTIONS = (False, True, True)
+
+def make_source(functions):
+    parts = [FUNCTION % {'i': i} for i in range(functions)]
+    parts.append('var total = 0;\n')
+    parts.extend('set total = total + f%i(3, %i);\n' % (i, i)
+                 for i in range(functions))
+    return ''.join(parts)
+
+def main(functions):
+    source = make_source(functions)
+    directory = tempfile.mkdtemp()
+    try:
+        the_cache = cache.Cache(directory)
+        key = the_cache.key(source, OPTIONS)
+        prepare = best(3, lambda: hw7.prepare(io.StringIO(source)))
+        stmt_list = hw7.prepare(io.StringIO(source))
+        store = best(3, the_cache.store, key, stmt_list)
+        load = best(3, the_cache.load, key)
+        size = os.path.getsize(os.path.join(directory, key + cache.SUFFIX))
+        print('%i functions, %i lines, %.1f KB source, %.1f KB cached' %
+              (functions, source.count('\n'), len(source) / 1024,
+               size / 1024))
+        print('%-10s %10s %10s' % ('step', 'time (s)', 'speedup'))
+        print('%-10s %10.4f %9.2fx' % ('prepare', prepare, 1.0))
+        print('%-10s %10.4f %9.2fx' % ('store', store, prepare / store))
+        print('%-10s %10.4f %9.2fx' % ('load', load, prepare / load))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    args = arg_parser('Compare preparing a large program with loading it '
+                      'from the AST cache.', 'functions', 2000,
+                      'functions in the program').parse_args()
+    main(args.functions)
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures function call throughput (calls per second) of the
+# interpreter and the VM: a loop calling a small function, a loop
+# calling a function that returns from inside a nested while/if, and
+# naive recursive fib. Memoization is off so every call runs.
+#
+# Usage: python3 benchmarks/bench_calls.py [repeats]
+#----------------------------------------------------------------------
+from common import arg_parser, prepare, runner_for, timed
+
+# (name, program, number of calls it makes)
+PROGRAMS = [
+    ('loop', '''
+fun int add(x: int, y: int)
+    return x + y;
+end
+var i = 0;
+var total = 0;
+while i < 50000 do
+    set total = add(total, i);
+    set i = i + 1;
+end
+''', 50000),
+    ('nested', '''
+fun int first_over(limit: int)
+    var i = 0;
+    while true do
+        if i > limit then
+            return i;
+        end
+        set i = i + 1;
+    end
+end
+var i = 0;
+var total = 0;
+while i < 20000 do
+    set total = total + first_over(2);
+    set i = i + 1;
+end
+''', 20000),
+    ('fib', '''
+fun int fib(n: int)
+    if n < 2 then return n; end
+    return fib(n - 1) + fib(n - 2);
+end
+var x = fib(20);
+''', 21891),
+]
+
+def run_once(source, use_vm):
+    runner, program = runner_for(prepare(source), use_vm, 0)
+    return timed(runner.run, program)[0]
+
+def main(repeats):
+    print('%-8s %10s %14s %14s' % ('program', 'calls', 'interp calls/s',
+                                   'vm calls/s'))
+    for name, source, calls in PROGRAMS:
+        interp = min(run_once(source, False) for i in range(repeats))
+        on_vm = min(run_once(source, True) for i in range(repeats))
+        print('%-8s %10i %14.0f %14.0f' %
+              (name, calls, calls / interp, calls / on_vm))
+
+if __name__ == '__main__':
+    args = arg_parser('Measure function calls per second on the '
+                      'interpreter and the VM.', 'repeats', 5,
+                      'runs of each program').parse_args()
+    main(args.repeats)
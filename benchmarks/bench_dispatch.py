@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+#
+# Description:
+# Times a MyPL loop made of operators, comparisons, and built-in calls,
+# the work that goes through operator and built-in dispatch.
+#
+# Usage: python3 benchmarks/bench_dispatch.py [iterations] [--vm]
+#----------------------------------------------------------------------
+from common import arg_parser, parse, runner_for, timed
+
+PROGRAM = '''
+var i = 0;
+var total = 0;
+var s = "";
+while i < %d do
+    set total = total + i %% 7;
+    set total = total - i * 2;
+    set total = total + i / 4;
+    if i >= 10 and i != 20 or i <= 3 then
+        set s = itos(i) + ftos(itof(i));
+        set total = total + length(s) + stoi(get(0, s));
+    end
+    set i = i + 1;
+end
+'''
+
+def main(iterations, use_vm):
+    runner, program = runner_for(parse(PROGRAM % iterations), use_vm)
+    elapsed = timed(runner.run, program)[0]
+    print('%d iterations in %.2f s (%.0f iterations/s, %s)' %
+          (iterations, elapsed, iterations / elapsed,
+           'vm' if use_vm else 'interpreter'))
+
+if __name__ == '__main__':
+    args = arg_parser('Time a loop of mixed operators and built-in '
+                      'calls.', 'iterations', 10**5, 'iterations of the loop',
+                      use_vm=True).parse_args()
+    main(args.iterations, args.vm)
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+#
+# Description:
+# Allocates a new struct on every iteration of a long MyPL loop and
+# reports peak memory and heap statistics. Only one instance is live
+# at a time, so memory should stay flat however long the loop runs.
+#
+# Usage: python3 benchmarks/bench_heap.py [iterations] [--vm]
+#----------------------------------------------------------------------
+from common import arg_parser, parse, peak_rss_kb, runner_for, timed
+
+PROGRAM = '''
+struct S1
+    var x = 0;
+    var y = 1;
+end
+
+struct Node
+    var val = 0;
+    var next: Node = nil;
+end
+
+var i = 0;
+var s1 = new S1;
+while i < %d do
+    set s1 = new S1;
+    set s1.x = i;
+    # a two node cycle that only a collection can reclaim
+    if i %% 100 == 0 then
+        var a = new Node;
+        set a.next = new Node;
+        set a.next.next = a;
+    end
+    set i = i + 1;
+end
+'''
+
+def main(iterations, use_vm):
+    runner, program = runner_for(parse(PROGRAM % iterations), use_vm)
+    rss_before = peak_rss_kb()
+    elapsed = timed(runner.run, program)[0]
+    print('iterations:      %d (%s)' % (iterations, 'vm' if use_vm else
+                                        'interpreter'))
+    print('time:            %.2f s' % elapsed)
+    print('peak rss before: %d KB' % rss_before)
+    print('peak rss after:  %d KB' % peak_rss_kb())
+    print(runner.heap, end='')
+
+if __name__ == '__main__':
+    args = arg_parser('Time struct allocation and report heap '
+                      'statistics.', 'iterations', 10**6,
+                      'iterations of the loop', use_vm=True).parse_args()
+    main(args.iterations, args.vm)
@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+#
+# Description:
+# Generates a large input file of numbered lines and measures how fast
+# MyPL programs read it: from stdin with reads (the old input() per
+# value, registered in place of the built-in, against the buffered
+# Input), line by line from the file with fopen/freadl (memory mapped
+# and through a file buffer), and whole with fread.
+#
+# Usage: python3 benchmarks/bench_input.py [megabytes] [--vm]
+#----------------------------------------------------------------------
+import os
+import sys
+import tempfile
+
+from common import arg_parser, prepare, runner_for, timed
+
+import mypl_token as token
+import mypl_builtins as built_ins
+
+# reads a fixed number of lines (the old reads fails at the end)
+READS = '''
+var i = 0;
+var n = 0;
+while i < %i do
+    set n = n + length(reads());
+    set i = i + 1;
+end
+'''
+
+FREADL = '''
+var f = fopen("%s");
+var n = 0;
+var line = freadl(f);
+while line != nil do
+    set n = n + length(line);
+    set line = freadl(f);
+end
+fclose(f);
+'''
+
+FREAD = '''
+var n = length(fread("%s"));
+'''
+
+def make_input(path, megabytes):
+    # returns the number of lines written
+    line = 'record %08i,some,comma,separated,fields,0.25\n'
+    count = megabytes * (1 << 20) // len(line % 0)
+    with open(path, 'w') as out:
+        for start in range(0, count, 10000):
+            out.write(''.join(line % i
+                              for i in range(start, min(start + 10000, count))))
+    return count
+
+def run_once(source, use_vm, stdin_path=None):
+    runner, program = runner_for(prepare(source), use_vm, 0)
+    stdin = sys.stdin
+    if stdin_path is not None:
+        sys.stdin = open(stdin_path)
+    try:
+        return timed(runner.run, program)[0]
+    finally:
+        if stdin_path is not None:
+            sys.stdin.close()
+            sys.stdin = stdin
+
+def legacy_reads(use_vm, source, path):
+    built_ins.register('reads', input, [], token.STRINGTYPE)
+    try:
+        return run_once(source, use_vm, path)
+    finally:
+        built_ins.register('reads', built_ins._read_string, [],
+                           token.STRINGTYPE, may_return_nil=True)
+
+def unmapped(use_vm, source):
+    threshold = built_ins.MMAP_THRESHOLD
+    built_ins.MMAP_THRESHOLD = float('inf')
+    try:
+        return run_once(source, use_vm)
+    finally:
+        built_ins.MMAP_THRESHOLD = threshold
+
+def main(megabytes, use_vm):
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        lines = make_input(path, megabytes)
+        size = os.path.getsize(path) / (1 << 20)
+        reads = READS % lines
+        runs = [
+            ('reads input()', lambda: legacy_reads(use_vm, reads, path)),
+            ('reads Input', lambda: run_once(reads, use_vm, path)),
+            ('freadl buffer', lambda: unmapped(use_vm, FREADL % path)),
+            ('freadl mmap', lambda: run_once(FREADL % path, use_vm)),
+            ('fread', lambda: run_once(FREAD % path, use_vm)),
+        ]
+        print('%i lines, %.1f MB' % (lines, size))
+        print('%-16s %10s %14s %10s' % ('read', 'time (s)', 'lines/s',
+                                        'MB/s'))
+        for name, run in runs:
+            elapsed = run()
+            print('%-16s %10.3f %14.0f %10.1f' % (name, elapsed,
+                                                  lines / elapsed,
+                                                  size / elapsed))
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    args = arg_parser('Time reading a large input with reads, freadl, '
+                      'and fread.', 'megabytes', 20, 'size of the input',
+                      use_vm=True).parse_args()
+    main(args.megabytes, args.vm)
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+#
+# Description:
+# Compares the tokens per second of the character-peeking Lexer and the
+# BufferedLexer on a generated MyPL source file, and checks that both
+# produce the same tokens.
+#
+# Usage: python3 benchmarks/bench_lexer.py [megabytes]
+#----------------------------------------------------------------------
+import tempfile
+import time
+
+from common import arg_parser
+
+import mypl_lexer as lexer
+import mypl_token as token
+
+CHUNK = '''
+# compute a running total
+fun int step_%d(x: int, y: float)
+    var s = "label %d";
+    if x >= 10 and y != 2.5 then
+        return x * 2 - (y_val + 1) %% 7;
+    end
+    return x / 3;
+end
+'''
+
+def generate(size):
+    parts = []
+    total = 0
+    i = 0
+    while total < size:
+        part = CHUNK % (i, i)
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return ''.join(parts)
+
+def lex(lexer_class, filename):
+    tokens = []
+    start = time.perf_counter()
+    with open(filename, 'r') as file_stream:
+        the_lexer = lexer_class(file_stream)
+        while True:
+            t = the_lexer.next_token()
+            tokens.append(t)
+            if t.tokentype == token.EOS:
+                break
+    return tokens, time.perf_counter() - start
+
+def main(megabytes):
+    source = generate(int(megabytes * 1024 * 1024))
+    print('source: %.1f MB' % (len(source) / 1024 / 1024))
+    with tempfile.NamedTemporaryFile('w', suffix='.txt') as source_file:
+        source_file.write(source)
+        source_file.flush()
+        stream_tokens, stream_time = lex(lexer.Lexer, source_file.name)
+        buffered_tokens, buffered_time = lex(lexer.BufferedLexer,
+                                             source_file.name)
+    same = [(t.tokentype, t.lexeme, t.line, t.column) for t in stream_tokens] == \
+           [(t.tokentype, t.lexeme, t.line, t.column) for t in buffered_tokens]
+    n = len(buffered_tokens)
+    print('tokens: %d (identical: %s)' % (n, same))
+    print('%-14s %8s %14s' % ('lexer', 'time', 'tokens/sec'))
+    print('%-14s %6.2f s %14.0f' % ('Lexer', stream_time, n / stream_time))
+    print('%-14s %6.2f s %14.0f' % ('BufferedLexer', buffered_time,
+                                    n / buffered_time))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare the streaming and buffered lexers.',
+                      'megabytes', 1, 'size of the generated source',
+                      count_type=float).parse_args()
+    main(args.megabytes)
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures variable lookup cost. Runs the fib program (hw7_t4.txt)
+# through the interpreter, and compares a name lookup through the
+# SymbolTable scope list against a resolved (depth, slot) frame access
+# at the same scope depth.
+#
+# Usage: python3 benchmarks/bench_lookup.py [repeats]
+#----------------------------------------------------------------------
+import contextlib
+import io
+import os
+import timeit
+
+from common import ROOT, arg_parser
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_resolver as resolver
+import mypl_interpreter as interpreter
+import mypl_symbol_table as symbol_table
+
+def run_fib(stmt_list):
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.Interpreter().run(stmt_list)
+
+def symbol_table_lookup(depth):
+    table = symbol_table.SymbolTable()
+    table.push_environment()
+    table.add_id('x')
+    table.set_info('x', 1)
+    for i in range(depth):
+        table.push_environment()
+        table.add_id('y%d' % i)
+    return lambda: table.get_info('x')
+
+def frame_lookup(depth):
+    frame = interpreter.Frame(1, None)
+    frame.values[0] = 1
+    for i in range(depth):
+        frame = interpreter.Frame(1, frame)
+    def lookup():
+        f = frame
+        d = depth
+        while d:
+            f = f.parent
+            d -= 1
+        return f.values[0]
+    return lookup
+
+def main(repeats):
+    with open(os.path.join(ROOT, 'hw7_t4.txt')) as file_stream:
+        stmt_list = parser.Parser(lexer.Lexer(file_stream)).parse()
+    stmt_list.accept(resolver.Resolver())
+    best = min(timeit.repeat(lambda: run_fib(stmt_list), number=1,
+                             repeat=repeats))
+    print('hw7_t4.txt (fib 0..18): %.3f s (best of %d)' % (best, repeats))
+    print()
+    print('%-6s %18s %18s' % ('depth', 'symbol table (ns)', 'frame (ns)'))
+    n = 200000
+    for depth in (0, 2, 4, 8):
+        sym = min(timeit.repeat(symbol_table_lookup(depth), number=n, repeat=3))
+        frm = min(timeit.repeat(frame_lookup(depth), number=n, repeat=3))
+        print('%-6d %18.0f %18.0f' % (depth, sym / n * 1e9, frm / n * 1e9))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare variable lookups in the symbol table and '
+                      'in frames.', 'repeats', 5,
+                      'runs of hw7_t4.txt').parse_args()
+    main(args.repeats)
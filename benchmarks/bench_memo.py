@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+#
+# Description:
+# Times calls to pure functions (a naive recursive fib and a call in a
+# loop with repeating arguments) with memoization off and with result
+# caches of a few sizes, and reports the cache hits and misses.
+#
+# Usage: python3 benchmarks/bench_memo.py [repeats] [--vm]
+#----------------------------------------------------------------------
+import contextlib
+import io
+
+from common import arg_parser, prepare, runner_for, timed
+
+import mypl_memo as memo
+
+FIB = '''
+fun int fib(n: int)
+    if n < 2 then return n; end
+    return fib(n - 1) + fib(n - 2);
+end
+print(itos(fib(20)) + "\\n");
+'''
+
+# 20000 calls with only 100 different arguments
+REPEATS = '''
+fun float poly(x: int)
+    var y = itof(x);
+    return y * y * y - 2.0 * y * y + 3.0 * y - 4.0;
+end
+var i = 0;
+var total = 0.0;
+while i < 20000 do
+    set total = total + poly(i % 100);
+    set i = i + 1;
+end
+print(ftos(total) + "\\n");
+'''
+
+SIZES = [0, 16, memo.DEFAULT_CACHE_SIZE]
+
+def run_once(source, memo_size, use_vm):
+    stmt_list = prepare(source, find_pure=memo_size > 0)
+    runner, program = runner_for(stmt_list, use_vm, memo_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = timed(runner.run, program)[0]
+    hits = sum(cache.hits for cache in runner.memo.caches.values())
+    misses = sum(cache.misses for cache in runner.memo.caches.values())
+    return elapsed, hits, misses
+
+def main(repeats, use_vm):
+    print('%-8s %8s %12s %10s %10s %10s' % ('program', 'size', 'time (s)',
+                                            'speedup', 'hits', 'misses'))
+    for name, source in [('fib', FIB), ('repeats', REPEATS)]:
+        base = None
+        for size in SIZES:
+            runs = [run_once(source, size, use_vm) for i in range(repeats)]
+            elapsed = min(run[0] for run in runs)
+            if base is None:
+                base = elapsed
+            print('%-8s %8i %12.5f %9.2fx %10i %10i' %
+                  (name, size, elapsed, base / elapsed, runs[0][1],
+                   runs[0][2]))
+
+if __name__ == '__main__':
+    args = arg_parser('Time memoized calls to pure functions by cache '
+                      'size.', 'repeats', 5, 'runs of each program',
+                      use_vm=True).parse_args()
+    main(args.repeats, args.vm)
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures the allocation rate of new (instances per second) for a
+# struct whose fields are all constants and for one that also has a
+# field initializer that reads an outer variable.
+#
+# Usage: python3 benchmarks/bench_new.py [iterations] [--vm]
+#----------------------------------------------------------------------
+from common import arg_parser, parse, runner_for, timed
+
+PROGRAM = '''
+var a = 0;
+
+struct Const
+    var x = 0;
+    var y = 1.5;
+    var name = "point";
+    var ok = true;
+    var next: Const = nil;
+end
+
+struct Mixed
+    var x = 0;
+    var y = a + 1;
+    var name = "point";
+    var ok = true;
+    var next: Mixed = nil;
+end
+
+var i = 0;
+var s = new %s;
+while i < %d do
+    set s = new %s;
+    set i = i + 1;
+end
+'''
+
+def allocation_rate(struct_name, iterations, use_vm):
+    source = PROGRAM % (struct_name, iterations, struct_name)
+    runner, program = runner_for(parse(source), use_vm)
+    return iterations / timed(runner.run, program)[0]
+
+def main(iterations, use_vm):
+    print('%d iterations (%s)' % (iterations, 'vm' if use_vm else
+                                  'interpreter'))
+    for struct_name in ('Const', 'Mixed'):
+        rate = allocation_rate(struct_name, iterations, use_vm)
+        print('%-6s %10.0f new/s' % (struct_name, rate))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare the allocation rates of structs with '
+                      'constant and computed fields.', 'iterations', 2 * 10**5,
+                      'allocations of each struct', use_vm=True).parse_args()
+    main(args.iterations, args.vm)
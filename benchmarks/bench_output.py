@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures printed lines per second. The old print (which replaced \n
+# escapes and called python's print on every call) is registered in
+# place of the built-in for comparison with the Output sink at a few
+# buffer sizes. Output goes to /dev/null, opened block buffered (as
+# python's stdout is for a file or pipe) and line buffered (as it is
+# for a terminal).
+#
+# Usage: python3 benchmarks/bench_output.py [repeats] [--vm]
+#----------------------------------------------------------------------
+import contextlib
+import os
+
+from common import arg_parser, prepare, runner_for, timed
+
+import mypl_token as token
+import mypl_builtins as built_ins
+
+LINES = 100000
+
+PROGRAM = '''
+var i = 0;
+while i < %i do
+    print("line\\n");
+    set i = i + 1;
+end
+''' % LINES
+
+SIZES = [0, 4096, built_ins.DEFAULT_BUFFER_SIZE]
+
+def legacy_print(s):
+    # print before the Output sink (escapes were decoded on every call)
+    print(s.replace(r'\n', '\n'), end='')
+
+def run_once(use_vm, buffer_size, legacy, line_buffered):
+    if legacy:
+        built_ins.register('print', legacy_print, [token.STRINGTYPE],
+                           token.NIL, ropes=True)
+    stmt_list = prepare(PROGRAM)
+    with open(os.devnull, 'w', buffering=1 if line_buffered else -1) \
+         as devnull:
+        output = built_ins.Output(devnull, buffer_size)
+        runner, program = runner_for(stmt_list, use_vm, 0, output)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                elapsed = timed(runner.run, program)[0]
+        finally:
+            if legacy:
+                built_ins.register('print', built_ins._print,
+                                   [token.STRINGTYPE], token.NIL, ropes=True)
+    return elapsed
+
+def main(repeats, use_vm):
+    print('%-8s %-16s %12s %14s %10s' % ('stream', 'print', 'time (s)',
+                                         'lines/s', 'speedup'))
+    for line_buffered in [False, True]:
+        stream = 'line' if line_buffered else 'block'
+        legacy = min(run_once(use_vm, 0, True, line_buffered)
+                     for i in range(repeats))
+        print('%-8s %-16s %12.5f %14.0f %9.2fx' %
+              (stream, 'legacy', legacy, LINES / legacy, 1.0))
+        for size in SIZES:
+            elapsed = min(run_once(use_vm, size, False, line_buffered)
+                          for i in range(repeats))
+            print('%-8s %-16s %12.5f %14.0f %9.2fx' %
+                  (stream, 'buffer %i' % size, elapsed, LINES / elapsed,
+                   legacy / elapsed))
+
+if __name__ == '__main__':
+    args = arg_parser('Time printing with and without an output buffer.',
+                      'repeats', 5, 'runs of each configuration',
+                      use_vm=True).parse_args()
+    main(args.repeats, args.vm)
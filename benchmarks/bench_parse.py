@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+#
+# Description:
+# Parses generated MyPL programs of 10^3 up to 10^max statements (plus
+# one long operator chain) and reports the parse time and peak memory
+# for each size. Each size is parsed in a fresh python process so the
+# peak memory of one size doesn't hide the next.
+#
+# Usage: python3 benchmarks/bench_parse.py [max_exponent]
+#----------------------------------------------------------------------
+import argparse
+import subprocess
+import sys
+
+from common import arg_parser, parse, peak_rss_kb, timed
+
+STMTS = [
+    'var x%d = %d;\n',
+    'set x = x + %d * 2 - y;\n',
+    'if x < %d then set y = y + 1; elif x > 2 then set y = 0; end\n',
+    'print(itos(%d) + "\\n");\n',
+]
+
+def program(num_stmts):
+    lines = []
+    for i in range(num_stmts):
+        stmt = STMTS[i % len(STMTS)]
+        lines.append(stmt % ((i, i) if stmt.count('%d') == 2 else i))
+    # an operator chain as long as the program
+    chain = ' + '.join(['"s"'] * min(num_stmts, 10**4))
+    lines.append('var s = %s;\n' % chain)
+    return ''.join(lines)
+
+def parse_one(num_stmts):
+    source = program(num_stmts)
+    rss_before = peak_rss_kb()
+    elapsed = timed(parse, source)[0]
+    rss_after = peak_rss_kb()
+    print('%10d  %8.2f  %12d  %12d' % (num_stmts, elapsed, rss_before,
+                                       rss_after))
+
+def main(max_exponent):
+    print('statements  time (s)  rss before KB  peak rss KB')
+    for exponent in range(3, max_exponent + 1):
+        subprocess.run([sys.executable, __file__, '--one',
+                        str(10**exponent)], check=True)
+
+if __name__ == '__main__':
+    the_parser = arg_parser('Time parsing programs of 10**3 up to '
+                            '10**max_exponent statements.', 'max_exponent',
+                            6, 'the largest program')
+    # parse one program of N statements (each size runs in a new process)
+    the_parser.add_argument('--one', type=int, metavar='N',
+                            help=argparse.SUPPRESS)
+    args = the_parser.parse_args()
+    if args.one is not None:
+        parse_one(args.one)
+    else:
+        main(args.max_exponent)
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures the overhead of the deterministic profiler: the run time of
+# each program on the ProfilingInterpreter over its time on the plain
+# interpreter (recursive calls, a statement heavy loop, struct
+# allocation, and built-in calls). Memoization is off so every call
+# runs.
+#
+# Usage: python3 benchmarks/bench_profile.py [repeats]
+#----------------------------------------------------------------------
+from common import arg_parser, prepare, runner_for, timed
+
+import mypl_profile as profiler
+
+PROGRAMS = [
+    ('fib', '''
+fun int fib(n: int)
+    if n < 2 then return n; end
+    return fib(n - 1) + fib(n - 2);
+end
+var x = fib(20);
+'''),
+    ('loop', '''
+var i = 0;
+var total = 0;
+while i < 100000 do
+    set total = total + i * 2;
+    set i = i + 1;
+end
+'''),
+    ('new', '''
+struct Node
+    var val = 0;
+    var next: Node = nil;
+end
+var i = 0;
+var head: Node = nil;
+while i < 30000 do
+    var n = new Node;
+    set n.val = i;
+    set n.next = head;
+    set head = n;
+    set i = i + 1;
+end
+'''),
+    ('built-in', '''
+var i = 0;
+var s = "";
+while i < 30000 do
+    set s = itos(i);
+    set i = i + length(s);
+end
+'''),
+]
+
+def run_once(source, profile):
+    stmt_list = prepare(source)
+    if profile:
+        runner = profiler.ProfilingInterpreter(profiler.Profile(), 0)
+    else:
+        runner = runner_for(stmt_list, False, 0)[0]
+    return timed(runner.run, stmt_list)[0]
+
+def main(repeats):
+    print('%-10s %12s %12s %9s' % ('program', 'plain (s)', 'profiled (s)',
+                                   'overhead'))
+    for name, source in PROGRAMS:
+        plain = min(run_once(source, False) for i in range(repeats))
+        profiled = min(run_once(source, True) for i in range(repeats))
+        print('%-10s %12.4f %12.4f %8.2fx' %
+              (name, plain, profiled, profiled / plain))
+
+if __name__ == '__main__':
+    args = arg_parser('Time the overhead of the profiling interpreter.',
+                      'repeats', 5, 'runs of each program').parse_args()
+    main(args.repeats)
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+#
+# Description:
+# Runs a non-tail recursive sum and a tail recursive count on the VM at
+# growing depths and reports the run time and peak memory (the frame
+# stack of the non-tail sum grows with the depth, the tail calls reuse
+# one frame). Memoization is off so every call runs.
+#
+# Usage: python3 benchmarks/bench_recursion.py [max_depth]
+#----------------------------------------------------------------------
+import tracemalloc
+
+from common import arg_parser, prepare, runner_for, timed
+
+SUM = '''
+fun int sum(n: int)
+    if n == 0 then return 0; end
+    return n + sum(n - 1);
+end
+var x = sum(%i);
+'''
+
+COUNT = '''
+fun int count(n: int, acc: int)
+    if n == 0 then return acc; end
+    return count(n - 1, acc + 1);
+end
+var x = count(%i, 0);
+'''
+
+def run_once(source):
+    # returns the run time and the peak memory (in KB) of the run
+    runner, program = runner_for(prepare(source), True, 0)
+    tracemalloc.start()
+    elapsed = timed(runner.run, program)[0]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak // 1024
+
+def main(max_depth):
+    print('%-8s %10s %10s %12s' % ('program', 'depth', 'time (s)',
+                                   'peak (KB)'))
+    depth = 1000
+    while depth <= max_depth:
+        for name, source in [('sum', SUM), ('count', COUNT)]:
+            elapsed, peak = run_once(source % depth)
+            print('%-8s %10i %10.3f %12i' % (name, depth, elapsed, peak))
+        depth *= 10
+
+if __name__ == '__main__':
+    args = arg_parser('Time deep recursion on the VM.', 'max_depth',
+                      100000, 'the deepest recursion').parse_args()
+    main(args.max_depth)
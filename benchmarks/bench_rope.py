@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+#
+# Description:
+# Builds strings one character at a time (set s = s + "x" in a loop) at
+# doubling lengths, with ropes and with ropes turned off (plain python
+# strings, which copy the whole string on every +), and reports the
+# time and characters per second. Ropes should keep the rate flat as
+# the length grows. Runs without ropes stop at 400000 characters.
+#
+# Usage: python3 benchmarks/bench_rope.py [max_length] [--vm]
+#----------------------------------------------------------------------
+from common import arg_parser, prepare, runner_for, timed
+
+import mypl_rope as rope
+
+PROGRAM = '''
+var s = "";
+var i = 0;
+while i < %i do
+    set s = s + "x";
+    set i = i + 1;
+end
+var n = length(s);
+'''
+
+# the longest string built without ropes
+MAX_PLAIN = 400000
+
+def run_once(length, use_vm, ropes):
+    source = PROGRAM % length
+    runner, program = runner_for(prepare(source), use_vm)
+    rope_min = rope.ROPE_MIN
+    if not ropes:
+        rope.ROPE_MIN = float('inf')
+    try:
+        return timed(runner.run, program)[0]
+    finally:
+        rope.ROPE_MIN = rope_min
+
+def main(max_length, use_vm):
+    print('%10s %12s %14s %12s %14s' % ('length', 'rope (s)', 'rope chars/s',
+                                        'plain (s)', 'plain chars/s'))
+    length = 100000
+    while length <= max_length:
+        with_ropes = run_once(length, use_vm, True)
+        line = '%10i %12.3f %14.0f' % (length, with_ropes,
+                                       length / with_ropes)
+        if length <= MAX_PLAIN:
+            plain = run_once(length, use_vm, False)
+            line += ' %12.3f %14.0f' % (plain, length / plain)
+        print(line)
+        length *= 2
+
+if __name__ == '__main__':
+    args = arg_parser('Time building a long string with and without '
+                      'ropes.', 'max_length', 1600000,
+                      'the longest string', use_vm=True).parse_args()
+    main(args.max_length, args.vm)
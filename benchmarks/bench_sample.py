@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures the overhead of the sampling profiler on the fib workload
+# of hw7_t4.txt (with memoization off so every call runs): the run
+# time on the interpreter with the sampler started at a few rates over
+# the run time without it, and the samples taken.
+#
+# Usage: python3 benchmarks/bench_sample.py [repeats]
+#----------------------------------------------------------------------
+import io
+import os
+import time
+
+from common import ROOT, arg_parser, prepare, runner_for
+
+import mypl_builtins as built_ins
+import mypl_profile as profiler
+
+PROGRAM = os.path.join(ROOT, 'hw7_t4.txt')
+RATES = [None, 100, 1000]
+
+def run_once(source, rate):
+    stmt_list = prepare(source)
+    runner = runner_for(stmt_list, False, 0,
+                        built_ins.Output(io.StringIO()))[0]
+    sampler = None
+    if rate is not None:
+        sampler = profiler.Sampler(runner, rate)
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        runner.run(stmt_list)
+    finally:
+        elapsed = time.perf_counter() - start
+        if sampler is not None:
+            sampler.stop()
+    return elapsed, sampler.samples if sampler is not None else 0
+
+def main(repeats):
+    with open(PROGRAM) as source_file:
+        source = source_file.read()
+    times = {rate: [] for rate in RATES}
+    samples = {rate: 0 for rate in RATES}
+    # interleave the rates so drift in the machine's speed hits each
+    for i in range(repeats):
+        for rate in RATES:
+            elapsed, taken = run_once(source, rate)
+            times[rate].append(elapsed)
+            samples[rate] += taken
+    plain = min(times[None])
+    print('%-10s %10s %10s %10s' % ('rate (hz)', 'time (s)', 'overhead',
+                                    'samples/s'))
+    for rate in RATES:
+        best = min(times[rate])
+        print('%-10s %10.4f %9.1f%% %10.0f' %
+              (rate or 'off', best, 100 * (best - plain) / plain,
+               samples[rate] / sum(times[rate])))
+
+if __name__ == '__main__':
+    args = arg_parser('Time the overhead of the sampling profiler by '
+                      'rate.', 'repeats', 10, 'runs at each rate').parse_args()
+    main(args.repeats)
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures the time to run a small MyPL program from the command line
+# with hw7.py (a new python process that imports the interpreter and
+# prepares the program on every run) against mypl_client.py talking to
+# a mypl_server started for the benchmark, and against the client
+# started with python -S (no site module, which the client doesn't
+# need).
+#
+# Usage: python3 benchmarks/bench_server.py [runs] [--vm]
+#----------------------------------------------------------------------
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, arg_parser
+
+PROGRAM = '''
+fun int fib(n: int)
+    if n < 2 then
+        return n;
+    end
+    return fib(n - 1) + fib(n - 2);
+end
+var i = 0;
+while i < 20 do
+    print(itos(fib(i)) + "\\n");
+    set i = i + 1;
+end
+'''
+
+def wait_for(path):
+    for i in range(100):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+                return
+        except OSError:
+            time.sleep(0.05)
+    sys.exit('the server did not start')
+
+def time_runs(command, runs, env):
+    with open(os.devnull, 'w') as devnull:
+        subprocess.run(command, stdout=devnull, check=True, env=env)
+        start = time.perf_counter()
+        for i in range(runs):
+            subprocess.run(command, stdout=devnull, check=True, env=env)
+        return (time.perf_counter() - start) / runs
+
+def main(runs, use_vm):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'mypl.sock')
+    program = os.path.join(directory, 'fib.mypl')
+    with open(program, 'w') as program_file:
+        program_file.write(PROGRAM)
+    env = dict(os.environ, MYPL_SOCKET=path,
+               MYPL_CACHE_DIR=os.path.join(directory, 'cache'))
+    server = subprocess.Popen([sys.executable,
+                               os.path.join(ROOT, 'mypl_server.py'),
+                               '--workers', '2'], env=env)
+    try:
+        wait_for(path)
+        args = [program] + (['--vm'] if use_vm else [])
+        commands = [
+            ('hw7.py', [sys.executable, os.path.join(ROOT, 'hw7.py')]),
+            ('mypl_client.py', [sys.executable,
+                                os.path.join(ROOT, 'mypl_client.py')]),
+            ('python -S client', [sys.executable, '-S',
+                                  os.path.join(ROOT, 'mypl_client.py')]),
+        ]
+        print('%-18s %12s %10s' % ('command', 'ms per run', 'speedup'))
+        base = None
+        for name, command in commands:
+            elapsed = time_runs(command + args, runs, env)
+            base = base or elapsed
+            print('%-18s %12.1f %9.2fx' % (name, elapsed * 1000,
+                                           base / elapsed))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    args = arg_parser('Compare starting hw7.py with running on the '
+                      'server.', 'runs', 50, 'runs of each command',
+                      use_vm=True).parse_args()
+    main(args.runs, args.vm)
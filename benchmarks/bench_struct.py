@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+#
+# Description:
+# Measures the size of a struct instance (a field list laid out by its
+# StructLayout vs. the equivalent name -> value dict) and the time of a
+# MyPL loop that reads and writes nested struct paths (s3.s2.s1.x).
+#
+# Usage: python3 benchmarks/bench_struct.py [iterations] [--vm]
+#----------------------------------------------------------------------
+import sys
+
+from common import arg_parser, parse, runner_for, timed
+
+import mypl_heap as mheap
+
+PROGRAM = '''
+struct S1
+    var x = 0;
+    var y = 0;
+    var z = 0;
+    var w = 0;
+end
+
+struct S2
+    var a = 0;
+    var s1 = new S1;
+end
+
+struct S3
+    var b = 0;
+    var s2 = new S2;
+end
+
+var s3 = new S3;
+var i = 0;
+var total = 0;
+while i < %d do
+    set s3.s2.s1.x = i;
+    set s3.s2.s1.w = s3.s2.s1.x + 1;
+    set total = total + s3.s2.s1.w;
+    set i = i + 1;
+end
+'''
+
+def instance_sizes(num_fields):
+    fields = ['f%d' % i for i in range(num_fields)]
+    as_dict = {field: 0 for field in fields}
+    heap = mheap.Heap()
+    obj = heap.allocate(mheap.StructLayout('S', fields), [0] * num_fields)
+    return sys.getsizeof(as_dict), sys.getsizeof(obj)
+
+def main(iterations, use_vm):
+    print('fields  dict bytes  struct bytes')
+    for num_fields in (1, 2, 4, 8, 16):
+        dict_size, struct_size = instance_sizes(num_fields)
+        print('%6d  %10d  %12d' % (num_fields, dict_size, struct_size))
+    runner, program = runner_for(parse(PROGRAM % iterations), use_vm)
+    elapsed = timed(runner.run, program)[0]
+    print('path loop: %d iterations in %.2f s (%s)' %
+          (iterations, elapsed, 'vm' if use_vm else 'interpreter'))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare struct sizes and time a loop over nested '
+                      'fields.', 'iterations', 10**5, 'iterations of the loop',
+                      use_vm=True).parse_args()
+    main(args.iterations, args.vm)
@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+#
+# Description:
+# The benchmark suite: times each phase of running the programs in
+# benchmarks/programs (recursion, loops, structs, and string building)
+# and a large generated source. Lexing, parsing, type checking,
+# resolving, and running are timed separately over repeated runs (the
+# parser reads a TokenBuffer lexed beforehand, so its time doesn't
+# include lexing). Results can be saved to JSON and compared with a
+# saved baseline: the exit status is 1 if the best time of any phase
+# is more than the threshold slower than the baseline's (phases faster
+# than a minimum time are too noisy to compare).
+#
+# Usage: python3 benchmarks/bench_suite.py [-r N] [--save FILE]
+#            [--baseline FILE] [--threshold PCT] [--min-time MS]
+#            [program ...]
+#----------------------------------------------------------------------
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+import mypl_resolver as resolver
+import mypl_builtins as built_ins
+import mypl_interpreter as interpreter
+
+PROGRAM_DIR = os.path.join(os.path.dirname(__file__), 'programs')
+PHASES = ['lex', 'parse', 'check', 'resolve', 'run']
+
+def generated_source(num_funs=1500):
+    # a large program: many small functions and structs, each used once
+    out = []
+    for i in range(num_funs):
+        out.append('struct S%i\n    var a = %i;\n    var b = "s%i";\nend\n'
+                   % (i, i, i))
+        out.append('fun int f%i(x: int, y: int)\n'
+                   '    var s = new S%i;\n'
+                   '    if x > y then\n'
+                   '        return x - y + s.a;\n'
+                   '    elif x == y then\n'
+                   '        return 0;\n'
+                   '    end\n'
+                   '    return (y - x) * 2 + length(s.b);\n'
+                   'end\n' % (i, i))
+    out.append('var total = 0;\n')
+    for i in range(num_funs):
+        out.append('set total = total + f%i(%i, %i);\n' % (i, i % 13, i % 7))
+    out.append('print(itos(total) + "\\n");\n')
+    return ''.join(out)
+
+def load_programs(names):
+    # name -> source of the suite's programs (or of just names)
+    programs = {}
+    for path in sorted(glob.glob(os.path.join(PROGRAM_DIR, '*.txt'))):
+        with open(path) as source_file:
+            programs[os.path.basename(path)[:-4]] = source_file.read()
+    programs['generated'] = generated_source()
+    if names:
+        unknown = [name for name in names if name not in programs]
+        if unknown:
+            sys.exit('unknown programs: %s (have %s)' %
+                     (', '.join(unknown), ', '.join(programs)))
+        programs = {name: programs[name] for name in names}
+    return programs
+
+
+def run_once(source):
+    # phase -> seconds of one run of source
+    times = {}
+    start = time.perf_counter()
+    tokens = lexer.BufferedLexer(io.StringIO(source)).tokenize()
+    times['lex'] = time.perf_counter() - start
+    start = time.perf_counter()
+    stmt_list = parser.Parser(tokens).parse()
+    times['parse'] = time.perf_counter() - start
+    start = time.perf_counter()
+    stmt_list.accept(type_checker.TypeChecker())
+    times['check'] = time.perf_counter() - start
+    start = time.perf_counter()
+    stmt_list.accept(resolver.Resolver(True))
+    times['resolve'] = time.perf_counter() - start
+    runner = interpreter.Interpreter(output=built_ins.Output(io.StringIO()))
+    start = time.perf_counter()
+    runner.run(stmt_list)
+    times['run'] = time.perf_counter() - start
+    return times
+
+def measure(programs, repeats):
+    # program -> phase -> statistics (in seconds) of repeats runs
+    results = {}
+    for name, source in programs.items():
+        runs = [run_once(source) for i in range(repeats)]
+        results[name] = {}
+        for phase in PHASES:
+            times = [run[phase] for run in runs]
+            results[name][phase] = {
+                'min': min(times),
+                'median': statistics.median(times),
+                'mean': statistics.mean(times),
+                'stdev': statistics.stdev(times) if repeats > 1 else 0.0,
+            }
+    return results
+
+def print_results(results):
+    print('%-12s %-8s %11s %11s %11s %9s' %
+          ('program', 'phase', 'min (ms)', 'median (ms)', 'mean (ms)',
+           'stdev %'))
+    for name, phases in results.items():
+        for phase in PHASES:
+            stats = phases[phase]
+            print('%-12s %-8s %11.3f %11.3f %11.3f %9.1f' %
+                  (name, phase, 1e3 * stats['min'], 1e3 * stats['median'],
+                   1e3 * stats['mean'],
+                   100 * stats['stdev'] / stats['mean']
+                   if stats['mean'] else 0.0))
+
+def compare(results, baseline, threshold, min_time):
+    # print the change in each phase's best time from the baseline, and
+    # give back the (program, phase) pairs more than threshold slower
+    # (of those taking at least min_time seconds)
+    regressions = []
+    print('\n%-12s %-8s %12s %12s %9s' %
+          ('program', 'phase', 'base (ms)', 'now (ms)', 'change'))
+    for name, phases in results.items():
+        if name not in baseline:
+            continue
+        for phase in PHASES:
+            base = baseline[name][phase]['min']
+            now = phases[phase]['min']
+            change = (now - base) / base if base else 0.0
+            flag = ''
+            if base < min_time:
+                flag = '  (too short)'
+            elif change > threshold:
+                regressions.append((name, phase))
+                flag = '  REGRESSION'
+            print('%-12s %-8s %12.3f %12.3f %+8.1f%%%s' %
+                  (name, phase, 1e3 * base, 1e3 * now, 100 * change, flag))
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Time the phases of running the benchmark programs.')
+    arg_parser.add_argument('programs', nargs='*', metavar='program',
+                            help='programs to run (default: all)')
+    arg_parser.add_argument('-r', '--repeats', type=int, default=5,
+                            help='runs of each program (default: '
+                            '%(default)s)')
+    arg_parser.add_argument('--save', metavar='FILE',
+                            help='write the results to FILE as JSON')
+    arg_parser.add_argument('--baseline', metavar='FILE',
+                            help='compare the results with the ones saved '
+                            'in FILE')
+    arg_parser.add_argument('--threshold', type=float, default=10.0,
+                            metavar='PCT',
+                            help='fail if a phase is more than PCT percent '
+                            'slower than the baseline (default: '
+                            '%(default)s)')
+    arg_parser.add_argument('--min-time', type=float, default=1.0,
+                            metavar='MS',
+                            help="don't fail on phases of the baseline "
+                            'taking under MS milliseconds (default: '
+                            '%(default)s)')
+    args = arg_parser.parse_args()
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    results = measure(load_programs(args.programs), args.repeats)
+    print_results(results)
+    if args.save is not None:
+        with open(args.save, 'w') as save_file:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'repeats': args.repeats,
+                       'results': results}, save_file, indent=2)
+            save_file.write('\n')
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold / 100,
+                              args.min_time / 1e3)
+        if regressions:
+            sys.exit('%i phases regressed by more than %g%%' %
+                     (len(regressions), args.threshold))
+
+if __name__ == '__main__':
+    main()
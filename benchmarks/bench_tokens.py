@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+#
+# Description:
+# Compares holding the tokens of a generated MyPL source as a list of
+# Token objects with holding them in a TokenBuffer: the time to lex
+# them, the memory they take (traced by tracemalloc), and the time to
+# parse them, along with parsing straight from the lexer.
+#
+# Usage: python3 benchmarks/bench_tokens.py [megabytes]
+#----------------------------------------------------------------------
+import io
+import tracemalloc
+
+from common import arg_parser, timed
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_token as token
+from bench_lexer import generate
+
+class TokenList(object):
+    """Gives the parser the tokens of a list (then EOS again)."""
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+    def next_token(self):
+        the_token = self.tokens[self.index]
+        if self.index < len(self.tokens) - 1:
+            self.index += 1
+        return the_token
+
+def lex_list(source):
+    the_lexer = lexer.BufferedLexer(io.StringIO(source))
+    tokens = []
+    while True:
+        the_token = the_lexer.next_token()
+        tokens.append(the_token)
+        if the_token.tokentype == token.EOS:
+            return tokens
+
+def lex_buffer(source):
+    return lexer.BufferedLexer(io.StringIO(source)).tokenize()
+
+def traced(fun, *args):
+    # the result of fun and the bytes it allocated and kept
+    tracemalloc.start()
+    result = fun(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def main(megabytes):
+    source = generate(int(megabytes * 1024 * 1024))
+    print('source: %.1f MB' % (len(source) / 1024 / 1024))
+    tokens, list_bytes = traced(lex_list, source)
+    count = len(tokens)
+    del tokens
+    tokens, buffer_bytes = traced(lex_buffer, source)
+    del tokens
+    print('tokens: %i' % count)
+    print('%-14s %10s %12s %10s' % ('tokens', 'lex (s)', 'memory (MB)',
+                                    'parse (s)'))
+    lex_time, tokens = timed(lex_list, source)
+    parse_time = timed(parser.Parser(TokenList(tokens)).parse)[0]
+    del tokens
+    print('%-14s %10.2f %12.1f %10.2f' % ('Token list', lex_time,
+                                          list_bytes / 2**20, parse_time))
+    lex_time, tokens = timed(lex_buffer, source)
+    parse_time = timed(parser.Parser(tokens).parse)[0]
+    del tokens
+    print('%-14s %10.2f %12.1f %10.2f' % ('TokenBuffer', lex_time,
+                                          buffer_bytes / 2**20, parse_time))
+    the_lexer = lexer.BufferedLexer(io.StringIO(source))
+    lex_parse_time = timed(parser.Parser(the_lexer).parse)[0]
+    print('%-14s %10s %12s %10.2f' % ('from lexer', '-', '-',
+                                      lex_parse_time))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare the memory and parse time of a token list '
+                      'and a TokenBuffer.', 'megabytes', 2,
+                      'size of the generated source',
+                      count_type=float).parse_args()
+    main(args.megabytes)
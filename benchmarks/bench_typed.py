@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+#
+# Description:
+# Runs each hw7_t*.txt program with and without the type checker (whose
+# types let the resolver join string chains at once and skip nil checks
+# of built-in calls that can't get nil) and reports the best run times
+# and the time the type checker itself takes. A string building loop is
+# run last for comparison.
+#
+# Usage: python3 benchmarks/bench_typed.py [repeats] [--vm]
+#----------------------------------------------------------------------
+import contextlib
+import glob
+import io
+import os
+import sys
+
+from common import ROOT, arg_parser, parse, runner_for, timed
+
+import mypl_type_checker as type_checker
+import mypl_resolver as resolver
+
+# string chains and built-in calls on values that can't be nil
+CONCAT = '''
+var i = 0;
+var n = 0;
+while i < 20000 do
+    var line = "item " + itos(i) + ": " + ftos(itof(i) * 1.5) + " [" +
+        itos(i % 7) + "/" + itos(i % 11) + "]";
+    set n = n + length(line);
+    set i = i + 1;
+end
+'''
+
+def prepare(source, type_check):
+    # returns the program to run and the type checker's time
+    stmt_list = parse(source)
+    check_time = 0.0
+    if type_check:
+        check_time = timed(stmt_list.accept, type_checker.TypeChecker())[0]
+    stmt_list.accept(resolver.Resolver(type_check))
+    return stmt_list, check_time
+
+def run_once(source, type_check, use_vm):
+    stmt_list, check_time = prepare(source, type_check)
+    runner, program = runner_for(stmt_list, use_vm)
+    stdin = sys.stdin
+    sys.stdin = io.StringIO('Bob\n' * 10)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = timed(runner.run, program)[0]
+    finally:
+        sys.stdin = stdin
+    return elapsed, check_time
+
+def main(repeats, use_vm):
+    print('%-12s %12s %12s %10s %12s' % ('program', 'untyped (s)',
+                                         'typed (s)', 'speedup',
+                                         'check (s)'))
+    programs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'hw7_t*.txt'))):
+        with open(path) as file_stream:
+            programs.append((os.path.basename(path), file_stream.read()))
+    programs.append(('concat', CONCAT))
+    for name, source in programs:
+        untyped = min(run_once(source, False, use_vm)[0]
+                      for i in range(repeats))
+        typed_runs = [run_once(source, True, use_vm) for i in range(repeats)]
+        typed = min(run[0] for run in typed_runs)
+        check = min(run[1] for run in typed_runs)
+        print('%-12s %12.5f %12.5f %9.2fx %12.5f' %
+              (name, untyped, typed, untyped / typed, check))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare running programs with and without the type '
+                      'checker.', 'repeats', 20, 'runs of each program',
+                      use_vm=True).parse_args()
+    main(args.repeats, args.vm)
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+#
+# Description:
+# Compares the tree-walking Interpreter with the bytecode VM on a
+# recursive workload (fib(25)) and a loop-heavy workload.
+#
+# Usage: python3 benchmarks/bench_vm.py [repeats]
+#----------------------------------------------------------------------
+import contextlib
+import io
+import timeit
+
+from common import arg_parser
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_resolver as resolver
+import mypl_interpreter as interpreter
+import mypl_compiler as compiler
+import mypl_vm as vm
+
+FIB = '''
+fun int fib(x: int)
+    if (x == 0) or (x == 1) then
+        return x;
+    else
+        return fib(x - 2) + fib(x - 1);
+    end
+end
+print(itos(fib(25)) + "\\n");
+'''
+
+LOOPS = '''
+var total = 0;
+var i = 0;
+while i < 300 do
+    var j = 0;
+    while j < 1000 do
+        if j % 3 == 0 then
+            set total = total + j;
+        else
+            set total = total - 1;
+        end
+        set j = j + 1;
+    end
+    set i = i + 1;
+end
+print(itos(total) + "\\n");
+'''
+
+def parse(source):
+    stmt_list = parser.Parser(lexer.Lexer(io.StringIO(source))).parse()
+    stmt_list.accept(resolver.Resolver())
+    return stmt_list
+
+def run_interpreter(stmt_list):
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.Interpreter().run(stmt_list)
+
+def run_vm(program):
+    with contextlib.redirect_stdout(io.StringIO()):
+        vm.VM().run(program)
+
+def main(repeats):
+    print('%-8s %14s %10s %8s' % ('program', 'interpreter', 'vm', 'speedup'))
+    for name, source in (('fib(25)', FIB), ('loops', LOOPS)):
+        stmt_list = parse(source)
+        program = compiler.Compiler().compile(stmt_list)
+        tree = min(timeit.repeat(lambda: run_interpreter(stmt_list),
+                                 number=1, repeat=repeats))
+        byte = min(timeit.repeat(lambda: run_vm(program),
+                                 number=1, repeat=repeats))
+        print('%-8s %12.2f s %8.2f s %7.1fx' % (name, tree, byte, tree / byte))
+
+if __name__ == '__main__':
+    args = arg_parser('Compare the interpreter and the VM.', 'repeats', 3,
+                      'runs of each program').parse_args()
+    main(args.repeats)
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+#
+# Description:
+# Runs a MyPL while loop for a large number of iterations and reports
+# the run time, iterations per second, and peak memory use. The loop
+# body makes a few nested calls so that any per-iteration growth of the
+# python stack would show up as a RecursionError.
+#
+# Usage: python3 benchmarks/bench_while.py [iterations]
+#----------------------------------------------------------------------
+import io
+
+from common import arg_parser, peak_rss_kb, timed
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_interpreter as interpreter
+
+PROGRAM = '''
+fun int inc(x: int)
+    return x + 1;
+end
+
+fun int twice(x: int)
+    return inc(inc(x)) - 1;
+end
+
+var i = 0;
+var total = 0;
+while i < %d do
+    var step = twice(i) - i;
+    set total = total + step;
+    set i = i + 1;
+end
+print(itos(total) + "\\n");
+'''
+
+def main(iterations):
+    source = io.StringIO(PROGRAM % iterations)
+    stmt_list = parser.Parser(lexer.Lexer(source)).parse()
+    the_interpreter = interpreter.Interpreter()
+    rss_before = peak_rss_kb()
+    elapsed = timed(the_interpreter.run, stmt_list)[0]
+    rss_after = peak_rss_kb()
+    print('iterations:      %d' % iterations)
+    print('time:            %.2f s' % elapsed)
+    print('iterations/sec:  %.0f' % (iterations / elapsed))
+    print('peak rss before: %d KB' % rss_before)
+    print('peak rss after:  %d KB' % rss_after)
+
+if __name__ == '__main__':
+    args = arg_parser('Time a loop of function calls and report peak '
+                      'memory.', 'iterations', 10**7,
+                      'iterations of the loop').parse_args()
+    main(args.iterations)
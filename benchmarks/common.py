@@ -0,0 +1,74 @@
+#
+# Description:
+# Helpers shared by the benchmarks: the path to the interpreter's
+# modules, command line parsing, preparing a program and a runner for
+# it, timing, and peak memory use.
+#----------------------------------------------------------------------
+import argparse
+import io
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+import mypl_resolver as resolver
+import mypl_memo as memo
+import mypl_interpreter as interpreter
+import mypl_compiler as compiler
+import mypl_vm as vm
+
+def arg_parser(description, count, default, help, count_type=int,
+               use_vm=False):
+    """An ArgumentParser for a benchmark that takes an optional count
+    (like the number of repeats), and --vm if use_vm is True."""
+    the_parser = argparse.ArgumentParser(description=description)
+    the_parser.add_argument(count, nargs='?', type=count_type,
+                            default=default,
+                            help='%s (default: %%(default)s)' % help)
+    if use_vm:
+        the_parser.add_argument('--vm', action='store_true',
+                                help='run on the VM (default: the '
+                                'interpreter)')
+    return the_parser
+
+def parse(source):
+    return parser.Parser(lexer.BufferedLexer(io.StringIO(source))).parse()
+
+def prepare(source, type_check=True, find_pure=False):
+    # parse, check, and resolve a program (and find its pure functions)
+    stmt_list = parse(source)
+    if type_check:
+        stmt_list.accept(type_checker.TypeChecker())
+    stmt_list.accept(resolver.Resolver(type_check))
+    if find_pure:
+        stmt_list.accept(memo.PurityAnalyzer())
+    return stmt_list
+
+def runner_for(stmt_list, use_vm, *args):
+    """The runner (taking args) of a prepared program and what it runs:
+    the compiled program on a VM, or the tree on an Interpreter."""
+    if use_vm:
+        return vm.VM(*args), compiler.Compiler().compile(stmt_list)
+    return interpreter.Interpreter(*args), stmt_list
+
+def timed(fun, *args):
+    # the seconds fun(*args) took and its result
+    start = time.perf_counter()
+    result = fun(*args)
+    return time.perf_counter() - start, result
+
+def best(repeats, fun, *args):
+    # the fewest seconds fun(*args) took in repeats calls
+    return min(timed(fun, *args)[0] for i in range(repeats))
+
+def peak_rss_kb():
+    # the process's peak resident set size (ru_maxrss is in KB on
+    # linux, but in bytes on macOS)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
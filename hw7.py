@@ -11,13 +11,24 @@ import mypl_token as token
 import mypl_parser as parser
 import mypl_ast as ast
 import mypl_type_checker as type_checker
+import mypl_resolver as resolver
+import mypl_optimizer as optimizer
+import mypl_memo as memo
+import mypl_builtins as built_ins
+import mypl_cache as cache
 import mypl_interpreter as interpreter
+import mypl_compiler as compiler
+import mypl_vm as vm
+import mypl_profile as profiler
+import argparse
+import io
 import sys
 
-def main(filename):
+def main(filename, options, the_cache=None):
+    # run the program in filename with options (see default_options)
     try:
         file_stream = open(filename, 'r')
-        hw7(file_stream)
+        hw7(file_stream, options, the_cache)
         file_stream.close()
     except FileNotFoundError:
         sys.exit('invalid filename %s' % filename)
@@ -25,16 +36,194 @@ def main(filename):
         file_stream.close()
         sys.exit(e)
 
-def hw7(file_stream):
-    the_lexer = lexer.Lexer(file_stream)
+def hw7(file_stream, options, the_cache=None):
+    use_vm = options.vm
+    type_check = not options.no_type_check
+    memo_size = options.memo_size
+    # cached results are keyed by argument values, which only match the
+    # declared parameter types if the program was type checked
+    find_pure = type_check and memo_size > 0
+    # the key of a prepared program to store once it has run (pickling
+    # the tree first would slow down its run, see mypl_ast.ASTNode)
+    new_key = None
+    the_profile = None
+    if options.profile or options.profile_stacks is not None:
+        # profiles are of the interpreter (the report quotes the source)
+        the_profile = profiler.Profile()
+        source = file_stream.read()
+        file_stream = io.StringIO(source)
+        use_vm = False
+    if options.sample is not None:
+        # the sampler reads the interpreter's stack of calls
+        use_vm = False
+    if the_cache is None:
+        stmt_list = prepare(file_stream, options.stream_lexer,
+                            options.optimize, type_check, find_pure)
+    else:
+        source = file_stream.read()
+        key = the_cache.key(source, (options.optimize, type_check, find_pure))
+        stmt_list = the_cache.load(key)
+        if stmt_list is None:
+            stmt_list = prepare(io.StringIO(source), options.stream_lexer,
+                                options.optimize, type_check, find_pure)
+            new_key = key
+    output = built_ins.Output(buffer_size=options.output_buffer)
+    input_source = built_ins.Input(buffer_size=options.input_buffer)
+    try:
+        if use_vm:
+            program = compiler.Compiler().compile(stmt_list)
+            the_runner = vm.VM(memo_size, output, input_source)
+            the_runner.run(program)
+        else:
+            if the_profile is not None:
+                the_runner = profiler.ProfilingInterpreter(
+                    the_profile, memo_size, output, input_source)
+            else:
+                the_runner = interpreter.Interpreter(memo_size, output,
+                                                     input_source)
+            if options.sample is None:
+                the_runner.run(stmt_list)
+            else:
+                run_sampled(the_runner, stmt_list, options.sample,
+                            options.sample_rate)
+    finally:
+        if new_key is not None:
+            the_cache.store(new_key, stmt_list)
+    if options.heap_stats:
+        sys.stderr.write(str(the_runner.heap))
+    if options.memo_stats:
+        sys.stderr.write(str(the_runner.memo))
+    if options.profile:
+        sys.stderr.write(the_profile.report(source.splitlines()))
+    if options.profile_stacks is not None:
+        with open(options.profile_stacks, 'w') as stacks_file:
+            stacks_file.write(the_profile.collapsed())
+
+def run_sampled(the_runner, stmt_list, filename, rate):
+    # run a program while sampling its call stack, and write the samples
+    # of each stack to filename (even if the run fails)
+    sampler = profiler.Sampler(the_runner, rate)
+    sampler.start()
+    try:
+        the_runner.run(stmt_list)
+    finally:
+        sampler.stop()
+        with open(filename, 'w') as samples_file:
+            samples_file.write(sampler.collapsed())
+
+def prepare(file_stream, stream_lexer=False, optimize=False, type_check=True,
+            find_pure=True):
+    # parse, check, optimize, and resolve a program
+    if stream_lexer:
+        the_lexer = lexer.Lexer(file_stream)
+    else:
+        the_lexer = lexer.BufferedLexer(file_stream)
     the_parser = parser.Parser(the_lexer)
     stmt_list = the_parser.parse()
-    the_type_checker = type_checker.TypeChecker()
-    #stmt_list.accept(the_type_checker)
-    the_interpreter = interpreter.Interpreter()
-    the_interpreter.run(stmt_list)
-    
+    if type_check:
+        stmt_list.accept(type_checker.TypeChecker())
+    if optimize:
+        stmt_list.accept(optimizer.Optimizer())
+    stmt_list.accept(resolver.Resolver(type_check))
+    if find_pure:
+        stmt_list.accept(memo.PurityAnalyzer())
+    return stmt_list
+
+def run_args(args, the_cache=None):
+    # run a program with options parsed by make_arg_parser
+    main(args.file, args, the_cache)
+
+def default_options(**changes):
+    """The options of a run given no arguments (the defaults of
+    add_run_arguments), with the named ones changed, e.g.
+    default_options(vm=True, memo_size=0)."""
+    arg_parser = argparse.ArgumentParser()
+    add_run_arguments(arg_parser)
+    options = arg_parser.parse_args([])
+    for name, value in changes.items():
+        if not hasattr(options, name):
+            raise TypeError('no run option %s' % name)
+        setattr(options, name, value)
+    return options
+
+def exit_status(code):
+    # the status python exits with after sys.exit(code) (writing code to
+    # stderr if it's a message), for running hw7 without exiting
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    sys.stderr.write('%s\n' % code)
+    return 1
+
+def make_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog='hw7.py',
+                                         description='Run a MyPL program.')
+    arg_parser.add_argument('file')
+    add_run_arguments(arg_parser)
+    return arg_parser
+
+def add_run_arguments(arg_parser):
+    # the options of a run (shared with the batch runner)
+    arg_parser.add_argument('--vm', action='store_true',
+                            help='compile to bytecode and run it on the VM')
+    arg_parser.add_argument('--stream-lexer', action='store_true',
+                            help='lex by peeking at the file one character '
+                            'at a time instead of reading it into a buffer')
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='fold constants and remove dead branches')
+    arg_parser.add_argument('--heap-stats', action='store_true',
+                            help='print struct heap statistics to stderr')
+    arg_parser.add_argument('--no-type-check', action='store_true',
+                            help="don't type check the program (or use "
+                            'its types to specialize evaluation)')
+    arg_parser.add_argument('--memo-size', type=int, metavar='N',
+                            default=memo.DEFAULT_CACHE_SIZE,
+                            help='cache up to N results of each pure '
+                            'function (0 turns memoization off)')
+    arg_parser.add_argument('--memo-stats', action='store_true',
+                            help='print memoization hits and misses to '
+                            'stderr')
+    arg_parser.add_argument('--output-buffer', type=int, metavar='N',
+                            default=built_ins.DEFAULT_BUFFER_SIZE,
+                            help='buffer up to N characters of printed '
+                            'output (0 writes each print at once)')
+    arg_parser.add_argument('--input-buffer', type=int, metavar='N',
+                            default=built_ins.DEFAULT_BUFFER_SIZE,
+                            help='read standard input in blocks of up to N '
+                            'characters')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='print the time and calls of each '
+                            'function, the most run lines, and the structs '
+                            'made to stderr (runs on the interpreter)')
+    arg_parser.add_argument('--profile-stacks', metavar='FILE',
+                            help='profile the run and write the time of '
+                            'each call stack to FILE in the collapsed '
+                            'format read by flame graph tools')
+    arg_parser.add_argument('--sample', metavar='FILE',
+                            help='sample the call stack while the program '
+                            'runs (on the interpreter) and write the '
+                            'samples of each stack to FILE in the '
+                            'collapsed format read by flame graph tools')
+    arg_parser.add_argument('--sample-rate', type=int, metavar='HZ',
+                            default=profiler.DEFAULT_SAMPLE_RATE,
+                            help='take HZ samples a second of cpu time '
+                            '(default: %(default)s)')
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="don't load or store the prepared program "
+                            'in the AST cache')
+    arg_parser.add_argument('--cache-dir', metavar='DIR',
+                            help='the AST cache directory, which only you '
+                            'may write to (default: $MYPL_CACHE_DIR or '
+                            '~/.cache/mypl)')
+    arg_parser.add_argument('--cache-size', type=int, metavar='MB',
+                            default=cache.DEFAULT_MAX_BYTES >> 20,
+                            help='evict least recently used AST cache '
+                            'entries over MB megabytes')
+
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        sys.exit('Usage: %s file' % sys.argv[0])
-    main(sys.argv[1])
\ No newline at end of file
+    args = make_arg_parser().parse_args()
+    the_cache = None
+    if not args.no_cache:
+        the_cache = cache.Cache(args.cache_dir, args.cache_size << 20)
+    run_args(args, the_cache)
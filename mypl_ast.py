@@ -2,6 +2,12 @@ import mypl_token as token
 
 class ASTNode(object):
     """The base class for the abstract syntax tree."""
+    def __setstate__(self, state):
+        # unpickled attributes are set one at a time (as __init__ does)
+        # so the node keeps python's compact attribute storage; updating
+        # the node's __dict__ would make every attribute lookup slower
+        for name, value in state.items():
+            setattr(self, name, value)
 def accept(self, visitor): pass
 
 class Stmt(ASTNode):
@@ -12,6 +18,7 @@ class StmtList(ASTNode):
     """A statement list consists of a list of statements."""
     def __init__(self):
         self.stmts = [] # list of Stmt
+        self.num_slots = None # frame size (set by the resolver)
     def accept(self, visitor):
         visitor.visit_stmt_list(self)
         
@@ -34,6 +41,7 @@ class VarDeclStmt(Stmt):
         self.var_id = None # Token (ID)
         self.var_type = None # Token (STRINGTYPE, ..., ID)
         self.var_expr = None # Expr node
+        self.slot = None # frame slot (set by the resolver)
     def accept(self, visitor):
         visitor.visit_var_decl_stmt(self)
         
@@ -53,6 +61,12 @@ class StructDeclStmt(Stmt):
     def __init__(self):
         self.struct_id = None # Token (id)
         self.var_decls = [] # [VarDeclStmt]
+        self.slot = None # frame slot (set by the resolver)
+        self.num_slots = None # field frame size (set by the resolver)
+        self.layout = None # StructLayout (set by the resolver)
+        self.num_scopes = None # scopes it's declared in (set by the resolver)
+        self.template = None # constant field values (set by the resolver)
+        self.init_decls = None # fields to evaluate on new (set by the resolver)
     def accept(self, visitor):
         visitor.visit_struct_decl_stmt(self)
     
@@ -66,6 +80,10 @@ class FunDeclStmt(Stmt):
         self.params = [] # List of FunParam
         self.return_type = None # Token
         self.stmt_list = StmtList() # StmtList
+        self.slot = None # frame slot (set by the resolver)
+        self.num_slots = None # params + locals (set by the resolver)
+        self.pure = False # result depends only on args (set by mypl_memo)
+        self.float_params = False # a param is a float (set by mypl_memo)
     def accept(self, visitor):
         visitor.visit_fun_decl_stmt(self)
 
@@ -107,6 +125,7 @@ class SimpleExpr(Expr):
     """
     def __init__(self):
         self.term = None # RValue
+        self.static_type = None # MyPL type (set by the type checker)
     def accept(self, visitor):
         visitor.visit_simple_expr(self)
     
@@ -119,6 +138,9 @@ class ComplexExpr(Expr):
         self.first_operand = None # Expr node
         self.math_rel = None # Token (+, -, *, etc.)
         self.rest = None # Expr node
+        self.op = None # function for math_rel (set by the resolver)
+        self.static_type = None # MyPL type (set by the type checker)
+        self.concat = False # join a string + chain at once (set by resolver)
     def accept(self, visitor):
         visitor.visit_complex_expr(self)
 
@@ -136,6 +158,9 @@ class BoolExpr(ASTNode):
         self.bool_connector = None # Token (AND or OR)
         self.rest = None # BoolExpr node
         self.negated = False # Bool
+        self.rel_op = None # function for bool_rel (set by the resolver)
+        self.connector_op = None # function for bool_connector (ditto)
+        self.static_type = None # MyPL type (set by the type checker)
     def accept(self, visitor):
         visitor.visit_bool_expr(self)
     
@@ -144,6 +169,9 @@ class LValue(ASTNode):
     """
     def __init__(self):
         self.path = [] # [Token (ID)] ... one implies simple var
+        self.depth = None # frames to walk up (set by the resolver)
+        self.slot = None # frame slot (set by the resolver)
+        self.field_refs = [] # index or FieldRef per path[1:] (set by resolver)
     def accept(self, visitor):
         visitor.visit_lvalue(self)
         
@@ -153,10 +181,11 @@ class FunParam(Stmt):
     def __init__(self):
         self.param_name = None # Token (id)
         self.param_type = None # Token (id)
+        self.slot = None # frame slot (set by the resolver)
     def accept(self, visitor):
         visitor.visit_fun_param(self)
         
-class BasicIf(object):
+class BasicIf(ASTNode):
     """A basic if holds a condition (Boolean expression) and a list of
     statements (the body of the if).
     """
@@ -176,11 +205,24 @@ class SimpleRValue(RValue):
     def accept(self, visitor):
         visitor.visit_simple_rvalue(self)
         
+class ConstRValue(SimpleRValue):
+    """A constant rvalue is a simple rvalue whose value has already been
+    computed (by the optimizer). The token is kept for printing and for
+    visitors that treat it like any other simple rvalue.
+    """
+    def __init__(self):
+        self.val = None # Token
+        self.value = None # python value (None for nil)
+    def accept(self, visitor):
+        visitor.visit_const_rvalue(self)
+
 class NewRValue(RValue):
     """A new rvalue consists of a struct name (id)
     """
     def __init__(self):
         self.struct_type = None # Token (id)
+        self.depth = None # frames to walk up (set by the resolver)
+        self.slot = None # frame slot (set by the resolver)
     def accept(self, visitor):
         visitor.visit_new_rvalue(self)
     
@@ -191,6 +233,11 @@ class CallRValue(RValue):
     def __init__(self):
         self.fun = None # Token (id)
         self.args = [] # list of Expr
+        self.depth = None # frames to walk up (set by the resolver)
+        self.slot = None # frame slot, None for built-ins (set by the resolver)
+        self.built_in = None # BuiltIn called (set by the resolver)
+        self.fun_decl = None # FunDeclStmt called if known (set by the resolver)
+        self.check_nil = True # False if no arg can be nil (set by type checker)
     def accept(self, visitor):
         visitor.visit_call_rvalue(self)
     
@@ -199,6 +246,9 @@ class IDRvalue(RValue):
     """
     def __init__(self):
         self.path = [] # List of Token (id)
+        self.depth = None # frames to walk up (set by the resolver)
+        self.slot = None # frame slot (set by the resolver)
+        self.field_refs = [] # index or FieldRef per path[1:] (set by resolver)
     def accept(self, visitor):
         visitor.visit_id_rvalue(self)
 
@@ -220,6 +270,8 @@ class Visitor(object):
     def visit_lvalue(self, lval): pass
     def visit_fun_param(self, fun_param): pass
     def visit_simple_rvalue(self, simple_rvalue): pass
+    def visit_const_rvalue(self, const_rvalue):
+        self.visit_simple_rvalue(const_rvalue)
     def visit_new_rvalue(self, new_rvalue): pass
     def visit_call_rvalue(self, call_rvalue): pass
     def visit_id_rvalue(self, id_rvalue): pass
@@ -0,0 +1,207 @@
+#!/usr/bin/python3
+#
+# mypl_batch.py
+# Description:
+#   Runs many MyPL programs on a pool of worker processes (one per cpu
+#   by default) and writes a JSON report of each program's status,
+#   wall and cpu time, and captured standard output and error. A program that
+#   runs longer than the timeout is stopped. Each worker keeps the
+#   programs it has prepared in memory, so a program given more than
+#   once (or with the same source as another) is only prepared once
+#   per worker.
+#----------------------------------------------------------------------
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+
+import mypl_cache as cache
+import hw7
+
+# default seconds a program may run (0 for no limit)
+DEFAULT_TIMEOUT = 60
+
+# prepared programs each worker keeps in memory
+DEFAULT_MAX_ENTRIES = 256
+
+# the statuses of a run in the report
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+
+
+class Timeout(BaseException):
+    # raised in a worker when its program's time is up (not an Exception,
+    # so nothing in the program's run catches it)
+    pass
+
+
+def expand(patterns):
+    """The files named by patterns (paths or globs), in order, without
+    duplicates. A glob that matches nothing is kept as a path, so its
+    run reports the missing file."""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) \
+            else []
+        for path in matches or [pattern]:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+# the state of a worker process (set by _init_worker)
+_args = None
+_cache = None
+
+def _init_worker(args):
+    global _args, _cache
+    _args = args
+    _cache = None
+    if not args.no_cache:
+        _cache = cache.Cache(args.cache_dir, args.cache_size << 20,
+                             args.max_entries)
+    # the parent handles interrupts (and terminates the pool)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _time_up(signum, frame):
+    raise Timeout()
+
+def run_script(path):
+    """Runs the program at path (in a worker) and returns its entry in
+    the report."""
+    args = argparse.Namespace(**vars(_args))
+    args.file = path
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    saved = (sys.stdin, sys.stdout, sys.stderr)
+    stdin = open(_args.stdin if _args.stdin is not None else os.devnull)
+    sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+    hits = _cache.hits if _cache is not None else 0
+    status = OK
+    exit_status = 0
+    handler = signal.signal(signal.SIGALRM, _time_up)
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        try:
+            signal.setitimer(signal.ITIMER_REAL, _args.timeout)
+            try:
+                hw7.run_args(args, _cache)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except SystemExit as e:
+            exit_status = hw7.exit_status(e.code)
+        except Timeout:
+            status = TIMEOUT
+            exit_status = None
+            stderr.write('timed out after %g seconds\n' % _args.timeout)
+        except Exception:
+            traceback.print_exc()
+            exit_status = 1
+        elapsed = time.perf_counter() - start
+        cpu_time = time.process_time() - cpu_start
+    finally:
+        signal.signal(signal.SIGALRM, handler)
+        sys.stdin, sys.stdout, sys.stderr = saved
+        stdin.close()
+    if status == OK and exit_status != 0:
+        status = ERROR
+    return {
+        'file': path,
+        'status': status,
+        'exit_status': exit_status,
+        'wall_time': elapsed,
+        'cpu_time': cpu_time,
+        'cached': _cache is not None and _cache.hits > hits,
+        'worker': os.getpid(),
+        'stdout': stdout.getvalue(),
+        'stderr': stderr.getvalue(),
+    }
+
+
+def run_batch(paths, args):
+    """Runs the programs at paths on args.jobs workers and returns the
+    report (with the scripts in the order of paths)."""
+    start = time.perf_counter()
+    results = {}
+    with multiprocessing.Pool(args.jobs, _init_worker, (args,)) as pool:
+        for result in pool.imap_unordered(run_script, paths):
+            results[result['file']] = result
+            if args.verbose:
+                sys.stderr.write('%-8s %8.3fs %s\n' % (result['status'],
+                                                       result['wall_time'],
+                                                       result['file']))
+    scripts = [results[path] for path in paths]
+    summary = {OK: 0, ERROR: 0, TIMEOUT: 0}
+    for script in scripts:
+        summary[script['status']] += 1
+    return {
+        'jobs': args.jobs,
+        'timeout': args.timeout,
+        'wall_time': time.perf_counter() - start,
+        # the time the scripts took (in parallel, more than wall_time)
+        'total_script_time': sum(script['wall_time'] for script in scripts),
+        'cpu_time': sum(script['cpu_time'] for script in scripts),
+        'summary': summary,
+        'scripts': scripts,
+    }
+
+def write_report(report, path):
+    if path == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+            report_file.write('\n')
+
+
+def main(args):
+    paths = expand(args.files)
+    report = run_batch(paths, args)
+    write_report(report, args.report)
+    summary = report['summary']
+    sys.stderr.write('%i ok, %i errors, %i timed out in %.2fs\n' %
+                     (summary[OK], summary[ERROR], summary[TIMEOUT],
+                      report['wall_time']))
+    if summary[ERROR] or summary[TIMEOUT]:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='Run many MyPL programs and report the results as '
+        'JSON.')
+    arg_parser.add_argument('files', nargs='+', metavar='file',
+                            help='a program, or a glob (quoted) of programs')
+    arg_parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                            default=os.cpu_count() or 1,
+                            help='run N programs at once (default: the '
+                            'number of cpus)')
+    arg_parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                            default=DEFAULT_TIMEOUT,
+                            help='stop a program after SECONDS (0 for no '
+                            'limit)')
+    arg_parser.add_argument('--report', metavar='FILE', default='-',
+                            help='write the report to FILE (default: '
+                            'stdout)')
+    arg_parser.add_argument('--stdin', metavar='FILE',
+                            help='the standard input of every program '
+                            '(default: empty)')
+    arg_parser.add_argument('--max-entries', type=int, metavar='N',
+                            default=DEFAULT_MAX_ENTRIES,
+                            help='keep up to N prepared programs in each '
+                            "worker's memory")
+    arg_parser.add_argument('-v', '--verbose', action='store_true',
+                            help='print each result to stderr as it '
+                            'finishes')
+    hw7.add_run_arguments(arg_parser)
+    main(arg_parser.parse_args())
@@ -0,0 +1,401 @@
+#!/usr/bin/python3
+#
+# mypl_builtins.py
+# Description:
+#   Operator tables and the registry of native built-in functions
+#   shared by the resolver, interpreter, compiler, and VM
+#----------------------------------------------------------------------
+
+import codecs
+import io
+import mmap
+import operator
+import os
+import sys
+
+import mypl_token as token
+import mypl_rope as rope
+
+MATH_OPS = {
+    token.PLUS: operator.add,
+    token.MINUS: operator.sub,
+    token.MULTIPLY: operator.mul,
+    token.DIVIDE: operator.truediv,
+    token.MODULO: operator.mod,
+}
+
+BOOL_RELS = {
+    token.EQUAL: operator.eq,
+    token.NOT_EQUAL: operator.ne,
+    token.LESS_THAN: operator.lt,
+    token.LESS_THAN_EQUAL: operator.le,
+    token.GREATER_THAN: operator.gt,
+    token.GREATER_THAN_EQUAL: operator.ge,
+}
+
+# and/or don't short circuit and give back an operand (not a bool)
+def _and(lhs, rhs):
+    return lhs and rhs
+
+def _or(lhs, rhs):
+    return lhs or rhs
+
+BOOL_CONNECTORS = {
+    token.AND: _and,
+    token.OR: _or,
+}
+
+
+class BuiltInError(Exception):
+    """Raised by a built-in function to report a MyPL run-time error. The
+    caller reports the message at the call's position."""
+    pass
+
+
+class BuiltIn(object):
+    """A native built-in function. fun is called with the (non-nil)
+    argument values and returns the MyPL result (None for nil).
+    param_types and return_type are token types (e.g., token.INTTYPE),
+    pure built-ins have no side effects and give the same result for
+    the same arguments, and may_return_nil is True if fun can return nil
+    even though its return type isn't NIL (like reads at the end of the
+    input).
+    """
+    __slots__ = ('name', 'fun', 'param_types', 'return_type', 'pure',
+                 'may_return_nil')
+    def __init__(self, name, fun, param_types, return_type, pure,
+                 may_return_nil=False):
+        self.name = name
+        self.fun = fun
+        self.param_types = param_types
+        self.return_type = return_type
+        self.pure = pure
+        self.may_return_nil = may_return_nil
+    def __repr__(self):
+        return '<built-in %s>' % self.name
+
+
+# name -> BuiltIn
+_registry = {}
+
+def register(name, fun, param_types, return_type, pure=False,
+             ropes=False, may_return_nil=False):
+    """Registers (or replaces) the built-in function name. Calls to it are
+    bound to fun when a program is resolved, so register extra built-ins
+    before running the programs that use them. A call with a nil
+    argument is an error before fun is called, and fun reports other
+    errors by raising BuiltInError. A string argument can be a
+    mypl_rope.Rope (which supports len, indexing, comparisons, and str)
+    if ropes is True, otherwise ropes are joined into a str for fun. If
+    fun can return None (nil), pass may_return_nil=True so the values it
+    returns are checked where they can't be nil. For example:
+
+        def clamp(x, lo, hi):
+            return max(lo, min(x, hi))
+        register('clamp', clamp, [token.INTTYPE] * 3, token.INTTYPE,
+                 pure=True)
+    """
+    if not ropes and token.STRINGTYPE in param_types:
+        fun = _joining_ropes(fun)
+    _registry[name] = BuiltIn(name, fun, list(param_types), return_type, pure,
+                              may_return_nil)
+
+def _joining_ropes(fun):
+    # fun, but called with rope arguments joined into strs
+    def call(*args):
+        return fun(*[str(arg) if arg.__class__ is rope.Rope else arg
+                     for arg in args])
+    call.__name__ = getattr(fun, '__name__', 'call')
+    return call
+
+def unregister(name):
+    """Removes the built-in function name (if registered)."""
+    _registry.pop(name, None)
+
+def lookup(name):
+    """Returns the BuiltIn registered as name, or None."""
+    return _registry.get(name)
+
+def names():
+    """Returns the names of the registered built-ins."""
+    return list(_registry)
+
+
+# where print writes
+
+# characters an Output holds before writing them (unless configured)
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+class Output(object):
+    """A buffered output sink for print. Printed strings are kept until
+    buffer_size characters are waiting (0 writes each one right away),
+    on flush, or before a built-in reads input. They are written to
+    stream, or to sys.stdout (as it is when flushed) if stream is None.
+    """
+    def __init__(self, stream=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, s):
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream if self.stream is not None else sys.stdout
+        if self.parts:
+            stream.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+        stream.flush()
+
+# the sink of the program being run
+_output = Output()
+
+def set_output(output):
+    """Makes print write to output (an Output) and returns the sink it
+    wrote to before. A runner installs its sink while it runs."""
+    global _output
+    previous = _output
+    _output = output
+    return previous
+
+
+# where reads, readi, and readf read from
+
+class Input(object):
+    """A buffered input source for reads, readi, and readf. The stream
+    (sys.stdin, as it is at the first read, if None) is read in blocks of
+    up to buffer_size characters that are split into lines. A stream with
+    a byte buffer (like stdin) is read as its bytes arrive, so an
+    interactive read doesn't wait for a full block.
+    """
+    def __init__(self, stream=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.lines = [] # complete lines of the last block
+        self.next_line = 0 # index in lines of the next line to read
+        self.partial = '' # text after the last newline read
+        self.read_block = None # returns the next block (None at the end)
+
+    def readline(self):
+        """Returns the next line (without its newline), or None at the
+        end of the input."""
+        while self.next_line == len(self.lines):
+            if not self.__fill():
+                return None
+        line = self.lines[self.next_line]
+        self.next_line += 1
+        return line
+
+    def __fill(self):
+        # reads the next block of lines, returning False at the end
+        if self.read_block is None:
+            self.read_block = self.__block_reader()
+        block = self.read_block()
+        if block is None:
+            if not self.partial:
+                return False
+            self.lines = [self.partial]
+            self.partial = ''
+        else:
+            self.lines = (self.partial + block).split('\n')
+            self.partial = self.lines.pop()
+        self.next_line = 0
+        return True
+
+    def __block_reader(self):
+        stream = self.stream if self.stream is not None else sys.stdin
+        raw = getattr(stream, 'buffer', None)
+        if raw is None or not hasattr(raw, 'read1'):
+            def read_block():
+                return stream.read(self.buffer_size) or None
+            return read_block
+        # decode the bytes (with newlines translated as stream would)
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(stream.encoding or 'utf-8')(), True)
+        def read_block():
+            data = raw.read1(self.buffer_size)
+            if not data:
+                text = decoder.decode(b'', True)
+                return text or None
+            return decoder.decode(data)
+        return read_block
+
+# the source of the program being run
+_input = Input()
+
+def set_input(input_source):
+    """Makes reads, readi, and readf read from input_source (an Input)
+    and returns the source they read from before. A runner installs its
+    source while it runs."""
+    global _input
+    previous = _input
+    _input = input_source
+    return previous
+
+
+# files opened by fopen
+
+# files at least this big (in bytes) are read through mmap
+MMAP_THRESHOLD = 1 << 20
+
+class FileReader(Input):
+    """Reads the lines of a (utf-8) file opened by fopen, in blocks of
+    buffer_size bytes, with its newlines translated to \\n (like a file
+    opened in text mode). A file of at least MMAP_THRESHOLD bytes is memory
+    mapped and its blocks are taken from the mapping instead of read
+    through a file buffer.
+    """
+    def __init__(self, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        Input.__init__(self, None, buffer_size)
+        self.file = open(path, 'rb')
+        self.map = None
+        source = self.file
+        if os.fstat(self.file.fileno()).st_size >= MMAP_THRESHOLD:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            source = self.map
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(), True)
+        def read_block():
+            data = source.read(self.buffer_size)
+            if not data:
+                return decoder.decode(b'', True) or None
+            return decoder.decode(data)
+        self.read_block = read_block
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+def read_file(path):
+    """Returns the contents of the file at path, with its newlines
+    translated to \\n (memory mapped if it is at least MMAP_THRESHOLD
+    bytes)."""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < MMAP_THRESHOLD:
+            text = file.read().decode('utf-8')
+        else:
+            with mmap.mmap(file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as the_map:
+                text = codecs.decode(the_map, 'utf-8')
+    return io.IncrementalNewlineDecoder(None, True).decode(text, True)
+
+# handle (an int) -> FileReader
+_files = {}
+_next_handle = 1
+
+def close_files():
+    """Closes the files left open by fopen."""
+    for file in _files.values():
+        file.close()
+    _files.clear()
+
+
+# the standard built-ins
+
+def _print(s):
+    # Output.write, inlined (print is called a lot)
+    if s.__class__ is not str:
+        s = str(s)
+    output = _output
+    output.parts.append(s)
+    output.size += len(s)
+    if output.size >= output.buffer_size:
+        output.flush()
+
+def _read_string():
+    # a prompt printed before the read has to show first (nil at the
+    # end of the input)
+    if _output.parts:
+        _output.flush()
+    return _input.readline()
+
+def _get(i, s):
+    if 0 <= i < len(s):
+        return s[i]
+    raise BuiltInError('out of range')
+
+def _read_int():
+    s = _read_string()
+    return _stoi(s) if s is not None else None
+
+def _read_float():
+    s = _read_string()
+    return _stof(s) if s is not None else None
+
+def _open_file(path):
+    global _next_handle
+    try:
+        file = FileReader(str(path))
+    except (OSError, ValueError):
+        raise BuiltInError('cannot open file')
+    handle = _next_handle
+    _next_handle += 1
+    _files[handle] = file
+    return handle
+
+def _file(handle):
+    file = _files.get(handle)
+    if file is None:
+        raise BuiltInError('bad file handle')
+    return file
+
+def _read_file_line(handle):
+    file = _file(handle)
+    try:
+        return file.readline()
+    except UnicodeDecodeError:
+        raise BuiltInError('bad utf-8 in file')
+
+def _read_whole_file(path):
+    try:
+        return read_file(str(path))
+    except (OSError, ValueError):
+        raise BuiltInError('cannot read file')
+
+def _close_file(handle):
+    _file(handle).close()
+    del _files[handle]
+
+def _stoi(s):
+    try:
+        return int(s)
+    except ValueError:
+        raise BuiltInError('bad int value')
+    except TypeError:
+        return _stoi(str(s)) # a rope
+
+def _stof(s):
+    try:
+        return float(s)
+    except ValueError:
+        raise BuiltInError('bad float value')
+    except TypeError:
+        return _stof(str(s)) # a rope
+
+register('print', _print, [token.STRINGTYPE], token.NIL, ropes=True)
+register('length', len, [token.STRINGTYPE], token.INTTYPE, pure=True,
+         ropes=True)
+register('get', _get, [token.INTTYPE, token.STRINGTYPE], token.STRINGTYPE,
+         pure=True, ropes=True)
+register('reads', _read_string, [], token.STRINGTYPE, may_return_nil=True)
+register('readi', _read_int, [], token.INTTYPE, may_return_nil=True)
+register('readf', _read_float, [], token.FLOATTYPE, may_return_nil=True)
+register('itof', float, [token.INTTYPE], token.FLOATTYPE, pure=True)
+register('itos', str, [token.INTTYPE], token.STRINGTYPE, pure=True)
+register('ftos', str, [token.FLOATTYPE], token.STRINGTYPE, pure=True)
+register('stoi', _stoi, [token.STRINGTYPE], token.INTTYPE, pure=True,
+         ropes=True)
+register('stof', _stof, [token.STRINGTYPE], token.FLOATTYPE, pure=True,
+         ropes=True)
+register('fopen', _open_file, [token.STRINGTYPE], token.INTTYPE, ropes=True)
+register('freadl', _read_file_line, [token.INTTYPE], token.STRINGTYPE,
+         may_return_nil=True)
+register('fread', _read_whole_file, [token.STRINGTYPE], token.STRINGTYPE,
+         ropes=True)
+register('fclose', _close_file, [token.INTTYPE], token.NIL)
@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+#
+# mypl_cache.py
+# Description:
+#   On-disk cache of checked, optimized, and resolved ASTs keyed by a
+#   hash of the program source, the options it was prepared with, and
+#   the interpreter version
+#----------------------------------------------------------------------
+
+import collections
+import gc
+import hashlib
+import os
+import pickle
+import stat
+import sys
+import tempfile
+
+import mypl_builtins as built_ins
+
+# bump when the AST (or anything stored with it) changes shape
+CACHE_VERSION = 1
+
+# default size limit of a cache directory (in bytes)
+DEFAULT_MAX_BYTES = 64 << 20
+
+# modules whose code shapes the stored trees (a change to any of them
+# invalidates the cache)
+PIPELINE_MODULES = ['mypl_token', 'mypl_lexer', 'mypl_parser', 'mypl_ast',
+                    'mypl_type_checker', 'mypl_optimizer', 'mypl_resolver',
+                    'mypl_memo', 'mypl_heap', 'mypl_builtins', 'mypl_rope',
+                    'mypl_cache']
+
+SUFFIX = '.ast'
+
+
+def default_dir():
+    """The cache directory: $MYPL_CACHE_DIR, or mypl in the user's cache
+    directory."""
+    if os.environ.get('MYPL_CACHE_DIR'):
+        return os.environ['MYPL_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'mypl')
+
+
+_version = None
+
+def version():
+    """A hash of CACHE_VERSION, the python version, and the source of the
+    pipeline modules (computed once)."""
+    global _version
+    if _version is None:
+        digest = hashlib.sha256()
+        digest.update(('%i %s' % (CACHE_VERSION, sys.version)).encode())
+        for name in PIPELINE_MODULES:
+            module = sys.modules.get(name) or __import__(name)
+            with open(module.__file__, 'rb') as module_file:
+                digest.update(module_file.read())
+        _version = digest.hexdigest()
+    return _version
+
+
+def _built_ins_key():
+    # calls are bound to the registered built-ins, so they are part of
+    # the key
+    parts = []
+    for name in sorted(built_ins.names()):
+        built_in = built_ins.lookup(name)
+        fun = built_in.fun
+        parts.append('%s:%s.%s:%s:%s:%s' %
+                     (name, getattr(fun, '__module__', None),
+                      getattr(fun, '__qualname__', None),
+                      built_in.param_types, built_in.return_type,
+                      built_in.pure))
+    return '\n'.join(parts)
+
+
+def _loads(data):
+    # the collector would traverse the whole tree repeatedly while it is
+    # being built (and every node is live anyway)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class Cache(object):
+    """A directory of pickled StmtLists, one file per key. Entries are
+    evicted least recently used first (by file modification time, which
+    a load updates) once the directory holds more than max_bytes.
+    Entries that fail to load are removed. Cache files are trusted, so
+    the directory is made only the user's, and the cache is off (nothing
+    is loaded or stored) if it's someone else's or others can write to
+    it. A long running process can also keep the max_entries most
+    recently used trees in memory (they are shared by its runs, which
+    don't change them).
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES,
+                 max_entries=0):
+        self.directory = directory if directory is not None else default_dir()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict() # key -> StmtList
+        # bytes in the directory when it was last listed plus the bytes
+        # stored since (None until it's listed)
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source, options):
+        """The key of a program's source prepared with options (a tuple
+        of the settings that change the stored tree)."""
+        digest = hashlib.sha256()
+        digest.update(version().encode())
+        digest.update(repr(options).encode())
+        digest.update(_built_ins_key().encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def __private(self, create=False):
+        # whether the directory is the user's and only they can write to
+        # it (making it, with no access for others, if create is True)
+        try:
+            info = os.lstat(self.directory)
+        except FileNotFoundError:
+            if not create:
+                return False
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.directory)),
+                            exist_ok=True)
+                os.mkdir(self.directory, 0o700)
+            except OSError:
+                return False
+            return True
+        except OSError:
+            return False
+        return stat.S_ISDIR(info.st_mode) and info.st_uid == os.getuid() \
+            and not info.st_mode & 0o022
+
+    def load(self, key):
+        """Returns the StmtList stored under key, or None."""
+        stmt_list = self.entries.get(key)
+        if stmt_list is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return stmt_list
+        if not self.__private():
+            self.misses += 1
+            return None
+        path = self.__path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+            stmt_list = _loads(data)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # a truncated or stale entry
+            self.misses += 1
+            self.__remove(path)
+            return None
+        self.hits += 1
+        self.__remember(key, stmt_list)
+        return stmt_list
+
+    def __remember(self, key, stmt_list):
+        if self.max_entries > 0:
+            self.entries[key] = stmt_list
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def store(self, key, stmt_list):
+        """Stores stmt_list under key (if it can be pickled), then evicts
+        entries over the size limit. Returns True if it was stored.
+        Pickling slows down runs of stmt_list (see mypl_ast.ASTNode), so
+        it should be stored after it's run. The tree kept in memory is a
+        copy loaded from the stored data."""
+        try:
+            data = pickle.dumps(stmt_list, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError,
+                RecursionError):
+            # e.g., a built-in bound to a function that isn't importable
+            self.__remember(key, stmt_list)
+            return False
+        if self.max_entries > 0:
+            self.__remember(key, _loads(data))
+        if len(data) > self.max_bytes:
+            return False
+        if not self.__private(create=True):
+            return False
+        try:
+            # write to a temporary file first so a reader never sees a
+            # partly written entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory,
+                                             suffix='.tmp')
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self.__path(key))
+        except OSError:
+            self.__remove(temp_path)
+            return False
+        # only list the directory when it may be over the limit
+        if self.size is None or self.size + len(data) > self.max_bytes:
+            self.evict()
+        else:
+            self.size += len(data)
+        return True
+
+    def evict(self):
+        """Removes the least recently used entries until the directory
+        holds at most max_bytes."""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.__remove(path)
+            total -= size
+        self.size = total
+
+    def clear(self):
+        """Removes every entry."""
+        self.entries.clear()
+        max_bytes = self.max_bytes
+        self.max_bytes = 0
+        self.evict()
+        self.max_bytes = max_bytes
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
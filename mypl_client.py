@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+#
+# mypl_client.py
+# Description:
+#   Runs a MyPL program on a running mypl_server (a drop-in replacement
+#   for hw7.py that takes the same arguments). The server reads the
+#   program's input from, and writes its output to, this process's
+#   standard streams, which are passed to it over the socket. Without a
+#   server the program is run by hw7.py. The streams are only passed to
+#   a server run by the same user. Only standard library modules are
+#   imported, so the client starts quickly.
+#----------------------------------------------------------------------
+import os
+import socket
+import struct
+import sys
+
+# a request is a length (HEADER) followed by the working directory and
+# the arguments, each ending with a NUL byte; the reply is the exit
+# status (STATUS)
+HEADER = struct.Struct('!I')
+STATUS = struct.Struct('!i')
+# the pid, uid, and gid of SO_PEERCRED
+PEER_CREDS = struct.Struct('3i')
+
+
+def default_socket():
+    """The server socket path: $MYPL_SOCKET, or server.sock in the
+    directory mypl-<uid> of the user's runtime directory (or of the
+    temporary directory). The server keeps the socket's directory
+    private to the user."""
+    if os.environ.get('MYPL_SOCKET'):
+        return os.environ['MYPL_SOCKET']
+    directory = os.environ.get('XDG_RUNTIME_DIR') or \
+        os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(directory, 'mypl-%i' % os.getuid(), 'server.sock')
+
+
+def check_peer(sock, path):
+    """Raises PermissionError unless the process listening at the other
+    end of sock (connected to path) is run by this user, who is the
+    only one its standard streams may be passed to."""
+    if hasattr(socket, 'SO_PEERCRED'):
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                PEER_CREDS.size)
+        pid, uid, gid = PEER_CREDS.unpack(creds)
+    else:
+        # no peer credentials (e.g., on macOS), so trust the owner of
+        # the socket file
+        uid = os.lstat(path).st_uid
+    if uid != os.getuid():
+        raise PermissionError('the server at %s is run by another user '
+                              '(uid %i)' % (path, uid))
+
+
+def encode_request(cwd, argv):
+    payload = b''.join(os.fsencode(arg) + b'\0' for arg in [cwd] + argv)
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_request(data):
+    parts = [os.fsdecode(part) for part in data.split(b'\0')[:-1]]
+    return parts[0], parts[1:]
+
+
+def run(argv, path=None):
+    """Runs hw7.py with argv on the server listening at path (or the
+    default socket) and returns its exit status. Raises OSError if no
+    server is listening, and PermissionError if another user's is."""
+    if path is None:
+        path = default_socket()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        check_peer(sock, path)
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        request = encode_request(os.getcwd(), argv)
+        sent = socket.send_fds(sock, [request], [0, 1, 2])
+        if sent < len(request):
+            sock.sendall(request[sent:])
+        reply = b''
+        while len(reply) < STATUS.size:
+            data = sock.recv(STATUS.size - len(reply))
+            if not data:
+                # the worker died (e.g., it was killed)
+                return 1
+            reply += data
+        return STATUS.unpack(reply)[0]
+
+
+def main(argv):
+    try:
+        status = run(argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # no server, so run the program here
+        hw7 = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'hw7.py')
+        os.execv(sys.executable, [sys.executable, hw7] + argv)
+    except PermissionError as e:
+        sys.exit('mypl_client: %s' % e)
+    except KeyboardInterrupt:
+        status = 130
+    sys.exit(status)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,438 @@
+#!/usr/bin/python3
+#
+# mypl_compiler.py
+# Description:
+#   Lowers a resolved MyPL AST into flat bytecode for the MyPL VM
+#----------------------------------------------------------------------
+
+import mypl_token as token
+import mypl_ast as ast
+import mypl_resolver as resolver
+
+# opcodes (each instruction is an opcode followed by one int argument)
+LOAD_CONST = 0      # push consts[arg]
+LOAD_LOCAL = 1      # push locals[arg]
+STORE_LOCAL = 2     # locals[arg] = pop
+LOAD_GLOBAL = 3     # push globals[arg]
+STORE_GLOBAL = 4    # globals[arg] = pop
+LOAD_FIELD = 5      # push the field consts[arg] (a FieldRef) of pop
+STORE_FIELD = 6     # obj = pop; set field consts[arg] of obj to pop
+POP = 7             # discard the top of the stack
+JUMP = 8            # pc = arg
+JUMP_IF_FALSE = 9   # if not pop: pc = arg
+CALL = 10           # call the code below the arg arguments on the stack
+CALL_BUILT_IN = 11  # consts[arg] is (function, argc, token, check_nil)
+RETURN = 12         # return pop to the caller
+BUILD_STRUCT = 13   # push a struct with layout consts[arg] from the locals
+ADD = 14
+SUBTRACT = 15
+MULTIPLY = 16
+DIVIDE = 17
+MODULO = 18
+EQUAL = 19
+NOT_EQUAL = 20
+LESS_THAN = 21
+LESS_THAN_EQUAL = 22
+GREATER_THAN = 23
+GREATER_THAN_EQUAL = 24
+AND = 25
+OR = 26
+NOT = 27
+# superinstructions made by the peephole pass in Compiler.__emit
+ADD_CONST = 28            # top = top + consts[arg]
+SUBTRACT_CONST = 29       # top = top - consts[arg]
+JUMP_IF_NOT_EQUAL = 30    # rhs = pop; lhs = pop; if not lhs == rhs: pc = arg
+JUMP_IF_NOT_NOT_EQUAL = 31
+JUMP_IF_NOT_LESS_THAN = 32
+JUMP_IF_NOT_LESS_THAN_EQUAL = 33
+JUMP_IF_NOT_GREATER_THAN = 34
+JUMP_IF_NOT_GREATER_THAN_EQUAL = 35
+# field access at an index known from the struct's layout
+LOAD_FIELD_INDEX = 36     # top = top[arg]
+STORE_FIELD_INDEX = 37    # obj = pop; obj[arg] = pop
+LOAD_TEMPLATE = 38        # locals[:] = consts[arg]
+NEW = 39                  # replace the struct code on top with an instance
+BUILD_STRING = 40         # replace the top arg strings with their join
+# return from a pure function (caching the result if the call missed)
+RETURN_MEMO = 41
+# call the code in consts[arg] (code, argc) with the top argc arguments
+CALL_FUNCTION = 42
+# CALL_FUNCTION that replaces the running function (for return f(...))
+TAIL_CALL_FUNCTION = 43
+# + of strings (long results are ropes, see mypl_rope)
+CONCAT = 44
+
+OPNAMES = {value: name for name, value in globals().items()
+           if name.isupper() and isinstance(value, int)}
+
+MATH_OPS = {
+    token.PLUS: ADD,
+    token.MINUS: SUBTRACT,
+    token.MULTIPLY: MULTIPLY,
+    token.DIVIDE: DIVIDE,
+    token.MODULO: MODULO,
+}
+
+CONST_OPS = {
+    ADD: ADD_CONST,
+    SUBTRACT: SUBTRACT_CONST,
+}
+
+COMPARE_JUMPS = {
+    EQUAL: JUMP_IF_NOT_EQUAL,
+    NOT_EQUAL: JUMP_IF_NOT_NOT_EQUAL,
+    LESS_THAN: JUMP_IF_NOT_LESS_THAN,
+    LESS_THAN_EQUAL: JUMP_IF_NOT_LESS_THAN_EQUAL,
+    GREATER_THAN: JUMP_IF_NOT_GREATER_THAN,
+    GREATER_THAN_EQUAL: JUMP_IF_NOT_GREATER_THAN_EQUAL,
+}
+
+BOOL_RELS = {
+    token.EQUAL: EQUAL,
+    token.NOT_EQUAL: NOT_EQUAL,
+    token.LESS_THAN: LESS_THAN,
+    token.LESS_THAN_EQUAL: LESS_THAN_EQUAL,
+    token.GREATER_THAN: GREATER_THAN,
+    token.GREATER_THAN_EQUAL: GREATER_THAN_EQUAL,
+}
+
+
+class Code(object):
+    """A unit of compiled code: the program, a function body, or the
+    field initializers of a struct. Instructions are stored in one flat
+    list as opcode, argument pairs.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.instrs = [] # [op, arg, op, arg, ...]
+        self.consts = [] # constant pool
+        self.const_index = {} # (type, value) -> index in consts
+        self.num_locals = 0 # size of the frame
+        self.param_slots = [] # frame slot of each parameter
+        self.layout = None # struct layout (struct code only)
+        self.template = None # field values if all are constants (struct code)
+        self.pure = False # calls can be memoized (function code only)
+        self.float_params = False # a param is a float (function code only)
+        # None for each local after the params (function code only)
+        self.blank_locals = []
+        # pc -> operator token of each math instruction and field name
+        # token of each field access (for errors; the list of the
+        # chain's operators for a BUILD_STRING)
+        self.tokens = {}
+        self.codes = None # every Code of the program (program code only)
+    def __str__(self):
+        s = 'code %s (%i locals)\n' % (self.name, self.num_locals)
+        for pc in range(0, len(self.instrs), 2):
+            op, arg = self.instrs[pc], self.instrs[pc + 1]
+            s += '  %4i %-20s %i' % (pc, OPNAMES[op], arg)
+            if op in (LOAD_CONST, LOAD_FIELD, STORE_FIELD, CALL_BUILT_IN,
+                      CALL_FUNCTION, TAIL_CALL_FUNCTION, ADD_CONST,
+                      SUBTRACT_CONST, LOAD_TEMPLATE):
+                s += ' (%s)' % (self.consts[arg],)
+            s += '\n'
+        return s
+
+
+class Compiler(ast.Visitor):
+    """A MyPL visitor that compiles a resolved AST into Code objects.
+    Block scopes are flattened into the frame of the enclosing function
+    (or the program), so each variable is either a local of the running
+    code or a global (a slot in the program's frame).
+    """
+    def __init__(self):
+        self.program = None # the Code for the top-level statements
+        self.code = None # the Code being compiled
+        self.scopes = [] # [Code, base slot] for each resolver frame
+        self.fun_codes = {} # FunDeclStmt -> its Code (made at first use)
+        self.codes = [] # the Codes made so far
+
+    def compile(self, stmt_list):
+        if stmt_list.num_slots is None:
+            stmt_list.accept(resolver.Resolver())
+        self.program = self.__new_code('<program>')
+        self.program.codes = self.codes
+        self.code = self.program
+        self.program.num_locals = stmt_list.num_slots
+        self.scopes.append([self.program, 0])
+        self.__stmts(stmt_list)
+        self.scopes.pop()
+        self.__emit(LOAD_CONST, self.__const(None))
+        self.__emit(RETURN)
+        return self.program
+
+    def __new_code(self, name):
+        code = Code(name)
+        self.codes.append(code)
+        return code
+
+    def __emit(self, op, arg=0):
+        instrs = self.code.instrs
+        # fuse with the previous instruction when possible (jumps only
+        # ever target the start of a statement or condition, so the
+        # previous instruction is never a jump target here)
+        prev_op = instrs[-2] if instrs else None
+        if op in CONST_OPS and prev_op == LOAD_CONST:
+            instrs[-2] = CONST_OPS[op]
+            return len(instrs) - 2
+        if op == JUMP_IF_FALSE and prev_op in COMPARE_JUMPS:
+            instrs[-2] = COMPARE_JUMPS[prev_op]
+            instrs[-1] = arg
+            return len(instrs) - 2
+        instrs += [op, arg]
+        return len(instrs) - 2
+
+    def __patch(self, pc):
+        # point the jump at pc to the next instruction
+        self.code.instrs[pc + 1] = len(self.code.instrs)
+
+    def __const(self, value):
+        # equal values share a pool entry (the type keeps 1 and True apart)
+        key = (type(value), value)
+        if key not in self.code.const_index:
+            self.code.const_index[key] = len(self.code.consts)
+            self.code.consts.append(value)
+        return self.code.const_index[key]
+
+    def __address(self, depth, slot):
+        code, base = self.scopes[-1 - depth]
+        if code is self.code:
+            return LOAD_LOCAL, STORE_LOCAL, base + slot
+        return LOAD_GLOBAL, STORE_GLOBAL, base + slot
+
+    def __load(self, depth, slot):
+        load, store, index = self.__address(depth, slot)
+        self.__emit(load, index)
+
+    def __store(self, depth, slot):
+        load, store, index = self.__address(depth, slot)
+        self.__emit(store, index)
+
+    def __field(self, by_ref, by_index, field_ref, field_token):
+        # a field access, at a fixed index when the resolver found one
+        if field_ref.__class__ is int:
+            pc = self.__emit(by_index, field_ref)
+        else:
+            pc = self.__emit(by_ref, self.__const(field_ref))
+        self.code.tokens[pc] = field_token
+
+    def __stmts(self, stmt_list):
+        for stmt in stmt_list.stmts:
+            stmt.accept(self)
+
+    def __unit(self, name, num_slots, code=None):
+        # start compiling a new code unit, returning the outer one
+        outer = self.code
+        self.code = code if code is not None else self.__new_code(name)
+        self.code.num_locals = num_slots
+        self.scopes.append([self.code, 0])
+        return outer
+
+    def visit_stmt_list(self, stmt_list):
+        # a block gets fresh slots at the end of the current frame
+        base = self.code.num_locals
+        self.code.num_locals += stmt_list.num_slots
+        self.scopes.append([self.code, base])
+        self.__stmts(stmt_list)
+        self.scopes.pop()
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr.accept(self)
+        self.__emit(POP)
+
+    def visit_var_decl_stmt(self, var_decl):
+        var_decl.var_expr.accept(self)
+        self.__store(0, var_decl.slot)
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs.accept(self)
+        assign_stmt.lhs.accept(self)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        outer = self.__unit(struct_decl.struct_id.lexeme, struct_decl.num_slots)
+        # constant fields come from the template, the rest are run
+        if any(value is not None for value in struct_decl.template):
+            # (not pooled: equal tuples can hold values of other types)
+            self.code.consts.append(list(struct_decl.template))
+            self.__emit(LOAD_TEMPLATE, len(self.code.consts) - 1)
+        for var_decl in struct_decl.init_decls:
+            var_decl.accept(self)
+        self.code.layout = struct_decl.layout
+        if not struct_decl.init_decls:
+            # new can copy the template without running the code
+            self.code.template = struct_decl.template
+        self.__emit(BUILD_STRUCT, self.__const(struct_decl.layout))
+        self.__emit(RETURN)
+        struct_code = self.code
+        self.scopes.pop()
+        self.code = outer
+        self.__emit(LOAD_CONST, self.__const(struct_code))
+        self.__store(0, struct_decl.slot)
+
+    def __fun_code(self, fun_decl):
+        # a call can be compiled before the function it calls
+        if fun_decl not in self.fun_codes:
+            self.fun_codes[fun_decl] = self.__new_code(fun_decl.fun_name.lexeme)
+        return self.fun_codes[fun_decl]
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        outer = self.__unit(fun_decl.fun_name.lexeme, fun_decl.num_slots,
+                            self.__fun_code(fun_decl))
+        self.code.param_slots = [param.slot for param in fun_decl.params]
+        self.code.pure = fun_decl.pure
+        self.code.float_params = fun_decl.float_params
+        self.__stmts(fun_decl.stmt_list)
+        self.__emit(LOAD_CONST, self.__const(None))
+        self.__emit(RETURN_MEMO if self.code.pure else RETURN)
+        fun_code = self.code
+        fun_code.blank_locals = [None] * (fun_code.num_locals -
+                                          len(fun_decl.params))
+        self.scopes.pop()
+        self.code = outer
+        self.__emit(LOAD_CONST, self.__const(fun_code))
+        self.__store(0, fun_decl.slot)
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr.accept(self)
+        else:
+            self.__emit(LOAD_CONST, self.__const(None))
+        instrs = self.code.instrs
+        if instrs[-2] == CALL_FUNCTION and self.code is not self.program \
+           and not self.code.pure:
+            # a tail call returns the callee's result to our caller, so
+            # the callee can run in place of this function (a memoized
+            # function has to see its own result, so it can't)
+            instrs[-2] = TAIL_CALL_FUNCTION
+        else:
+            self.__emit(RETURN_MEMO if self.code.pure else RETURN)
+
+    def visit_while_stmt(self, while_stmt):
+        start = len(self.code.instrs)
+        while_stmt.bool_expr.accept(self)
+        exit_jump = self.__emit(JUMP_IF_FALSE)
+        while_stmt.stmt_list.accept(self)
+        self.__emit(JUMP, start)
+        self.__patch(exit_jump)
+
+    def visit_if_stmt(self, if_stmt):
+        end_jumps = []
+        for basic_if in [if_stmt.if_part] + if_stmt.elseifs:
+            basic_if.bool_expr.accept(self)
+            next_jump = self.__emit(JUMP_IF_FALSE)
+            basic_if.stmt_list.accept(self)
+            end_jumps.append(self.__emit(JUMP))
+            self.__patch(next_jump)
+        if if_stmt.has_else:
+            if_stmt.else_stmts.accept(self)
+        for pc in end_jumps:
+            self.__patch(pc)
+
+    def visit_simple_expr(self, simple_expr):
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        # push the operands of a chain left to right, then apply its
+        # operators right to left (a + (b + c))
+        ops = []
+        expr = complex_expr
+        while isinstance(expr, ast.ComplexExpr):
+            expr.first_operand.accept(self)
+            if expr.math_rel.tokentype == token.PLUS and \
+               expr.static_type == token.STRINGTYPE:
+                ops.append((CONCAT, expr.math_rel))
+            else:
+                ops.append((MATH_OPS[expr.math_rel.tokentype], expr.math_rel))
+            expr = expr.rest
+        expr.accept(self)
+        if complex_expr.concat:
+            pc = self.__emit(BUILD_STRING, len(ops) + 1)
+            self.code.tokens[pc] = [op_token for op, op_token in ops]
+            return
+        for op, op_token in reversed(ops):
+            self.code.tokens[self.__emit(op)] = op_token
+
+    def visit_bool_expr(self, bool_expr):
+        # both sides of and/or are always evaluated (like the Interpreter)
+        bool_expr.first_expr.accept(self)
+        if bool_expr.bool_rel is not None:
+            bool_expr.second_expr.accept(self)
+            self.__emit(BOOL_RELS[bool_expr.bool_rel.tokentype])
+        if bool_expr.bool_connector is not None:
+            bool_expr.rest.accept(self)
+            if bool_expr.bool_connector.tokentype == token.AND:
+                self.__emit(AND)
+            else:
+                self.__emit(OR)
+        if bool_expr.negated:
+            self.__emit(NOT)
+
+    def visit_lvalue(self, lval):
+        if len(lval.path) == 1:
+            self.__store(lval.depth, lval.slot)
+        else:
+            self.__load(lval.depth, lval.slot)
+            for field_ref, field_token in zip(lval.field_refs[:-1],
+                                              lval.path[1:]):
+                self.__field(LOAD_FIELD, LOAD_FIELD_INDEX, field_ref,
+                             field_token)
+            self.__field(STORE_FIELD, STORE_FIELD_INDEX, lval.field_refs[-1],
+                         lval.path[-1])
+
+    def visit_simple_rvalue(self, simple_rvalue):
+        val = simple_rvalue.val
+        if val.tokentype == token.INTVAL:
+            value = int(val.lexeme)
+        elif val.tokentype == token.FLOATVAL:
+            value = float(val.lexeme)
+        elif val.tokentype == token.BOOLVAL:
+            value = val.lexeme == 'true'
+        elif val.tokentype == token.STRINGVAL:
+            value = val.lexeme
+        else:
+            value = None
+        self.__emit(LOAD_CONST, self.__const(value))
+
+    def visit_const_rvalue(self, const_rvalue):
+        self.__emit(LOAD_CONST, self.__const(const_rvalue.value))
+
+    def visit_new_rvalue(self, new_rvalue):
+        # running a struct's code builds a new instance
+        self.__load(new_rvalue.depth, new_rvalue.slot)
+        self.__emit(NEW)
+
+    def visit_call_rvalue(self, call_rvalue):
+        if call_rvalue.built_in is not None:
+            for arg in call_rvalue.args:
+                arg.accept(self)
+            info = (call_rvalue.built_in.fun, len(call_rvalue.args),
+                    call_rvalue.fun, call_rvalue.check_nil)
+            self.__emit(CALL_BUILT_IN, self.__const(info))
+        elif self.__direct_call(call_rvalue):
+            # the callee's code is known, so it's not loaded from its slot
+            for arg in call_rvalue.args:
+                arg.accept(self)
+            info = (self.__fun_code(call_rvalue.fun_decl),
+                    len(call_rvalue.args))
+            self.__emit(CALL_FUNCTION, self.__const(info))
+        else:
+            self.__load(call_rvalue.depth, call_rvalue.slot)
+            for arg in call_rvalue.args:
+                arg.accept(self)
+            self.__emit(CALL, len(call_rvalue.args))
+
+    def __direct_call(self, call_rvalue):
+        # True if the call can be a CALL_FUNCTION: the callee is known,
+        # its params are its first locals and each gets an argument, and
+        # its calls aren't memoized
+        fun_decl = call_rvalue.fun_decl
+        if fun_decl is None or fun_decl.pure:
+            return False
+        param_slots = [param.slot for param in fun_decl.params]
+        return param_slots == list(range(len(call_rvalue.args)))
+
+    def visit_id_rvalue(self, id_rvalue):
+        self.__load(id_rvalue.depth, id_rvalue.slot)
+        for field_ref, field_token in zip(id_rvalue.field_refs,
+                                          id_rvalue.path[1:]):
+            self.__field(LOAD_FIELD, LOAD_FIELD_INDEX, field_ref,
+                         field_token)
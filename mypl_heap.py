@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+#
+# mypl_heap.py
+# Description:
+#   The MyPL object heap: struct instances with stable handles,
+#   reclamation, and allocation statistics
+#----------------------------------------------------------------------
+
+import gc
+import sys
+
+
+class StructLayout(object):
+    """The layout of a struct type: its field names in slot order and
+    the index of each field. Built once per struct declaration.
+    """
+    __slots__ = ('name', 'fields', 'index')
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields # [field_name] (position is the index)
+        self.index = {field: i for i, field in enumerate(fields)}
+
+
+class FieldRef(object):
+    """One field access in a path expression (the x in s.x). Remembers
+    the layout it last saw and the index of the field in it, so repeated
+    accesses to the same struct type skip the name lookup.
+    """
+    __slots__ = ('name', 'layout', 'index')
+    def __init__(self, name):
+        self.name = name
+        self.layout = None
+        self.index = None
+    def __offset(self, obj):
+        if obj.layout is not self.layout:
+            self.index = obj.layout.index[self.name]
+            self.layout = obj.layout
+        return self.index
+    def get(self, obj):
+        if obj.layout is self.layout:
+            return obj[self.index]
+        return obj[self.__offset(obj)]
+    def set(self, obj, value):
+        if obj.layout is self.layout:
+            obj[self.index] = value
+        else:
+            obj[self.__offset(obj)] = value
+
+
+class StructObject(list):
+    """A struct instance: a list of field values laid out by its
+    StructLayout. The handle is unique within its heap and is never
+    reused, so it stays a valid identity after other objects are
+    reclaimed.
+    """
+    __slots__ = ('layout', 'handle', 'heap')
+    def __init__(self, layout, values, handle, heap):
+        list.__init__(self, values)
+        self.layout = layout
+        self.handle = handle
+        self.heap = heap
+    def __del__(self):
+        self.heap.free(self)
+    def __bool__(self):
+        return True
+    # structs compare (and hash) by identity, not by field values
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
+    def __repr__(self):
+        return '<struct %s #%i>' % (self.layout.name, self.handle)
+
+
+class Heap(object):
+    """Allocates struct instances and keeps statistics about them.
+    Instances are reference counted (by python), so one is reclaimed as
+    soon as nothing refers to it. Instances in reference cycles (e.g., a
+    circular linked list) are reclaimed by a collection, which runs when
+    the number of live objects reaches a threshold. After each
+    collection the threshold is reset to twice the live objects left
+    (but never below the initial threshold).
+    """
+    def __init__(self, collect_threshold=100000):
+        self.next_handle = 1
+        self.allocated = 0 # objects allocated
+        self.reclaimed = 0 # objects reclaimed
+        self.bytes_allocated = 0
+        self.bytes_reclaimed = 0
+        self.collections = 0 # collections run
+        self.min_threshold = collect_threshold
+        self.threshold = collect_threshold
+
+    def __size(self, obj):
+        return sys.getsizeof(obj)
+
+    def allocate(self, layout, values):
+        obj = StructObject(layout, values, self.next_handle, self)
+        self.next_handle += 1
+        self.allocated += 1
+        self.bytes_allocated += self.__size(obj)
+        if self.allocated - self.reclaimed >= self.threshold:
+            self.collect()
+        return obj
+
+    def free(self, obj):
+        # called by python when the object is reclaimed
+        self.reclaimed += 1
+        self.bytes_reclaimed += self.__size(obj)
+
+    def collect(self):
+        gc.collect()
+        self.collections += 1
+        self.threshold = max(self.min_threshold, 2 * self.live_objects())
+
+    def live_objects(self):
+        return self.allocated - self.reclaimed
+
+    def stats(self):
+        return {
+            'live objects': self.live_objects(),
+            'live bytes': self.bytes_allocated - self.bytes_reclaimed,
+            'allocated': self.allocated,
+            'reclaimed': self.reclaimed,
+            'bytes reclaimed': self.bytes_reclaimed,
+            'collections': self.collections,
+        }
+
+    def __str__(self):
+        s = ''
+        for name, value in self.stats().items():
+            s += '%-16s %i\n' % (name + ':', value)
+        return s
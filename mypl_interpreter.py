@@ -2,33 +2,104 @@
 import mypl_token as token
 import mypl_ast as ast
 import mypl_error as error
-import mypl_symbol_table as sym_tbl
+import mypl_resolver as resolver
+import mypl_builtins as built_ins
+import mypl_heap as mheap
+import mypl_memo as memo
+import mypl_rope as rope
 
-class ReturnException(Exception): pass
+class Frame(object):
+    """A frame holds the values of the variables declared in one scope,
+    indexed by the slots assigned by the resolver, plus a link to the
+    frame of the enclosing scope.
+    """
+    __slots__ = ('values', 'parent')
+    def __init__(self, size, parent):
+        self.values = [None] * size
+        self.parent = parent
 
 class Interpreter(ast.Visitor):
     """A MyPL interpret visitor implementation"""
-    def __init__(self):
-        # initialize the symbol table (for ids -> values)
-        self.sym_table = sym_tbl.SymbolTable()
+    def __init__(self, memo_size=memo.DEFAULT_CACHE_SIZE, output=None,
+                 input_source=None):
+        # the frame of the innermost scope being executed
+        self.frame = None
         # holds the type of last expression type
         self.current_value = None
-        self.heap = {}
+        # set by a return until the call (or program) it ends is left
+        self.returning = False
+        # the CallRValues of the function calls running, outermost first
+        # (read by the sampling profiler)
+        self.calls = []
+        # allocates struct instances (and keeps heap statistics)
+        self.heap = mheap.Heap()
+        # result caches of pure functions (keyed by their declaration)
+        self.memo = memo.Memo(memo_size)
+        # where print writes (flushed when the run ends)
+        self.output = output if output is not None else built_ins.Output()
+        # where reads, readi, and readf read from
+        if input_source is None:
+            input_source = built_ins.Input()
+        self.input_source = input_source
         
     def run(self, stmt_list):
+        if stmt_list.num_slots is None:
+            stmt_list.accept(resolver.Resolver())
+        outer_output = built_ins.set_output(self.output)
+        outer_input = built_ins.set_input(self.input_source)
         try:
             stmt_list.accept(self)
-        except ReturnException:
-            pass
-        
+        finally:
+            self.output.flush()
+            built_ins.close_files()
+            built_ins.set_output(outer_output)
+            built_ins.set_input(outer_input)
+        self.returning = False
+
+    def run_more(self, stmt_list):
+        """Runs statements that extend the ones run so far by run_more
+        (as the REPL does) in one global frame, which grows to
+        stmt_list.num_slots (see Resolver.resolve_more)."""
+        if self.frame is None:
+            self.frame = Frame(0, None)
+        values = self.frame.values
+        values.extend([None] * (stmt_list.num_slots - len(values)))
+        outer_output = built_ins.set_output(self.output)
+        outer_input = built_ins.set_input(self.input_source)
+        try:
+            self._exec_stmts(stmt_list)
+        finally:
+            self.output.flush()
+            built_ins.set_output(outer_output)
+            built_ins.set_input(outer_input)
+            self.returning = False
+
     def __error(self, msg, the_token):
         raise error.MyPLError(msg, the_token.line, the_token.column)
         
+    def __frame_at(self, depth):
+        # walk up depth frames from the current one
+        frame = self.frame
+        while depth:
+            frame = frame.parent
+            depth -= 1
+        return frame
+
     def visit_stmt_list(self, stmt_list):
-        self.sym_table.push_environment()
+        outer = self.frame
+        self.frame = Frame(stmt_list.num_slots, outer)
+        try:
+            self._exec_stmts(stmt_list)
+        finally:
+            self.frame = outer
+
+    def _exec_stmts(self, stmt_list):
+        # run the statements in the current frame (no new scope), up to
+        # a return (overridden by mypl_profile.ProfilingInterpreter)
         for stmt in stmt_list.stmts:
             stmt.accept(self)
-        self.sym_table.pop_environment()
+            if self.returning:
+                return
         
 
     def visit_expr_stmt(self, expr_stmt):
@@ -36,31 +107,20 @@ class Interpreter(ast.Visitor):
    
     def visit_var_decl_stmt(self, var_decl):
         var_decl.var_expr.accept(self)
-        val = self.current_value
-        var_name = var_decl.var_id.lexeme
-        self.sym_table.add_id(var_decl.var_id.lexeme)
-        self.sym_table.set_info(var_decl.var_id.lexeme, val)
+        self.frame.values[var_decl.slot] = self.current_value
         
  
     def visit_assign_stmt(self, assign_stmt): 
         assign_stmt.rhs.accept(self)
-        rhs_val = self.current_value
-        
         assign_stmt.lhs.accept(self)
         
-        self.sym_table.set_info(assign_stmt.lhs, rhs_val)
-        
   
     def visit_struct_decl_stmt(self, struct_decl):
-        self.sym_table.add_id(struct_decl.struct_id.lexeme)
-        env_id = self.sym_table.get_env_id()
-        self.sym_table.set_info(struct_decl.struct_id.lexeme, [env_id, struct_decl])
+        self.frame.values[struct_decl.slot] = [self.frame, struct_decl]
          
        
     def visit_fun_decl_stmt(self, fun_decl):
-        env_id = self.sym_table.get_env_id()
-        self.sym_table.add_id(fun_decl.fun_name.lexeme)
-        self.sym_table.set_info(fun_decl.fun_name.lexeme, [env_id, fun_decl])
+        self.frame.values[fun_decl.slot] = [self.frame, fun_decl]
 
         
     def visit_return_stmt(self, return_stmt):
@@ -68,15 +128,29 @@ class Interpreter(ast.Visitor):
             return_stmt.return_expr.accept(self)
         else:
             self.current_value = None
-        raise ReturnException()
+        self.returning = True
         
                   
 
     def visit_while_stmt(self, while_stmt):
-        while_stmt.bool_expr.accept(self)
-        if self.current_value:
-            while_stmt.stmt_list.accept(self)
-            while_stmt.accept(self)
+        # the body gets a single frame for the whole loop, and iterations
+        # run in a python loop so the stack depth doesn't depend on the
+        # number of iterations (stale values from an earlier iteration
+        # are never read, since the resolver only binds a use to a
+        # declaration that comes before it)
+        outer = self.frame
+        body = Frame(while_stmt.stmt_list.num_slots, outer)
+        try:
+            while_stmt.bool_expr.accept(self)
+            while self.current_value:
+                self.frame = body
+                self._exec_stmts(while_stmt.stmt_list)
+                self.frame = outer
+                if self.returning:
+                    break
+                while_stmt.bool_expr.accept(self)
+        finally:
+            self.frame = outer
   
     def visit_if_stmt(self, if_stmt):
         elseStmt = True
@@ -102,82 +176,98 @@ class Interpreter(ast.Visitor):
         simple_expr.term.accept(self)
            
     def visit_complex_expr(self, complex_expr):
-        rel = complex_expr.math_rel.tokentype
         complex_expr.first_operand.accept(self)
         first_op = self.current_value
-        
-        if complex_expr.rest != None:
-            complex_expr.rest.accept(self)
-            second_op = self.current_value
-            
-            if complex_expr.math_rel != None:
-                if rel == token.PLUS:
-                    self.current_value = first_op + second_op
-                elif rel == token.MINUS:
-                    self.current_value = first_op - second_op
-                elif rel == token.DIVIDE:
-                    self.current_value = first_op / second_op
-                elif rel == token.MULTIPLY:
-                    self.current_value = first_op * second_op
-                elif rel == token.MODULO:
-                    self.current_value = first_op % second_op
-            else:
-                self.__error('Bad math operation', complex_expr.math_rel)
-        
+        rest = complex_expr.rest
+        if complex_expr.concat:
+            parts = [first_op]
+            while rest.__class__ is ast.ComplexExpr:
+                rest.first_operand.accept(self)
+                parts.append(self.current_value)
+                rest = rest.rest
+            rest.accept(self)
+            parts.append(self.current_value)
+            try:
+                self.current_value = ''.join(parts)
+            except TypeError:
+                # a part is a rope (or nil)
+                if None in parts:
+                    self.__concat_error(complex_expr, parts)
+                self.current_value = rope.join(parts)
+            return
+        if rest.__class__ is not ast.ComplexExpr:
+            rest.accept(self)
+            try:
+                self.current_value = complex_expr.op(first_op,
+                                                     self.current_value)
+            except TypeError:
+                self.__math_error(complex_expr, first_op, self.current_value)
+            return
+        # a longer chain: evaluate the operands left to right in a loop,
+        # then apply the operators right to left (a + (b + c))
+        exprs = [complex_expr]
+        operands = [first_op]
+        while rest.__class__ is ast.ComplexExpr:
+            rest.first_operand.accept(self)
+            exprs.append(rest)
+            operands.append(self.current_value)
+            rest = rest.rest
+        rest.accept(self)
+        value = self.current_value
+        for i in range(len(exprs) - 1, -1, -1):
+            try:
+                value = exprs[i].op(operands[i], value)
+            except TypeError:
+                self.__math_error(exprs[i], operands[i], value)
+        self.current_value = value
+
+    def __concat_error(self, complex_expr, parts):
+        # a part of a joined + chain is nil: report it at the operator an
+        # unjoined chain (applied right to left) fails at, the rightmost
+        # one next to a nil part
+        nil_index = max(i for i, part in enumerate(parts) if part is None)
+        for i in range(min(nil_index, len(parts) - 2)):
+            complex_expr = complex_expr.rest
+        self.__error('value is nil', complex_expr.math_rel)
+
+    def __math_error(self, complex_expr, lhs, rhs):
+        # an operator failed with a TypeError: report a nil operand (the
+        # other case is a program that wasn't type checked)
+        if lhs is None or rhs is None:
+            self.__error('value is nil', complex_expr.math_rel)
+        raise
+
     def visit_bool_expr(self, bool_expr):
         bool_expr.first_expr.accept(self)
-        lhs = self.current_value
-        if bool_expr.bool_rel != None:
-            rel = bool_expr.bool_rel.tokentype
+        if bool_expr.rel_op is not None:
+            lhs = self.current_value
             bool_expr.second_expr.accept(self)
-            rhs = self.current_value
-            if rel == token.EQUAL:
-                self.current_value = lhs == rhs
-            elif rel == token.GREATER_THAN_EQUAL:
-                self.current_value = lhs >= rhs
-            elif rel == token.GREATER_THAN:
-                self.current_value = lhs > rhs
-            elif rel == token.LESS_THAN_EQUAL:
-                self.current_value = lhs <= rhs
-            elif rel == token.LESS_THAN:
-                self.current_value = lhs < rhs
-            elif rel == token.NOT_EQUAL:
-                self.current_value = lhs != rhs
-            else:
-                self.current_value = True
-        else:
-            self.current_value = lhs
-                
-        if bool_expr.bool_connector != None:
+            self.current_value = bool_expr.rel_op(lhs, self.current_value)
+        if bool_expr.connector_op is not None:
             lhs = self.current_value
             bool_expr.rest.accept(self)
-            if bool_expr.bool_connector.tokentype == token.AND:
-                self.current_value = lhs and self.current_value
-            elif bool_expr.bool_connector.tokentype == token.OR:
-                self.current_value = lhs or self.current_value
-            
+            self.current_value = bool_expr.connector_op(lhs, self.current_value)
         if bool_expr.negated:
-            self.current_value = not self.current_value       
-            
+            self.current_value = not self.current_value
+
     def visit_lvalue(self, lval):
-        identifier = lval.path[0].lexeme
+        frame = self.__frame_at(lval.depth)
         if len(lval.path) == 1:
-            self.sym_table.set_info(identifier, self.current_value)
+            frame.values[lval.slot] = self.current_value
         else:
-            oid = self.sym_table.get_info(lval.path[0].lexeme)
-            struct_obj = self.heap[oid]
-            for path_id in lval.path[1:-1]:
-                identifier = path_id.lexeme
-                oid = struct_obj[identifier]
-                struct_obj = self.heap[oid]
-            identifier = lval.path[-1].lexeme
-            struct_obj[identifier] = self.current_value
-            self.sym_table.set_info(identifier, self.current_value)
+            struct_obj = self.__follow(frame.values[lval.slot],
+                                       lval.field_refs[:-1], lval.path)
+            field_ref = lval.field_refs[-1]
+            if struct_obj is None:
+                self.__error('value is nil', lval.path[-1])
+            if field_ref.__class__ is int:
+                struct_obj[field_ref] = self.current_value
+            else:
+                field_ref.set(struct_obj, self.current_value)
              
 
     def visit_fun_param(self, fun_param):
-        identifier = fun_param.param_name.lexeme
-        self.sym_table.set_info(identifier, self.current_value)
+        self.frame.values[fun_param.slot] = self.current_value
             
     def visit_simple_rvalue(self, simple_rvalue):
         if simple_rvalue.val.tokentype == token.INTVAL:
@@ -193,127 +283,111 @@ class Interpreter(ast.Visitor):
         elif simple_rvalue.val.tokentype == token.NIL:
             self.current_value = None
 
+
+    def visit_const_rvalue(self, const_rvalue):
+        self.current_value = const_rvalue.value
     
     def visit_new_rvalue(self, new_rvalue):
-        struct_info = self.sym_table.get_info(new_rvalue.struct_type.lexeme)
-        #for v_decl in struct_info[1].var_decls:
-            
-        env_id = self.sym_table.get_env_id()
-        self.sym_table.set_env_id(struct_info[0])
-        struct_obj = {}
-        self.sym_table.push_environment()
-        for v_decl in struct_info[1].var_decls:
-            v_decl.accept(self)
-            struct_obj[v_decl.var_id.lexeme] = self.current_value
-        self.sym_table.pop_environment()
-        self.sym_table.set_env_id(env_id)
-        oid = id(struct_obj)
-        self.heap[oid] = struct_obj
-        self.current_value = oid
+        struct_info = self.__frame_at(new_rvalue.depth).values[new_rvalue.slot]
+        struct_decl = struct_info[1]
+        if not struct_decl.init_decls:
+            # every field is a constant
+            self.current_value = self.heap.allocate(struct_decl.layout,
+                                                    struct_decl.template)
+            return
+        # run the other field initializers in a frame (on the defining
+        # frame) that starts as a copy of the template; its slots are the
+        # field indexes of the layout
+        outer = self.frame
+        frame = Frame(0, struct_info[0])
+        frame.values = struct_decl.template[:]
+        self.frame = frame
+        try:
+            for v_decl in struct_decl.init_decls:
+                v_decl.accept(self)
+        finally:
+            self.frame = outer
+        self.current_value = self.heap.allocate(struct_decl.layout, frame.values)
         
     def visit_call_rvalue(self, call_rvalue):
-        # handle built in functions first
-        built_ins = ['print', 'length', 'get', 'readi', 'reads', 'readf', 'itof', 'itos', 'ftos', 'stoi', 'stof']
-        if call_rvalue.fun.lexeme in built_ins:
-            self.__built_in_fun_helper(call_rvalue)
+        if call_rvalue.built_in is not None:
+            self._call_built_in(call_rvalue)
         else:
-            fun_info = self.sym_table.get_info(call_rvalue.fun.lexeme)
-            env_id = self.sym_table.get_env_id()
-            fun_args = []
-            for i, arg in enumerate(call_rvalue.args):
-                call_rvalue.args[i].accept(self)
-                fun_args.append(self.current_value)
-            self.sym_table.set_env_id(fun_info[0])
-            self.sym_table.push_environment()
-            i = 0
-            while i < len(fun_args):
-                if not self.sym_table.id_exists(fun_info[1].params[i].param_name.lexeme):
-                    self.sym_table.add_id(fun_info[1].params[i].param_name.lexeme)
-                self.sym_table.set_info(fun_info[1].params[i].param_name.lexeme,fun_args[i])
-                i = i+1
+            # the callee is bound to the call when the resolver knows it,
+            # and is declared in (so runs on) the frame holding its slot
+            parent = self.__frame_at(call_rvalue.depth)
+            fun_decl = call_rvalue.fun_decl
+            if fun_decl is None:
+                parent, fun_decl = parent.values[call_rvalue.slot]
+            # params and body locals share one frame, and the arguments
+            # are stored right into their slots
+            frame = Frame(fun_decl.num_slots, parent)
+            values = frame.values
+            params = fun_decl.params
+            for param, arg in zip(params, call_rvalue.args):
+                arg.accept(self)
+                values[param.slot] = self.current_value
+            if len(call_rvalue.args) > len(params):
+                for arg in call_rvalue.args[len(params):]:
+                    arg.accept(self)
+            cache = None
+            if fun_decl.pure and self.memo.max_size > 0:
+                cache = self.memo.cache_for(fun_decl, fun_decl.fun_name.lexeme)
+                key = tuple([values[param.slot] for param in params])
+                if fun_decl.float_params:
+                    key = memo.float_key(key)
+                value = cache.get(key)
+                if value is not memo.MISSING:
+                    self.current_value = value
+                    return
+            outer = self.frame
+            self.frame = frame
+            calls = self.calls
+            calls.append(call_rvalue)
             try:
-                fun_info[1].stmt_list.accept(self)
-            except ReturnException:
-                pass
-            self.sym_table.pop_environment()
-            self.sym_table.set_env_id(env_id)
+                self._exec_stmts(fun_decl.stmt_list)
+            except RecursionError:
+                # each call nests python calls (the VM's calls don't)
+                self.__error('recursion too deep (try --vm)', call_rvalue.fun)
+            finally:
+                self.frame = outer
+                calls.pop()
+            self.returning = False
+            if cache is not None:
+                cache.put(key, self.current_value)
 
 
     
     def visit_id_rvalue(self, id_rvalue):
-        var_name = id_rvalue.path[0].lexeme
-        var_val = self.sym_table.get_info(var_name)
+        var_val = self.__frame_at(id_rvalue.depth).values[id_rvalue.slot]
+        if id_rvalue.field_refs:
+            var_val = self.__follow(var_val, id_rvalue.field_refs,
+                                    id_rvalue.path)
         self.current_value = var_val
+
+    def __follow(self, var_val, field_refs, path):
+        # the value at the end of a path's fields (index or FieldRef each)
+        for i, field_ref in enumerate(field_refs):
+            if var_val is None:
+                self.__error('value is nil', path[i + 1])
+            if field_ref.__class__ is int:
+                var_val = var_val[field_ref]
+            else:
+                var_val = field_ref.get(var_val)
+        return var_val
         
-        if len(id_rvalue.path) > 1:
-            oid = self.current_value
-            rval = self.heap[oid]
-            for path_id in id_rvalue.path[1:]:
-                var_val = rval[path_id.lexeme]
-                try:
-                    if self.heap[oid]:
-                        oid = rval[path_id.lexeme]
-                        rval = self.heap[oid]
-                except:
-                    pass
-            self.current_value = var_val
-        
-    def __built_in_fun_helper(self, call_rvalue):
-        fun_name = call_rvalue.fun.lexeme
+    def _call_built_in(self, call_rvalue):
         arg_vals = []
-        #... evaluate each call argument and store in arg_vals ...
-        for i, arg in enumerate(call_rvalue.args):
-            call_rvalue.args[i].accept(self)
+        for arg in call_rvalue.args:
+            arg.accept(self)
             arg_vals.append(self.current_value)
-        # check for nil values
-        for i, arg in enumerate(arg_vals):
-            if arg is None:
-                self.__error('value is nil', call_rvalue.fun)
-        # perform each function
-        if fun_name == 'print':
-            arg_vals[0] = arg_vals[0].replace(r'\n','\n')
-            print(arg_vals[0], end = '')
-        elif fun_name == 'length':
-            self.current_value = len(arg_vals[0])
-        elif fun_name == 'get':
-            if 0 <= arg_vals[0] < len(arg_vals[1]):
-                self.current_value = arg_vals[1][arg_vals[0]]
-            else:
-                self.__error('out of range', call_rvalue.fun)
-        elif fun_name == 'reads':
-            self.current_value = input()
-        elif fun_name == 'readi':
-            try:
-                self.current_value = int(input())
-            except ValueError:
-                self.__error('bad int value', call_rvalue.fun)
-        elif fun_name == 'readf':
-            try:
-                self.current_value = float(input())
-            except ValueError:
-                self.__error('bad float value', call_rvalue.fun)
-        elif fun_name == 'itof':
-            try:
-                self.current_value = float(arg_vals[0])
-            except ValueError:
-                self.__error('bad float value', call_rvalue.fun)
-        elif fun_name == 'itos':
-            try:
-                self.current_value = str(arg_vals[0])
-            except ValueError:
-                self.__error('bad string value', call_rvalue.fun)
-        elif fun_name == 'ftos':
-            try:
-                self.current_value = str(arg_vals[0])
-            except ValueError:
-                self.__error('bad string value', call_rvalue.fun)
-        elif fun_name == 'stoi':
-            try:
-                self.current_value = int(arg_vals[0])
-            except ValueError:
-                self.__error('bad int value', call_rvalue.fun)
-        elif fun_name == 'stof':
-            try:
-                self.current_value = float(arg_vals[0])
-            except ValueError:
-                self.__error('bad float value', call_rvalue.fun)
\ No newline at end of file
+        self._apply_built_in(call_rvalue, arg_vals)
+
+    def _apply_built_in(self, call_rvalue, arg_vals):
+        # call the built-in of call_rvalue on the values of its arguments
+        if call_rvalue.check_nil and None in arg_vals:
+            self.__error('value is nil', call_rvalue.fun)
+        try:
+            self.current_value = call_rvalue.built_in.fun(*arg_vals)
+        except built_ins.BuiltInError as e:
+            self.__error(str(e), call_rvalue.fun)
@@ -1,3 +1,4 @@
+import re
 import mypl_token as token
 import mypl_error as error
 
@@ -151,7 +152,8 @@ class Lexer(object):
                     break
             self.__read()
             self.column +=1
-            return token.Token(token.STRINGVAL, symbol, self.line, col)
+            return token.Token(token.STRINGVAL, decode_string(symbol),
+                               self.line, col)
         
         elif symbol.isalpha():
             col = self.column -1
@@ -208,4 +210,231 @@ class Lexer(object):
             else:
                 return token.Token(token.ID, symbol, self.line, col)
                 
-        
\ No newline at end of file
+        
+
+KEYWORDS = {
+    'and': token.AND,
+    'or': token.OR,
+    'not': token.NOT,
+    'bool': token.BOOLTYPE,
+    'int': token.INTTYPE,
+    'float': token.FLOATTYPE,
+    'string': token.STRINGTYPE,
+    'struct': token.STRUCTTYPE,
+    'while': token.WHILE,
+    'do': token.DO,
+    'if': token.IF,
+    'then': token.THEN,
+    'else': token.ELSE,
+    'elif': token.ELIF,
+    'end': token.END,
+    'fun': token.FUN,
+    'var': token.VAR,
+    'set': token.SET,
+    'return': token.RETURN,
+    'new': token.NEW,
+    'nil': token.NIL,
+    'true': token.BOOLVAL,
+    'false': token.BOOLVAL,
+}
+
+SYMBOLS = {
+    ',': token.COMMA,
+    ':': token.COLON,
+    '/': token.DIVIDE,
+    '.': token.DOT,
+    '(': token.LPAREN,
+    ')': token.RPAREN,
+    '-': token.MINUS,
+    '%': token.MODULO,
+    '*': token.MULTIPLY,
+    '+': token.PLUS,
+    ';': token.SEMICOLON,
+}
+
+# symbols that are a different token when followed by '='
+EQUAL_SYMBOLS = {
+    '=': (token.ASSIGN, token.EQUAL),
+    '>': (token.GREATER_THAN, token.GREATER_THAN_EQUAL),
+    '<': (token.LESS_THAN, token.LESS_THAN_EQUAL),
+    '!': (None, token.NOT_EQUAL),
+}
+
+# the escapes a string literal can have (decoded once, by the lexer)
+ESCAPES = {
+    r'\n': '\n',
+}
+
+def decode_string(text):
+    """Returns the value of a string literal from its text between the
+    quotes (with escapes replaced by the characters they stand for)."""
+    if '\\' in text:
+        for escape, char in ESCAPES.items():
+            text = text.replace(escape, char)
+    return text
+
+WHITESPACE = re.compile(r'\s*')
+WORD = re.compile(r'\w*')
+
+
+class BufferedLexer(object):
+    """A lexer that reads the whole source into one buffer and scans it
+    by index (with compiled patterns for whitespace and identifiers)
+    instead of calling tell/read/seek for every character. It produces
+    the same tokens, with the same line and column values, as Lexer.
+    """
+    def __init__(self, input_stream):
+        self.line = 1
+        self.column = 0
+        self.buffer = input_stream.read()
+        self.pos = 0
+
+    def __error(self, msg, line, column):
+        raise error.MyPLError(msg, line, column)
+
+    def __skip(self):
+        # skip whitespace and comments, keeping line and column in step
+        # with Lexer (a comment counts as one column and doesn't reset it)
+        buf = self.buffer
+        while True:
+            end = WHITESPACE.match(buf, self.pos).end()
+            if end != self.pos:
+                newline = buf.rfind('\n', self.pos, end)
+                if newline != -1:
+                    self.line += buf.count('\n', self.pos, newline + 1)
+                    self.column = end - newline
+                else:
+                    self.column += end - self.pos
+                self.pos = end
+            if not buf.startswith('#', self.pos):
+                return
+            self.column += 1
+            newline = buf.find('\n', self.pos)
+            if newline == -1:
+                self.pos = len(buf)
+                return
+            self.line += 1
+            self.pos = newline + 1
+
+    def next_token(self):
+        tokentype, start, end, line, column = self.__scan()
+        lexeme = self.buffer[start:end]
+        if tokentype == token.STRINGVAL:
+            lexeme = decode_string(lexeme)
+        return token.Token(tokentype, lexeme, line, column)
+
+    def tokenize(self):
+        """Lexes the rest of the source into a token.TokenBuffer (ending
+        with EOS) without making a Token for each token."""
+        tokens = token.TokenBuffer(self.buffer)
+        add_type = tokens.types.append
+        add_start = tokens.starts.append
+        add_end = tokens.ends.append
+        add_line = tokens.lines.append
+        add_column = tokens.columns.append
+        buf = self.buffer
+        scan = self.__scan
+        stringval = token.STRINGVAL
+        eos = token.EOS
+        while True:
+            tokentype, start, end, line, column = scan()
+            if tokentype == stringval and buf.find('\\', start, end) != -1:
+                tokens.lexemes[len(tokens.types)] = \
+                    decode_string(buf[start:end])
+            add_type(tokentype)
+            add_start(start)
+            add_end(end)
+            add_line(line)
+            add_column(column)
+            if tokentype == eos:
+                return tokens
+
+    def __scan(self):
+        # the next token's type, the start and end of its text in the
+        # buffer, and its line and column
+        self.__skip()
+        buf = self.buffer
+        pos = self.pos
+        symbol = buf[pos:pos + 1]
+        pos += 1
+        self.column += 1
+        line = self.line
+
+        if symbol == '':
+            self.pos = len(buf)
+            return token.EOS, self.pos, self.pos, line, self.column - 1
+
+        tokentype = SYMBOLS.get(symbol)
+        if tokentype is not None:
+            self.pos = pos
+            return tokentype, pos - 1, pos, line, self.column
+
+        if symbol in EQUAL_SYMBOLS:
+            single, double = EQUAL_SYMBOLS[symbol]
+            if buf.startswith('=', pos):
+                self.pos = pos + 1
+                col = self.column
+                self.column += 1
+                return double, pos - 1, pos + 1, line, col
+            if single is None:
+                self.__error('unexpected symbol', line, self.column)
+            self.pos = pos
+            return single, pos - 1, pos, line, self.column
+
+        if symbol == '"':
+            col = self.column - 1
+            end = buf.find('"', pos)
+            if end == -1:
+                self.__error('unterminated string', line, col)
+            # Lexer doesn't count the opening quote of a non-empty string
+            self.pos = end + 1
+            self.column += max(end - pos, 1)
+            return token.STRINGVAL, pos, end, line, col
+
+        if symbol.isdigit():
+            return self.__number(symbol, pos)
+
+        if symbol.isalpha():
+            col = self.column - 1
+            word = WORD.match(buf, pos).group()
+            if not word.isascii():
+                # \w also matches numeric characters that Lexer stops at
+                for i, c in enumerate(word):
+                    if not (c.isalpha() or c.isdigit() or c == '_'):
+                        word = word[:i]
+                        break
+            self.pos = pos + len(word)
+            self.column += len(word)
+            return (KEYWORDS.get(symbol + word, token.ID), pos - 1, self.pos,
+                    line, col)
+
+        self.__error('unexpected symbol', line, self.column)
+
+    def __number(self, symbol, pos):
+        buf = self.buffer
+        line = self.line
+        col = self.column - 1
+        start = pos - 1
+        if symbol == '0' and buf[pos:pos + 1].isdigit():
+            self.__error('unexpected number', line, self.column)
+        flt = False
+        while True:
+            c = buf[pos:pos + 1]
+            if not (c.isdigit() or c == '.'):
+                break
+            pos += 1
+            self.column += 1
+            if c == '.':
+                if flt:
+                    self.__error('invalid number', line, col)
+                elif not buf[pos:pos + 1].isdigit():
+                    self.__error('missing digit in float value', line, self.column)
+                pos += 1
+                self.column += 1
+                flt = True
+        if buf[pos:pos + 1].isalpha():
+            self.__error('unexpected symbol', line, self.column)
+        self.pos = pos
+        if flt:
+            return token.FLOATVAL, start, pos, line, col
+        return token.INTVAL, start, pos, line, col
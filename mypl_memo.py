@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+#
+# mypl_memo.py
+# Description:
+#   Purity analysis of MyPL functions and the per-function LRU result
+#   caches used to memoize calls to pure functions
+#----------------------------------------------------------------------
+
+import collections
+
+import mypl_token as token
+import mypl_ast as ast
+
+# parameter and return types a pure function can have
+PURE_TYPES = [token.INTTYPE, token.FLOATTYPE, token.BOOLTYPE, token.STRINGTYPE]
+
+# results kept per function (unless configured otherwise)
+DEFAULT_CACHE_SIZE = 1024
+
+# marks a result that isn't cached
+MISSING = object()
+
+
+class PurityAnalyzer(ast.Visitor):
+    """A MyPL visitor (run after the resolver) that marks each function
+    whose result depends only on its arguments as pure. A pure function
+    takes and returns only primitive values (int, float, bool, string),
+    calls no built-ins with side effects (e.g., print or reads), reads
+    and writes no variables outside of its own frame, sets no struct
+    fields, creates no structs, and calls only pure functions. Caching
+    relies on arguments having their declared types (so the type checker
+    should have run), since 1, 1.0, and true are equal python keys.
+    """
+    def __init__(self):
+        self.frames = [] # list of {slot:FunDeclStmt} (None if not a fun)
+        self.funs = [] # stack of (FunDeclStmt, index of its frame)
+        self.impure = set() # functions known to be impure
+        self.callees = {} # FunDeclStmt -> set of FunDeclStmt it calls
+        self.fun_decls = [] # every function seen
+
+    def __push_frame(self, stmts):
+        # functions declared in the frame (a slot reused by anything
+        # else doesn't name a known function)
+        frame = {}
+        for stmt in stmts:
+            if isinstance(stmt, ast.FunDeclStmt):
+                frame[stmt.slot] = stmt if stmt.slot not in frame else None
+            elif isinstance(stmt, (ast.VarDeclStmt, ast.StructDeclStmt)):
+                frame[stmt.slot] = None
+        self.frames.append(frame)
+
+    def __not_pure(self):
+        if self.funs:
+            self.impure.add(self.funs[-1][0])
+
+    def __is_local(self, depth):
+        # True if depth refers to the current function's own frames
+        if not self.funs:
+            return True
+        return len(self.frames) - 1 - depth >= self.funs[-1][1]
+
+    def __finish(self):
+        # a function that calls an impure function is impure
+        changed = True
+        while changed:
+            changed = False
+            for fun_decl in self.fun_decls:
+                if fun_decl not in self.impure and \
+                   not self.callees[fun_decl].isdisjoint(self.impure):
+                    self.impure.add(fun_decl)
+                    changed = True
+        for fun_decl in self.fun_decls:
+            fun_decl.pure = fun_decl not in self.impure
+
+    def __visit_stmts(self, stmts):
+        for stmt in stmts:
+            stmt.accept(self)
+
+    def visit_stmt_list(self, stmt_list):
+        is_program = not self.frames
+        self.__push_frame(stmt_list.stmts)
+        self.__visit_stmts(stmt_list.stmts)
+        self.frames.pop()
+        if is_program:
+            self.__finish()
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr.accept(self)
+
+    def visit_var_decl_stmt(self, var_decl):
+        var_decl.var_expr.accept(self)
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs.accept(self)
+        assign_stmt.lhs.accept(self)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        # field initializers only run on new (which isn't pure)
+        pass
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        self.fun_decls.append(fun_decl)
+        self.callees[fun_decl] = set()
+        # params and body locals share the function's frame
+        self.__push_frame(fun_decl.stmt_list.stmts)
+        self.funs.append((fun_decl, len(self.frames) - 1))
+        types = [param.param_type for param in fun_decl.params]
+        types.append(fun_decl.return_type)
+        for type_token in types:
+            if type_token is None or type_token.tokentype not in PURE_TYPES:
+                self.__not_pure()
+        fun_decl.float_params = any(
+            param.param_type.tokentype == token.FLOATTYPE
+            for param in fun_decl.params if param.param_type is not None)
+        self.__visit_stmts(fun_decl.stmt_list.stmts)
+        self.funs.pop()
+        self.frames.pop()
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr.accept(self)
+
+    def visit_while_stmt(self, while_stmt):
+        while_stmt.bool_expr.accept(self)
+        while_stmt.stmt_list.accept(self)
+
+    def visit_if_stmt(self, if_stmt):
+        for basic_if in [if_stmt.if_part] + if_stmt.elseifs:
+            basic_if.bool_expr.accept(self)
+            basic_if.stmt_list.accept(self)
+        if if_stmt.has_else:
+            if_stmt.else_stmts.accept(self)
+
+    def visit_simple_expr(self, simple_expr):
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        # follow a chain of operators in a loop (chains can be long)
+        expr = complex_expr
+        while isinstance(expr, ast.ComplexExpr):
+            expr.first_operand.accept(self)
+            expr = expr.rest
+        expr.accept(self)
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr.accept(self)
+        if bool_expr.bool_rel is not None:
+            bool_expr.second_expr.accept(self)
+        if bool_expr.bool_connector is not None:
+            bool_expr.rest.accept(self)
+
+    def visit_lvalue(self, lval):
+        if len(lval.path) > 1 or not self.__is_local(lval.depth):
+            self.__not_pure()
+
+    def visit_simple_rvalue(self, simple_rvalue):
+        pass
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.__not_pure()
+
+    def visit_call_rvalue(self, call_rvalue):
+        for arg in call_rvalue.args:
+            arg.accept(self)
+        if not self.funs:
+            return
+        if call_rvalue.built_in is not None:
+            if not call_rvalue.built_in.pure:
+                self.__not_pure()
+            return
+        frame = self.frames[len(self.frames) - 1 - call_rvalue.depth]
+        callee = frame.get(call_rvalue.slot)
+        if callee is None:
+            self.__not_pure()
+        else:
+            self.callees[self.funs[-1][0]].add(callee)
+
+    def visit_id_rvalue(self, id_rvalue):
+        if not self.__is_local(id_rvalue.depth):
+            self.__not_pure()
+
+
+def float_key(key):
+    """The cache key of arguments (a tuple) with floats among them: each
+    float is replaced by its hex, since 0.0 and -0.0 are equal keys but
+    ftos tells them apart."""
+    return tuple([arg.hex() if arg.__class__ is float else arg
+                  for arg in key])
+
+
+class ResultCache(object):
+    """The cached results of one pure function, keyed by the tuple of its
+    arguments. When full, the least recently used result is dropped.
+    """
+    def __init__(self, name, max_size):
+        self.name = name
+        self.max_size = max_size
+        self.results = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # the cached result, or MISSING
+        value = self.results.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.results[key] = value
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+
+class Memo(object):
+    """The result caches of one run, one per pure function (a function
+    declaration or its compiled code). A max_size of 0 turns caching off.
+    """
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.caches = {} # function -> ResultCache
+
+    def cache_for(self, fun, name):
+        cache = self.caches.get(fun)
+        if cache is None:
+            cache = ResultCache(name, self.max_size)
+            self.caches[fun] = cache
+        return cache
+
+    def stats(self):
+        return {cache.name: (cache.hits, cache.misses, len(cache.results))
+                for cache in self.caches.values()}
+
+    def __str__(self):
+        s = '%-16s %10s %10s %10s\n' % ('function', 'hits', 'misses',
+                                        'cached')
+        for cache in self.caches.values():
+            s += '%-16s %10i %10i %10i\n' % (cache.name, cache.hits,
+                                             cache.misses, len(cache.results))
+        return s
@@ -0,0 +1,264 @@
+#!/usr/bin/python3
+#
+# mypl_optimizer.py
+# Description:
+#   Optional AST pass that converts literals to python values, folds
+#   constant expressions, and removes if/while branches that can't run
+#----------------------------------------------------------------------
+
+import mypl_token as token
+import mypl_ast as ast
+import mypl_builtins as built_ins
+
+# marks an expression whose value isn't known until run time
+NOT_CONST = object()
+
+# folded strings longer than this are left to be built at run time
+MAX_FOLDED_STRING = 4096
+
+
+def literal_value(the_token):
+    """Returns the python value of a literal token (as the Interpreter
+    evaluates it)."""
+    if the_token.tokentype == token.INTVAL:
+        return int(the_token.lexeme)
+    elif the_token.tokentype == token.FLOATVAL:
+        return float(the_token.lexeme)
+    elif the_token.tokentype == token.BOOLVAL:
+        return the_token.lexeme != 'false'
+    elif the_token.tokentype == token.STRINGVAL:
+        return the_token.lexeme
+    return None
+
+
+class Optimizer(ast.Visitor):
+    """A MyPL visitor that rewrites the AST in place. Literal rvalues
+    become ConstRValue nodes holding their python value, ComplexExpr and
+    BoolExpr subtrees with only constant operands are replaced by their
+    value, and if/while statements with constant conditions lose the
+    branches that can never run. Folding uses the same python operations
+    as the Interpreter, and anything that would fail (e.g., division by
+    zero) is left to fail at run time.
+    """
+    def __init__(self):
+        # value of the last expression (or NOT_CONST)
+        self.current_const = NOT_CONST
+        # token to place a folded constant at
+        self.const_token = None
+        # set when the last statement should be dropped
+        self.remove_stmt = False
+
+    def __const_expr(self, value, the_token):
+        const_rvalue = ast.ConstRValue()
+        const_rvalue.value = value
+        if value is None:
+            tokentype, lexeme = token.NIL, 'nil'
+            static_type = token.NIL
+        elif isinstance(value, bool):
+            tokentype, lexeme = token.BOOLVAL, 'true' if value else 'false'
+            static_type = token.BOOLTYPE
+        elif isinstance(value, int):
+            tokentype, lexeme = token.INTVAL, str(value)
+            static_type = token.INTTYPE
+        elif isinstance(value, float):
+            tokentype, lexeme = token.FLOATVAL, repr(value)
+            static_type = token.FLOATTYPE
+        else:
+            tokentype, lexeme = token.STRINGVAL, value
+            static_type = token.STRINGTYPE
+        const_rvalue.val = token.Token(tokentype, lexeme, the_token.line,
+                                       the_token.column)
+        simple_expr = ast.SimpleExpr()
+        simple_expr.term = const_rvalue
+        simple_expr.static_type = static_type
+        return simple_expr
+
+    def __is_const_expr(self, expr):
+        return isinstance(expr, ast.SimpleExpr) and \
+            isinstance(expr.term, ast.ConstRValue)
+
+    def __fold(self, expr):
+        # optimize expr, returning the node to use in its place
+        expr.accept(self)
+        if self.current_const is NOT_CONST or self.__is_const_expr(expr):
+            return expr
+        return self.__const_expr(self.current_const, self.const_token)
+
+    def __fold_bool(self, bool_expr):
+        # like __fold, but the result stays a BoolExpr
+        bool_expr.accept(self)
+        if self.current_const is NOT_CONST:
+            return bool_expr
+        if self.__is_const_expr(bool_expr.first_expr) and \
+           bool_expr.bool_rel is None and bool_expr.bool_connector is None \
+           and not bool_expr.negated:
+            return bool_expr
+        folded = ast.BoolExpr()
+        folded.first_expr = self.__const_expr(self.current_const,
+                                              self.const_token)
+        return folded
+
+    def __cond(self, bool_expr):
+        # fold a condition, returning it and True/False if it's constant
+        bool_expr = self.__fold_bool(bool_expr)
+        if self.current_const is NOT_CONST:
+            return bool_expr, None
+        return bool_expr, bool(self.current_const)
+
+    def visit_stmt_list(self, stmt_list):
+        stmts = []
+        for stmt in stmt_list.stmts:
+            self.remove_stmt = False
+            stmt.accept(self)
+            if not self.remove_stmt:
+                stmts.append(stmt)
+        self.remove_stmt = False
+        stmt_list.stmts = stmts
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr = self.__fold(expr_stmt.expr)
+
+    def visit_var_decl_stmt(self, var_decl):
+        var_decl.var_expr = self.__fold(var_decl.var_expr)
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs = self.__fold(assign_stmt.rhs)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        for var_decl in struct_decl.var_decls:
+            var_decl.accept(self)
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        fun_decl.stmt_list.accept(self)
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr = self.__fold(return_stmt.return_expr)
+
+    def visit_while_stmt(self, while_stmt):
+        while_stmt.bool_expr, is_true = self.__cond(while_stmt.bool_expr)
+        if is_true is False:
+            self.remove_stmt = True
+            return
+        while_stmt.stmt_list.accept(self)
+
+    def visit_if_stmt(self, if_stmt):
+        # keep the branches that can run, stopping at one that always does
+        branches = []
+        always = False
+        for basic_if in [if_stmt.if_part] + if_stmt.elseifs:
+            basic_if.bool_expr, is_true = self.__cond(basic_if.bool_expr)
+            if is_true is False:
+                continue
+            basic_if.stmt_list.accept(self)
+            branches.append(basic_if)
+            if is_true:
+                always = True
+                break
+        if if_stmt.has_else and not always:
+            if_stmt.else_stmts.accept(self)
+            if not branches:
+                # only the else part is left, and it always runs
+                basic_if = ast.BasicIf()
+                basic_if.bool_expr = ast.BoolExpr()
+                basic_if.bool_expr.first_expr = self.__const_expr(
+                    True, self.const_token)
+                basic_if.stmt_list = if_stmt.else_stmts
+                branches.append(basic_if)
+                always = True
+        if not branches:
+            self.remove_stmt = True
+            return
+        if_stmt.if_part = branches[0]
+        if_stmt.elseifs = branches[1:]
+        if always:
+            if_stmt.has_else = False
+            if_stmt.else_stmts = ast.StmtList()
+
+    def visit_simple_expr(self, simple_expr):
+        if type(simple_expr.term) is ast.SimpleRValue:
+            const_rvalue = ast.ConstRValue()
+            const_rvalue.val = simple_expr.term.val
+            const_rvalue.value = literal_value(const_rvalue.val)
+            simple_expr.term = const_rvalue
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        # fold the operands of a chain left to right in a loop (chains can
+        # be long), then combine them right to left (a + (b + c))
+        exprs = []
+        first_ops = []
+        expr = complex_expr
+        while isinstance(expr, ast.ComplexExpr):
+            expr.first_operand = self.__fold(expr.first_operand)
+            exprs.append(expr)
+            first_ops.append(self.current_const)
+            expr = expr.rest
+        exprs[-1].rest = self.__fold(expr)
+        value = self.current_const
+        the_token = self.const_token
+        for i in range(len(exprs) - 1, -1, -1):
+            expr = exprs[i]
+            if value is not NOT_CONST and not self.__is_const_expr(expr.rest):
+                # the rest of the chain folded to a constant
+                expr.rest = self.__const_expr(value, the_token)
+            value = self.__combine(expr.math_rel, first_ops[i], value)
+            the_token = expr.math_rel
+        self.current_const = value
+        self.const_token = the_token
+
+    def __combine(self, math_rel, first_op, second_op):
+        # the folded value of first_op math_rel second_op (or NOT_CONST)
+        if first_op is NOT_CONST or second_op is NOT_CONST:
+            return NOT_CONST
+        try:
+            value = built_ins.MATH_OPS[math_rel.tokentype](first_op, second_op)
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+            return NOT_CONST
+        if isinstance(value, str) and len(value) > MAX_FOLDED_STRING:
+            return NOT_CONST
+        return value
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr = self.__fold(bool_expr.first_expr)
+        value = self.current_const
+        the_token = self.const_token
+        if bool_expr.bool_rel is not None:
+            bool_expr.second_expr = self.__fold(bool_expr.second_expr)
+            rhs = self.current_const
+            if value is not NOT_CONST and rhs is not NOT_CONST:
+                try:
+                    rel = built_ins.BOOL_RELS[bool_expr.bool_rel.tokentype]
+                    value = rel(value, rhs)
+                except TypeError:
+                    value = NOT_CONST
+            else:
+                value = NOT_CONST
+            the_token = bool_expr.bool_rel
+        if bool_expr.bool_connector is not None:
+            bool_expr.rest = self.__fold_bool(bool_expr.rest)
+            rest = self.current_const
+            if value is NOT_CONST or rest is NOT_CONST:
+                value = NOT_CONST
+            else:
+                connector = bool_expr.bool_connector.tokentype
+                value = built_ins.BOOL_CONNECTORS[connector](value, rest)
+            the_token = bool_expr.bool_connector
+        if bool_expr.negated and value is not NOT_CONST:
+            value = not value
+        self.current_const = value
+        self.const_token = the_token
+
+    def visit_const_rvalue(self, const_rvalue):
+        self.current_const = const_rvalue.value
+        self.const_token = const_rvalue.val
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.current_const = NOT_CONST
+
+    def visit_call_rvalue(self, call_rvalue):
+        call_rvalue.args = [self.__fold(arg) for arg in call_rvalue.args]
+        self.current_const = NOT_CONST
+
+    def visit_id_rvalue(self, id_rvalue):
+        self.current_const = NOT_CONST
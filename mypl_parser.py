@@ -12,11 +12,37 @@ import mypl_lexer as lexer
 import mypl_token as token
 import mypl_ast as ast
 
+# sets of token types the parser chooses between
+LITERALS = frozenset([token.STRINGVAL, token.INTVAL, token.BOOLVAL,
+                      token.FLOATVAL, token.NIL])
+RVALUE_START = LITERALS | {token.NEW, token.ID}
+EXPR_START = RVALUE_START | {token.LPAREN}
+BSTMT_START = EXPR_START | {token.VAR, token.SET, token.IF, token.WHILE,
+                            token.RETURN}
+TYPES = frozenset([token.ID, token.INTTYPE, token.FLOATTYPE, token.BOOLTYPE,
+                   token.STRINGTYPE])
+MATH_RELS = frozenset([token.PLUS, token.MINUS, token.DIVIDE, token.MULTIPLY,
+                       token.MODULO])
+BOOL_RELS = frozenset([token.EQUAL, token.LESS_THAN, token.GREATER_THAN,
+                       token.GREATER_THAN_EQUAL, token.LESS_THAN_EQUAL,
+                       token.NOT_EQUAL])
+CONNECTORS = frozenset([token.AND, token.OR])
+
 
 class Parser(object):
+    """Parses the tokens of a lexer (anything with next_token) or of a
+    token.TokenBuffer. A buffer's tokens are read by index, and a Token
+    is only made for one the tree keeps (or an error reports).
+    """
     def __init__(self, lexer):
         self.lexer = lexer
-        self.current_token = None
+        self.current_token = None # made on demand when reading a buffer
+        self.current_type = None
+        self.buffer = lexer if isinstance(lexer, token.TokenBuffer) else None
+        self.index = -1 # of the current token in the buffer
+        if self.buffer is not None:
+            self.types = self.buffer.types
+            self.last = len(self.types) - 1 # the index of EOS
         
     def parse(self):
         stmt_list_node = ast.StmtList()
@@ -26,75 +52,92 @@ class Parser(object):
         return stmt_list_node
         
     def __advance(self):
-        self.current_token = self.lexer.next_token()
+        if self.buffer is None:
+            self.current_token = self.lexer.next_token()
+            self.current_type = self.current_token.tokentype
+        else:
+            # past the end, the last token (EOS) stays current
+            index = self.index
+            if index < self.last:
+                index += 1
+                self.index = index
+            self.current_token = None
+            self.current_type = self.types[index]
+
+    def __token(self):
+        # the current Token
+        if self.current_token is None:
+            self.current_token = self.buffer.token(self.index)
+        return self.current_token
         
     def __eat(self, tokentype, error_msg):
-        if self.current_token.tokentype == tokentype:
+        if self.current_type == tokentype:
             self.__advance()
         else:
             self.__error(error_msg)
             
     def __error(self, error_msg):
-        s = error_msg + ', found "' + self.current_token.lexeme + '" in parser'
-        l = self.current_token.line
-        c = self.current_token.column
+        s = error_msg + ', found "' + self.__token().lexeme + '" in parser'
+        l = self.__token().line
+        c = self.__token().column
         raise error.MyPLError(error_msg, l, c)
         
     # Beginning of recursive descent functions
     def __stmts(self, stmt_list_node):
         """<stmts> ::= <stmt> <stmts> | e"""
-        if self.current_token.tokentype != token.EOS:
+        # parsed in a loop so long programs don't use up the python stack
+        while self.current_type != token.EOS:
             self.__stmt(stmt_list_node)
-            self.__stmts(stmt_list_node)
             
     def __stmt(self, stmt_list_node):
         """<stmt> ::= <sdecl> | <fdecl> | <bstmt>"""
-        if self.current_token.tokentype == token.STRUCTTYPE:
+        if self.current_type == token.STRUCTTYPE:
             #struct_node = ast.StructDeclStmt()
             self.__sdecl(stmt_list_node)
-        elif self.current_token.tokentype == token.FUN:
+        elif self.current_type == token.FUN:
             #fun_node = ast.FunDeclStmt()
             self.__fdecl(stmt_list_node)
         else:
             stmt_list_node.stmts.append(self.__bstmt())
     
     def __expr(self):
-        rvalues = [token.STRINGVAL, token.INTVAL, token.BOOLVAL, token.FLOATVAL, token.NIL, token.NEW, token.ID]
-        mathrels = [token.PLUS, token.MINUS, token.DIVIDE, token.MULTIPLY, token.MODULO]
-        
-        expr_node = ast.SimpleExpr()
         
-        if self.current_token.tokentype == token.LPAREN:
-            self.__advance()
-            expr_node = self.__expr()
-            self.__eat(token.RPAREN, 'expecting ")"')
-        elif self.current_token.tokentype in rvalues: 
-        
-            expr_node.term = self.__rvalue()
-            
-        if self.current_token.tokentype in mathrels:
+        # an operator chain is parsed in a loop, and each operator gets
+        # the rest of the chain as its second operand (a + (b + c))
+        comp_expr_nodes = []
+        while True:
+            expr_node = ast.SimpleExpr()
+            if self.current_type == token.LPAREN:
+                self.__advance()
+                expr_node = self.__expr()
+                self.__eat(token.RPAREN, 'expecting ")"')
+            elif self.current_type in RVALUE_START: 
+                expr_node.term = self.__rvalue()
+            if self.current_type not in MATH_RELS:
+                break
             comp_expr_node = ast.ComplexExpr()
             comp_expr_node.first_operand = expr_node
-            comp_expr_node.math_rel = self.current_token
+            comp_expr_node.math_rel = self.__token()
             self.__advance()
-            comp_expr_node.rest = self.__expr()
-            return comp_expr_node
+            comp_expr_nodes.append(comp_expr_node)
         
+        for comp_expr_node in reversed(comp_expr_nodes):
+            comp_expr_node.rest = expr_node
+            expr_node = comp_expr_node
         return expr_node
         
             
     
     def __rvalue(self):
-        rvals = [token.STRINGVAL, token.INTVAL, token.BOOLVAL, token.FLOATVAL, token.NIL]
-        if self.current_token.tokentype in rvals:
+        if self.current_type in LITERALS:
             simple_rval_node = ast.SimpleRValue()
-            simple_rval_node.val = self.current_token
+            simple_rval_node.val = self.__token()
             self.__advance()
             return simple_rval_node
-        elif self.current_token.tokentype == token.NEW:
+        elif self.current_type == token.NEW:
             self.__advance()
             new_rval_node = ast.NewRValue()
-            new_rval_node.struct_type = self.current_token
+            new_rval_node.struct_type = self.__token()
             self.__eat(token.ID, 'expecting ID')
             return new_rval_node
         else:
@@ -102,22 +145,19 @@ class Parser(object):
         
     
     def __bstmts (self, stmt_list_node):
-        conds = [token.STRINGVAL, token.INTVAL, token.BOOLVAL, token.FLOATVAL, token.NIL, token.NEW, token.ID, token.LPAREN]
-        vals = [token.VAR, token.SET, token.IF, token.WHILE, token.RETURN]
-        if self.current_token.tokentype in conds or self.current_token.tokentype in vals:
+        while self.current_type in BSTMT_START:
             stmt_list_node.stmts.append(self.__bstmt())
-            self.__bstmts(stmt_list_node)
     
     def __bstmt(self):
-        if self.current_token.tokentype == token.VAR: 
+        if self.current_type == token.VAR: 
             return self.__vdecl()
-        elif self.current_token.tokentype == token.SET:
+        elif self.current_type == token.SET:
             return self.__assign()
-        elif self.current_token.tokentype == token.IF:
+        elif self.current_type == token.IF:
             return self.__cond()
-        elif self.current_token.tokentype == token.RETURN:
+        elif self.current_type == token.RETURN:
             return self.__exit()
-        elif self.current_token.tokentype == token.WHILE:
+        elif self.current_type == token.WHILE:
             return self.__while()
         else:
             expr_stmt = ast.ExprStmt()
@@ -128,7 +168,7 @@ class Parser(object):
     def __sdecl(self, stmt_list_node):
         self.__eat(token.STRUCTTYPE, 'expecting struct')
         struct_node = ast.StructDeclStmt()
-        struct_node.struct_id = self.current_token
+        struct_node.struct_id = self.__token()
         self.__eat(token.ID, 'expecting ID')
         self.__vdecls(struct_node)
         stmt_list_node.stmts.append(struct_node)
@@ -136,21 +176,19 @@ class Parser(object):
         
     def __vdecls(self, struct_node):
         #create variable array
-        if self.current_token.tokentype == token.VAR:
+        while self.current_type == token.VAR:
             struct_node.var_decls.append(self.__vdecl())
-            self.__vdecls(struct_node)
     
     def __fdecl(self, stmt_list_node):
         self.__eat(token.FUN, 'expecting fun')
         fun_node = ast.FunDeclStmt()
-        type = [token.ID, token.INTTYPE, token.FLOATTYPE, token.BOOLTYPE, token.STRINGTYPE]
-        if self.current_token.tokentype in type:
-            fun_node.return_type = self.current_token
+        if self.current_type in TYPES:
+            fun_node.return_type = self.__token()
             self.__advance()
         else:
-            fun_node.return_type = self.current_token
+            fun_node.return_type = self.__token()
             self.__eat(token.NIL, 'expecting nil')
-        fun_node.fun_name = self.current_token
+        fun_node.fun_name = self.__token()
         self.__eat(token.ID, 'expecting ID')
         self.__eat(token.LPAREN, 'expecting (')
         self.__params(fun_node)
@@ -160,33 +198,31 @@ class Parser(object):
         self.__eat(token.END, 'expecting end')
         
     def __params(self, fun_node):
-        if self.current_token.tokentype == token.ID:
+        if self.current_type == token.ID:
             fun_params_node = ast.FunParam()
-            fun_params_node.param_name = self.current_token
+            fun_params_node.param_name = self.__token()
             self.__advance()
             self.__eat(token.COLON, 'expecting colon')
-            type = [token.ID, token.INTTYPE, token.FLOATTYPE, token.BOOLTYPE, token.STRINGTYPE]
-            if self.current_token.tokentype in type:
-                fun_params_node.param_type = self.current_token
+            if self.current_type in TYPES:
+                fun_params_node.param_type = self.__token()
                 self.__advance()
                 fun_node.params.append(fun_params_node)
-            while self.current_token.tokentype == token.COMMA:
+            while self.current_type == token.COMMA:
                 fun_params_node = ast.FunParam()
                 self.__advance()
-                fun_params_node.param_name = self.current_token
+                fun_params_node.param_name = self.__token()
                 self.__eat(token.ID, 'expecting ID')
                 self.__eat(token.COLON, 'expecting :')
-                if self.current_token.tokentype in type:
-                    fun_params_node.param_type = self.current_token
+                if self.current_type in TYPES:
+                    fun_params_node.param_type = self.__token()
                     self.__advance()
                     fun_node.params.append(fun_params_node)
     
     def __exit(self):
         return_node = ast.ReturnStmt()
-        return_node.return_token = self.current_token
+        return_node.return_token = self.__token()
         self.__eat(token.RETURN, 'expecting return')
-        types = [token.STRINGVAL, token.INTVAL, token.BOOLVAL, token.FLOATVAL, token.NIL, token.NEW, token.ID, token.LPAREN]
-        if self.current_token.tokentype in types:
+        if self.current_type in EXPR_START:
             return_node.return_expr = self.__expr()
         self.__eat(token.SEMICOLON, 'expecting semicolon')
         return return_node
@@ -195,7 +231,7 @@ class Parser(object):
     def __vdecl(self):   
         self.__eat(token.VAR, 'expcecting variable')
         var_node = ast.VarDeclStmt()
-        var_node.var_id = self.current_token
+        var_node.var_id = self.__token()
         self.__eat(token.ID, 'expecting ID')
         self.__tdecl(var_node)
         self.__eat(token.ASSIGN, 'expecting assign')
@@ -204,11 +240,10 @@ class Parser(object):
         return var_node
     
     def __tdecl(self, var_node):
-        if self.current_token.tokentype == token.COLON:
+        if self.current_type == token.COLON:
             self.__advance()
-            type = [token.ID, token.INTTYPE, token.FLOATTYPE, token.BOOLTYPE, token.STRINGTYPE]
-            if self.current_token.tokentype in type:
-                var_node.var_type = self.current_token
+            if self.current_type in TYPES:
+                var_node.var_type = self.__token()
                 self.__advance()
     
     def __assign(self):
@@ -223,11 +258,11 @@ class Parser(object):
     
     def __lvalue(self, assign_node):
         lvalue_node = ast.LValue()
-        lvalue_node.path.append(self.current_token)
+        lvalue_node.path.append(self.__token())
         self.__eat(token.ID, 'expecting ID')
-        while self.current_token.tokentype == token.DOT:
+        while self.current_type == token.DOT:
             self.__advance()
-            lvalue_node.path.append(self.current_token)
+            lvalue_node.path.append(self.__token())
             self.__eat(token.ID, 'expecting ID')
         assign_node.lhs = lvalue_node
     
@@ -244,7 +279,7 @@ class Parser(object):
         return if_node
     
     def __condt(self, if_node):
-        if self.current_token.tokentype == token.ELIF:
+        while self.current_type == token.ELIF:
             self.__advance()
             basic_if_node = ast.BasicIf()
             basic_if_node.bool_expr = self.__bexpr()
@@ -252,8 +287,7 @@ class Parser(object):
         
             self.__bstmts(basic_if_node.stmt_list)
             if_node.elseifs.append(basic_if_node)
-            self.__condt(if_node)
-        elif self.current_token.tokentype == token.ELSE:
+        if self.current_type == token.ELSE:
             if_node.has_else = True
             self.__advance()
 
@@ -272,66 +306,65 @@ class Parser(object):
         id_rval_node = ast.IDRvalue()
         call_rval_node = ast.CallRValue()
         
-        id_rval_node.path.append(self.current_token)
-        call_rval_node.fun = self.current_token
+        id_rval_node.path.append(self.__token())
+        call_rval_node.fun = self.__token()
         
         self.__eat(token.ID, 'expecting ID')
-        if self.current_token.tokentype == token.LPAREN:
+        if self.current_type == token.LPAREN:
             self.__advance()
             self.__exprlist(call_rval_node)
             self.__eat(token.RPAREN, 'expecting rparren')
             return call_rval_node
         else:
-            while self.current_token.tokentype == token.DOT:
+            while self.current_type == token.DOT:
                 self.__advance()
-                id_rval_node.path.append(self.current_token)
+                id_rval_node.path.append(self.__token())
                 self.__eat(token.ID, 'expecting ID')
             return id_rval_node
     
     def __exprlist(self, call_rval_node):
-        # tokens that can start an expression ...
-        types = [token.STRINGVAL, token.INTVAL, token.BOOLVAL, token.FLOATVAL, token.ID, token.LPAREN, token.NIL, token.NEW]
-        if self.current_token.tokentype in types:
+        if self.current_type in EXPR_START:
             call_rval_node.args.append(self.__expr())
-            while self.current_token.tokentype == token.COMMA:
+            while self.current_type == token.COMMA:
                 self.__advance()
                 call_rval_node.args.append(self.__expr())
     
     def __bexpr(self):
+        # an and/or chain is parsed in a loop, each part becoming the
+        # rest of the part before it
+        first_node = None
+        prev_node = None
+        while True:
+            bool_expr_node = self.__bexpr_part()
+            if prev_node is None:
+                first_node = bool_expr_node
+            else:
+                prev_node.rest = bool_expr_node
+            if self.current_type not in CONNECTORS:
+                return first_node
+            bool_expr_node.bool_connector = self.__token()
+            self.__advance()
+            prev_node = bool_expr_node
+
+    def __bexpr_part(self):
         bool_expr_node = ast.BoolExpr()
-        if self.current_token.tokentype == token.NOT:
+        if self.current_type == token.NOT:
             bool_expr_node.negated = True
             self.__advance()
             bool_expr_node = self.__bexpr()
-            self.__bexprt(bool_expr_node)
-        elif self.current_token.tokentype == token.LPAREN:
+            self.__brel(bool_expr_node)
+        elif self.current_type == token.LPAREN:
             self.__advance()
             bool_expr_node.first_expr = self.__bexpr()
             self.__eat(token.RPAREN, 'expecting rparren')
-            self.__bconnct(bool_expr_node)
         else:
             bool_expr_node.first_expr = self.__expr()
-            self.__bexprt(bool_expr_node)
+            self.__brel(bool_expr_node)
         return bool_expr_node
         
     
-    def __bexprt(self, bool_expr_node):
-        boolrel = [token.EQUAL, token.LESS_THAN, token.GREATER_THAN, token.GREATER_THAN_EQUAL, token.LESS_THAN_EQUAL, token.NOT_EQUAL]
-        if self.current_token.tokentype in boolrel:
-            bool_expr_node.bool_rel = self.current_token
+    def __brel(self, bool_expr_node):
+        if self.current_type in BOOL_RELS:
+            bool_expr_node.bool_rel = self.__token()
             self.__advance()
             bool_expr_node.second_expr = self.__expr()
-            
-        self.__bconnct(bool_expr_node)
-    
-    def __bconnct(self, bool_expr_node):
-        if self.current_token.tokentype == token.AND:
-            bool_expr_node.bool_connector = self.current_token
-            self.__advance()
-            
-            bool_expr_node.rest = self.__bexpr()
-        elif self.current_token.tokentype == token.OR:
-            bool_expr_node.bool_connector = self.current_token
-            self.__advance()
-           
-            bool_expr_node.rest = self.__bexpr()
\ No newline at end of file
@@ -1,6 +1,7 @@
 
 import mypl_token as token
 import mypl_ast as ast
+import mypl_lexer as lexer
 
 
 class PrintVisitor(ast.Visitor):
@@ -162,7 +163,10 @@ class PrintVisitor(ast.Visitor):
             
     def visit_simple_rvalue(self, simple_rvalue):
         if simple_rvalue.val.tokentype == token.STRINGVAL:
-            self.__write('"' + simple_rvalue.val.lexeme + '"')
+            text = simple_rvalue.val.lexeme
+            for escape, char in lexer.ESCAPES.items():
+                text = text.replace(char, escape)
+            self.__write('"' + text + '"')
         else:
             self.__write(simple_rvalue.val.lexeme)
 
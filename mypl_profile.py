@@ -0,0 +1,308 @@
+#!/usr/bin/python3
+#
+# mypl_profile.py
+# Description:
+#   A deterministic profile of an interpreter run: the calls and the
+#   inclusive and exclusive times of each function, how many times each
+#   line's statements ran, how many instances of each struct were made,
+#   and the time spent in each call stack (written in the collapsed
+#   format read by flame graph tools); and a sampling profiler that
+#   periodically records the MyPL call stack of a run
+#----------------------------------------------------------------------
+import signal
+import sys
+import threading
+import time
+
+import mypl_ast as ast
+import mypl_interpreter as interpreter
+
+# the name of the outermost "function" (the program's statements)
+PROGRAM = '<program>'
+
+# samples taken per second by default
+DEFAULT_SAMPLE_RATE = 100
+
+
+class FunStats(object):
+    """The calls of one function (or built-in) and the time spent in
+    them, in seconds. Inclusive time counts the calls it made; the time
+    of a recursive call is only counted once, by the outermost call.
+    """
+    __slots__ = ('name', 'line', 'calls', 'inclusive', 'exclusive', 'active')
+
+    def __init__(self, name, line):
+        self.name = name
+        self.line = line # of the declaration (None for a built-in)
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        self.active = 0 # calls not yet returned
+
+
+def line_of(node):
+    """The line of the first token of a statement or expression."""
+    if isinstance(node, ast.VarDeclStmt):
+        return node.var_id.line
+    if isinstance(node, ast.AssignStmt):
+        return node.lhs.path[0].line
+    if isinstance(node, ast.ExprStmt):
+        return line_of(node.expr)
+    if isinstance(node, ast.StructDeclStmt):
+        return node.struct_id.line
+    if isinstance(node, ast.FunDeclStmt):
+        return node.fun_name.line
+    if isinstance(node, ast.ReturnStmt):
+        return node.return_token.line
+    if isinstance(node, ast.WhileStmt):
+        return line_of(node.bool_expr)
+    if isinstance(node, ast.IfStmt):
+        return line_of(node.if_part.bool_expr)
+    if isinstance(node, ast.BoolExpr):
+        return line_of(node.first_expr)
+    if isinstance(node, ast.SimpleExpr):
+        return line_of(node.term)
+    if isinstance(node, ast.ComplexExpr):
+        return line_of(node.first_operand)
+    if isinstance(node, ast.SimpleRValue):
+        return node.val.line
+    if isinstance(node, ast.NewRValue):
+        return node.struct_type.line
+    if isinstance(node, ast.CallRValue):
+        return node.fun.line
+    if isinstance(node, ast.IDRvalue):
+        return node.path[0].line
+    return None
+
+
+class Profile(object):
+    """Collects a profile as an Interpreter runs. The interpreter calls
+    enter and leave around each call (of a FunDeclStmt or BuiltIn, and
+    of PROGRAM for the whole run), and counts statements and new
+    structs in stmt_counts and news (see ProfilingInterpreter).
+    """
+    def __init__(self, timer=time.perf_counter):
+        self.timer = timer
+        self.funs = {} # FunDeclStmt, BuiltIn, or PROGRAM -> FunStats
+        self.stmt_counts = {} # Stmt -> times run
+        self.news = {} # StructLayout -> instances made
+        self.stacks = {} # tuple of function names -> exclusive seconds
+        # [FunStats, stack path, start time, callee time] per active call
+        self.stack = []
+
+    def enter(self, fun):
+        stats = self.funs.get(fun)
+        if stats is None:
+            if fun is PROGRAM:
+                stats = FunStats(PROGRAM, None)
+            elif isinstance(fun, ast.FunDeclStmt):
+                stats = FunStats(fun.fun_name.lexeme, fun.fun_name.line)
+            else:
+                stats = FunStats(fun.name, None)
+            self.funs[fun] = stats
+        stats.calls += 1
+        stats.active += 1
+        stack = self.stack
+        if stack:
+            path = stack[-1][1] + (stats.name,)
+        else:
+            path = (stats.name,)
+        stack.append([stats, path, self.timer(), 0.0])
+
+    def leave(self):
+        now = self.timer()
+        stack = self.stack
+        stats, path, start, callees = stack.pop()
+        elapsed = now - start
+        exclusive = elapsed - callees
+        stats.exclusive += exclusive
+        stats.active -= 1
+        if not stats.active:
+            stats.inclusive += elapsed
+        self.stacks[path] = self.stacks.get(path, 0.0) + exclusive
+        if stack:
+            stack[-1][3] += elapsed
+
+    def line_counts(self):
+        """The times the statements on each line ran."""
+        counts = {}
+        for stmt, count in self.stmt_counts.items():
+            line = line_of(stmt)
+            counts[line] = counts.get(line, 0) + count
+        return counts
+
+    def report(self, source_lines=None, limit=20):
+        """The profile as tables: the functions by exclusive time, the
+        limit most run lines (with their text from source_lines, if
+        given), and the structs by instances made."""
+        funs = sorted(self.funs.values(), key=lambda s: -s.exclusive)
+        total = sum(stats.exclusive for stats in funs) or 1.0
+        out = ['%-24s %6s %10s %11s %11s %7s\n' %
+               ('function', 'line', 'calls', 'incl (s)', 'excl (s)',
+                'excl %')]
+        for stats in funs:
+            name = stats.name
+            if stats.line is None and name != PROGRAM:
+                name += ' (built-in)'
+            out.append('%-24s %6s %10i %11.6f %11.6f %7.1f\n' %
+                       (name, stats.line if stats.line is not None else '-',
+                        stats.calls, stats.inclusive, stats.exclusive,
+                        100 * stats.exclusive / total))
+        lines = sorted(self.line_counts().items(),
+                       key=lambda item: (-item[1], item[0]))
+        out.append('\n%6s %12s  %s\n' % ('line', 'count', 'source'))
+        for line, count in lines[:limit]:
+            text = ''
+            if source_lines is not None and 0 < line <= len(source_lines):
+                text = source_lines[line - 1].strip()
+            out.append('%6i %12i  %s\n' % (line, count, text))
+        if self.news:
+            out.append('\n%-24s %12s\n' % ('struct', 'new'))
+            news = sorted(self.news.items(), key=lambda item: -item[1])
+            for layout, count in news:
+                out.append('%-24s %12i\n' % (layout.name, count))
+        return ''.join(out)
+
+    def collapsed(self):
+        """The exclusive time (in microseconds) of each call stack, one
+        'outer;...;inner time' line per stack."""
+        out = []
+        for path, seconds in sorted(self.stacks.items()):
+            micros = int(round(seconds * 1e6))
+            if micros > 0:
+                out.append('%s %i\n' % (';'.join(path), micros))
+        return ''.join(out)
+
+
+class ProfilingInterpreter(interpreter.Interpreter):
+    """An Interpreter that records a run in a Profile. Time spent
+    evaluating the arguments of a call is the caller's. A call answered
+    from a memo cache doesn't run the function, so isn't counted (run
+    with --memo-size 0 to count every call).
+    """
+    def __init__(self, profile, *args, **kwargs):
+        interpreter.Interpreter.__init__(self, *args, **kwargs)
+        self.profile = profile
+        # function body (StmtList) -> FunDeclStmt, as they're declared
+        self.bodies = {}
+
+    def run(self, stmt_list):
+        self.profile.enter(PROGRAM)
+        try:
+            interpreter.Interpreter.run(self, stmt_list)
+        finally:
+            self.profile.leave()
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        self.bodies[fun_decl.stmt_list] = fun_decl
+        interpreter.Interpreter.visit_fun_decl_stmt(self, fun_decl)
+
+    def _exec_stmts(self, stmt_list):
+        profile = self.profile
+        counts = profile.stmt_counts
+        fun_decl = self.bodies.get(stmt_list)
+        if fun_decl is not None:
+            profile.enter(fun_decl)
+        try:
+            for stmt in stmt_list.stmts:
+                counts[stmt] = counts.get(stmt, 0) + 1
+                stmt.accept(self)
+                if self.returning:
+                    return
+        finally:
+            if fun_decl is not None:
+                profile.leave()
+
+    def visit_new_rvalue(self, new_rvalue):
+        interpreter.Interpreter.visit_new_rvalue(self, new_rvalue)
+        news = self.profile.news
+        layout = self.current_value.layout
+        news[layout] = news.get(layout, 0) + 1
+
+    def _apply_built_in(self, call_rvalue, arg_vals):
+        self.profile.enter(call_rvalue.built_in)
+        try:
+            interpreter.Interpreter._apply_built_in(self, call_rvalue,
+                                                    arg_vals)
+        finally:
+            self.profile.leave()
+
+
+class Sampler(object):
+    """Samples the MyPL call stack of an Interpreter's run rate times a
+    second, from a SIGPROF timer (counting the process's cpu time) when
+    started on the main thread of a system that has one, and otherwise
+    from a background thread (counting wall time). Each sample is the
+    interpreter's stack of running calls, each function labelled with
+    the line it was at (name:line); the line running in the innermost
+    call is found in the python stack.
+    """
+    def __init__(self, runner, rate=DEFAULT_SAMPLE_RATE):
+        self.runner = runner
+        self.interval = 1.0 / rate
+        self.stacks = {} # tuple of name:line labels -> samples
+        self.samples = 0
+        self.thread = None # the sampling thread, if not using the timer
+        self.stopping = None # set to stop the sampling thread
+        self.old_handler = None
+
+    def start(self):
+        if (hasattr(signal, 'setitimer') and
+                threading.current_thread() is threading.main_thread()):
+            self.old_handler = signal.signal(signal.SIGPROF, self.__handle)
+            signal.setitimer(signal.ITIMER_PROF, self.interval,
+                             self.interval)
+        else:
+            self.stopping = threading.Event()
+            self.thread = threading.Thread(
+                target=self.__sample_thread,
+                args=(threading.get_ident(),), daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.old_handler)
+        else:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+    def __handle(self, signum, frame):
+        self.sample(frame)
+
+    def __sample_thread(self, thread_id):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self.sample(frame)
+
+    def sample(self, frame):
+        """Records the MyPL stack of a run interrupted at frame (the
+        running python frame)."""
+        calls = self.runner.calls[:]
+        line = None
+        while frame is not None:
+            if frame.f_code.co_name == '_exec_stmts':
+                stmt = frame.f_locals.get('stmt')
+                if stmt is not None:
+                    line = line_of(stmt)
+                break
+            frame = frame.f_back
+        path = []
+        name = PROGRAM
+        for call_rvalue in calls:
+            path.append('%s:%s' % (name, call_rvalue.fun.line))
+            name = call_rvalue.fun.lexeme
+        path.append('%s:%s' % (name, line if line is not None else '?'))
+        path = tuple(path)
+        self.stacks[path] = self.stacks.get(path, 0) + 1
+        self.samples += 1
+
+    def collapsed(self):
+        """The samples of each call stack, one 'outer;...;inner count'
+        line per stack."""
+        out = []
+        for path, count in sorted(self.stacks.items()):
+            out.append('%s %i\n' % (';'.join(path), count))
+        return ''.join(out)
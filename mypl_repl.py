@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+#
+# mypl_repl.py
+# Description:
+#   An interactive MyPL session. Each input is lexed, parsed, checked,
+#   resolved, and run on its own, in one global scope kept for the
+#   whole session: its functions, structs, and variables can be used by
+#   the inputs after it. An input that isn't finished yet (like a
+#   function without its end) is read over more lines, and the value of
+#   an input ending in an expression is shown. :time shows how long
+#   each phase of running an input takes.
+#----------------------------------------------------------------------
+import argparse
+import io
+import sys
+import time
+
+import mypl_error as error
+import mypl_token as token
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_ast as ast
+import mypl_type_checker as type_checker
+import mypl_resolver as resolver
+import mypl_builtins as built_ins
+import mypl_interpreter as interpreter
+
+PROMPT = 'mypl> '
+MORE_PROMPT = '  ... '
+
+HELP = '''Enter MyPL statements and declarations to run them. An input ending
+in an expression statement (like fib(10);) shows its value.
+  :time CODE   run CODE and show how long each phase took
+  :help        show this message
+  :quit        leave (as does end of input)
+'''
+
+# the value of an input that doesn't end in an expression
+NO_VALUE = object()
+
+
+class TokenTracker(object):
+    """Hands the parser the tokens of a lexer, remembering the last one
+    (the parser's current token when it reports an error)."""
+    def __init__(self, the_lexer):
+        self.lexer = the_lexer
+        self.last = None
+    def next_token(self):
+        self.last = self.lexer.next_token()
+        return self.last
+
+
+def parse(source):
+    """The StmtList of source, or None if source ends before its last
+    statement does (so more lines are needed)."""
+    tokens = TokenTracker(lexer.BufferedLexer(io.StringIO(source)))
+    try:
+        return parser.Parser(tokens).parse()
+    except error.MyPLError:
+        if tokens.last is not None and tokens.last.tokentype == token.EOS:
+            return None
+        raise
+
+
+def show(value):
+    """A value as MyPL would write it."""
+    if value is None:
+        return 'nil'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return repr(value) # a struct
+    return '"%s"' % value
+
+
+class Session(object):
+    """The checker, resolver, and interpreter of an interactive session,
+    which keep the global scope of the inputs run so far. An input that
+    fails to check or resolve leaves the scope as it was; one that fails
+    while running keeps what it did before failing.
+    """
+    def __init__(self, type_check=True, output=None, input_source=None):
+        self.checker = type_checker.TypeChecker() if type_check else None
+        self.resolver = resolver.Resolver(type_check)
+        self.runner = interpreter.Interpreter(0, output, input_source)
+        self.times = {} # phase -> seconds taken by the last input
+
+    def execute(self, stmt_list):
+        """Runs a parsed input, giving back the value of its last
+        statement if that's an expression (otherwise NO_VALUE)."""
+        start = time.perf_counter()
+        if self.checker is not None:
+            self.checker.check_more(stmt_list)
+        self.resolver.resolve_more(stmt_list)
+        self.times['check'] = time.perf_counter() - start
+        start = time.perf_counter()
+        try:
+            self.runner.run_more(stmt_list)
+        finally:
+            self.times['run'] = time.perf_counter() - start
+        stmts = stmt_list.stmts
+        if stmts and isinstance(stmts[-1], ast.ExprStmt):
+            return self.runner.current_value
+        return NO_VALUE
+
+    def close(self):
+        built_ins.close_files()
+
+
+def read_lines(interactive):
+    # the lines typed (with the prompt to show for each), one at a time
+    if interactive:
+        try:
+            import readline # line editing and history for input()
+        except ImportError:
+            pass
+        def read_line(prompt):
+            try:
+                return input(prompt)
+            except EOFError:
+                sys.stdout.write('\n')
+                return None
+        return read_line, None
+    # a script: reads share one Input with the program's own reads
+    input_source = built_ins.Input()
+    def read_line(prompt):
+        return input_source.readline()
+    return read_line, input_source
+
+
+def repl(type_check=True, interactive=None):
+    if interactive is None:
+        interactive = sys.stdin.isatty()
+    read_line, input_source = read_lines(interactive)
+    session = Session(type_check, built_ins.Output(), input_source)
+    if interactive:
+        sys.stdout.write('MyPL (:help for help)\n')
+    lines = []
+    timing = False
+    try:
+        while True:
+            try:
+                line = read_line(MORE_PROMPT if lines else PROMPT)
+            except KeyboardInterrupt:
+                sys.stdout.write('\n')
+                lines = []
+                timing = False
+                continue
+            if line is None:
+                break
+            if not lines:
+                command = line.strip()
+                if command in (':quit', ':q'):
+                    break
+                if command in (':help', ':h'):
+                    sys.stdout.write(HELP)
+                    continue
+                if command.startswith(':time'):
+                    timing = True
+                    line = command[len(':time'):]
+                elif command.startswith(':'):
+                    sys.stderr.write('unknown command %s (try :help)\n'
+                                     % command.split()[0])
+                    continue
+                if not line.strip():
+                    continue
+            lines.append(line)
+            if not run_input(session, '\n'.join(lines) + '\n', timing):
+                continue # needs more lines
+            lines = []
+            timing = False
+    finally:
+        session.close()
+
+
+def run_input(session, source, timing):
+    # run one input, giving back False if it isn't finished
+    start = time.perf_counter()
+    try:
+        stmt_list = parse(source)
+        if stmt_list is None:
+            return False
+        parse_time = time.perf_counter() - start
+        value = session.execute(stmt_list)
+    except error.MyPLError as e:
+        sys.stderr.write('%s\n' % e)
+        return True
+    except KeyboardInterrupt:
+        sys.stderr.write('interrupted\n')
+        return True
+    except Exception as e:
+        # a python error in the run (e.g., dividing by zero) ends the
+        # input, not the session
+        sys.stderr.write('error: %s: %s\n' % (type(e).__name__, e))
+        return True
+    if value is not NO_VALUE and value is not None:
+        sys.stdout.write('%s\n' % show(value))
+    if timing:
+        times = session.times
+        sys.stderr.write('parse %.3f ms, check %.3f ms, run %.3f ms\n' %
+                         (1e3 * parse_time, 1e3 * times['check'],
+                          1e3 * times['run']))
+    return True
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        prog='mypl_repl.py', description='Run MyPL interactively.')
+    arg_parser.add_argument('--no-type-check', action='store_true',
+                            help="don't type check inputs")
+    args = arg_parser.parse_args()
+    repl(not args.no_type_check)
@@ -0,0 +1,356 @@
+#!/usr/bin/python3
+#
+# mypl_resolver.py
+# Description:
+#   Static resolution pass that gives each variable a fixed (depth, slot)
+#   address so the interpreter can use array-backed frames
+#----------------------------------------------------------------------
+
+import mypl_token as token
+import mypl_ast as ast
+import mypl_error as error
+import mypl_heap as mheap
+import mypl_builtins as built_ins
+import mypl_optimizer as optimizer
+import mypl_rope as rope
+
+
+class StructType(object):
+    """Marks a name that is a struct type (not a value of one)."""
+    def __init__(self, struct_decl):
+        self.struct_decl = struct_decl
+
+
+class Resolver(ast.Visitor):
+    """A MyPL visitor that works out where each variable lives at run
+    time. Every statement list, function, and struct gets a frame (an
+    array of slots) and each name declared in it gets a slot. A use of a
+    name is resolved to the number of frames to walk up (depth) and the
+    slot in that frame. Function bodies and struct field initializers are
+    resolved at the end of the enclosing block, since they run later and
+    can see names declared after them. Operators and calls to built-in
+    functions are bound to the functions that perform them, and a call
+    to a name declared once as a function is bound to its declaration.
+    Each struct gets a layout, and a field in a path is resolved to its
+    index when the struct type of the value before it is known from the
+    declarations (otherwise it gets a FieldRef that finds the index at
+    run time). Only a type checked program keeps each variable to its
+    declared type, so otherwise the type is only known from a `new S`
+    initializer of a variable (or field) that's never assigned to. String
+    + (per the type checker) builds long strings up as ropes.
+    """
+    def __init__(self, type_checked=False):
+        # True if the program passed the type checker
+        self.type_checked = type_checked
+        # names of the variables and fields assigned to (not type checked)
+        self.assigned = set()
+        self.scopes = [] # list of {id_name:slot}
+        # list of {id_name:StructDeclStmt, StructType, or FunDeclStmt}
+        # (parallel to scopes, None if not known)
+        self.types = []
+        self.deferred = [] # fun/struct decls waiting for the block end
+        # True if the struct or function a global name refers to may
+        # change (set by resolve_more)
+        self.late_globals = False
+
+    def __error(self, msg, the_token):
+        raise error.MyPLError(msg, the_token.line, the_token.column)
+
+    def __push_scope(self):
+        self.scopes.append({})
+        self.types.append({})
+
+    def __pop_scope(self):
+        self.types.pop()
+        return self.scopes.pop()
+
+    def __declare(self, identifier, struct_type=None):
+        # redeclaring a name in the same scope reuses its slot (so if the
+        # redeclaration changes its type, the type isn't known)
+        scope = self.scopes[-1]
+        types = self.types[-1]
+        if identifier not in scope:
+            scope[identifier] = len(scope)
+            types[identifier] = struct_type
+        elif types[identifier] is not struct_type:
+            types[identifier] = None
+        return scope[identifier]
+
+    def __lookup(self, the_token):
+        # search from last (most recent) to first scope
+        depth = 0
+        for scope in reversed(self.scopes):
+            if the_token.lexeme in scope:
+                return depth, scope[the_token.lexeme]
+            depth += 1
+        self.__error('undefined variable "%s"' % the_token.lexeme, the_token)
+
+    def __lookup_type(self, identifier, num_scopes=None):
+        # the struct type of a name as seen from the first num_scopes scopes
+        scopes = self.scopes[:num_scopes]
+        for i in range(len(scopes) - 1, -1, -1):
+            if identifier in scopes[i]:
+                if i == 0 and self.late_globals:
+                    return None
+                return self.types[i][identifier]
+        return None
+
+    def __struct_named(self, type_token, num_scopes=None):
+        # the StructDeclStmt a type name refers to (or None)
+        if type_token is None or type_token.tokentype != token.ID:
+            return None
+        decl = self.__lookup_type(type_token.lexeme, num_scopes)
+        if isinstance(decl, StructType):
+            return decl.struct_decl
+        return None
+
+    def __var_struct(self, var_decl, num_scopes=None):
+        # the struct type of a variable from its declared type or from a
+        # `new S` initializer
+        if not self.type_checked:
+            if var_decl.var_id.lexeme in self.assigned:
+                return None
+            type_token = None
+        else:
+            type_token = var_decl.var_type
+        if type_token is None:
+            expr = var_decl.var_expr
+            if isinstance(expr, ast.SimpleExpr) and \
+               isinstance(expr.term, ast.NewRValue):
+                type_token = expr.term.struct_type
+        return self.__struct_named(type_token, num_scopes)
+
+    def __field_struct(self, struct_decl, field_name):
+        # the struct type of a field, seen from where the struct is declared
+        for var_decl in reversed(struct_decl.var_decls):
+            if var_decl.var_id.lexeme == field_name:
+                return self.__var_struct(var_decl, struct_decl.num_scopes)
+        return None
+
+    def __field_refs(self, path):
+        # an index for each field whose struct type is known, else a FieldRef
+        field_refs = []
+        struct_decl = self.__lookup_type(path[0].lexeme)
+        if isinstance(struct_decl, (StructType, ast.FunDeclStmt)):
+            struct_decl = None # a struct or function name isn't a struct
+        for path_id in path[1:]:
+            name = path_id.lexeme
+            if struct_decl is not None and name in struct_decl.layout.index:
+                field_refs.append(struct_decl.layout.index[name])
+                struct_decl = self.__field_struct(struct_decl, name)
+            else:
+                field_refs.append(mheap.FieldRef(name))
+                struct_decl = None
+        return field_refs
+
+    def __find_assigned(self, stmt_list):
+        # add the names assigned to in stmt_list (and its blocks and
+        # function bodies) to assigned: the variable, or the last field
+        for stmt in stmt_list.stmts:
+            if isinstance(stmt, ast.AssignStmt):
+                self.assigned.add(stmt.lhs.path[-1].lexeme)
+            elif isinstance(stmt, ast.WhileStmt):
+                self.__find_assigned(stmt.stmt_list)
+            elif isinstance(stmt, ast.IfStmt):
+                for basic_if in [stmt.if_part] + stmt.elseifs:
+                    self.__find_assigned(basic_if.stmt_list)
+                if stmt.has_else:
+                    self.__find_assigned(stmt.else_stmts)
+            elif isinstance(stmt, ast.FunDeclStmt):
+                self.__find_assigned(stmt.stmt_list)
+
+    def __resolve_stmts(self, stmt_list):
+        outer_deferred = self.deferred
+        self.deferred = []
+        for stmt in stmt_list.stmts:
+            stmt.accept(self)
+        deferred = self.deferred
+        self.deferred = outer_deferred
+        for decl in deferred:
+            if isinstance(decl, ast.FunDeclStmt):
+                self.__resolve_fun_body(decl)
+            else:
+                self.__resolve_struct_body(decl)
+
+    def __resolve_fun_body(self, fun_decl):
+        # params and body locals share the function's frame
+        self.__push_scope()
+        for param in fun_decl.params:
+            param.accept(self)
+        self.__resolve_stmts(fun_decl.stmt_list)
+        fun_decl.num_slots = len(self.__pop_scope())
+
+    def __resolve_struct_body(self, struct_decl):
+        # each field gets a slot in the frame used to run the initializers,
+        # and the same index in the struct's instances
+        self.__push_scope()
+        for var_decl in struct_decl.var_decls:
+            var_decl.accept(self)
+        struct_decl.num_slots = len(self.__pop_scope())
+        # fields with constant initializers are copied from a template,
+        # unless an earlier initializer of the same field has to run
+        template = [None] * struct_decl.num_slots
+        init_decls = []
+        run_slots = set()
+        for var_decl in struct_decl.var_decls:
+            value = self.__const_value(var_decl.var_expr)
+            if value is optimizer.NOT_CONST or var_decl.slot in run_slots:
+                init_decls.append(var_decl)
+                run_slots.add(var_decl.slot)
+            else:
+                template[var_decl.slot] = value
+        struct_decl.template = template
+        struct_decl.init_decls = init_decls
+
+    def __const_value(self, expr):
+        # the value of a literal expression (or NOT_CONST)
+        if isinstance(expr, ast.SimpleExpr) and \
+           isinstance(expr.term, ast.SimpleRValue):
+            if isinstance(expr.term, ast.ConstRValue):
+                return expr.term.value
+            return optimizer.literal_value(expr.term.val)
+        return optimizer.NOT_CONST
+
+    def resolve_more(self, stmt_list):
+        """Resolves statements that extend the ones resolved so far by
+        resolve_more (as the REPL does), in one global scope that
+        stmt_list.num_slots is set to the size of. Global names aren't
+        bound to the functions and structs they name, since a later
+        input can declare them again. If the statements don't resolve,
+        the scope is left as it was."""
+        if not self.scopes:
+            self.__push_scope()
+            self.late_globals = True
+        scope = self.scopes[0]
+        types = self.types[0]
+        saved = dict(scope), dict(types)
+        if not self.type_checked:
+            self.__find_assigned(stmt_list)
+        try:
+            self.__resolve_stmts(stmt_list)
+        except error.MyPLError:
+            scope.clear()
+            scope.update(saved[0])
+            types.clear()
+            types.update(saved[1])
+            del self.scopes[1:]
+            del self.types[1:]
+            self.deferred = []
+            raise
+        stmt_list.num_slots = len(scope)
+
+    def visit_stmt_list(self, stmt_list):
+        if not self.scopes and not self.type_checked:
+            self.__find_assigned(stmt_list)
+        self.__push_scope()
+        self.__resolve_stmts(stmt_list)
+        stmt_list.num_slots = len(self.__pop_scope())
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr.accept(self)
+
+    def visit_var_decl_stmt(self, var_decl):
+        # the initializer can't see the variable being declared
+        var_decl.var_expr.accept(self)
+        var_decl.slot = self.__declare(var_decl.var_id.lexeme,
+                                       self.__var_struct(var_decl))
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs.accept(self)
+        assign_stmt.lhs.accept(self)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        # the layout is needed by paths resolved before the struct body
+        fields = []
+        for var_decl in struct_decl.var_decls:
+            if var_decl.var_id.lexeme not in fields:
+                fields.append(var_decl.var_id.lexeme)
+        struct_decl.layout = mheap.StructLayout(struct_decl.struct_id.lexeme,
+                                                fields)
+        struct_decl.num_scopes = len(self.scopes)
+        struct_decl.slot = self.__declare(struct_decl.struct_id.lexeme,
+                                          StructType(struct_decl))
+        self.deferred.append(struct_decl)
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        fun_decl.slot = self.__declare(fun_decl.fun_name.lexeme, fun_decl)
+        self.deferred.append(fun_decl)
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr.accept(self)
+
+    def visit_while_stmt(self, while_stmt):
+        while_stmt.bool_expr.accept(self)
+        while_stmt.stmt_list.accept(self)
+
+    def visit_if_stmt(self, if_stmt):
+        if_stmt.if_part.bool_expr.accept(self)
+        if_stmt.if_part.stmt_list.accept(self)
+        for elseif in if_stmt.elseifs:
+            elseif.bool_expr.accept(self)
+            elseif.stmt_list.accept(self)
+        if if_stmt.has_else:
+            if_stmt.else_stmts.accept(self)
+
+    def visit_simple_expr(self, simple_expr):
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        # follow a chain of operators in a loop (chains can be long)
+        num_operands = 1
+        all_plus = True
+        expr = complex_expr
+        while isinstance(expr, ast.ComplexExpr):
+            expr.op = built_ins.MATH_OPS[expr.math_rel.tokentype]
+            if expr.math_rel.tokentype != token.PLUS:
+                all_plus = False
+            elif expr.static_type == token.STRINGTYPE:
+                # long strings are built up as ropes
+                expr.op = rope.concat
+            expr.first_operand.accept(self)
+            num_operands += 1
+            expr = expr.rest
+        expr.accept(self)
+        # a chain of three or more strings (per the type checker) is
+        # joined at once instead of one + at a time (see rope.join)
+        complex_expr.concat = all_plus and num_operands >= 3 and \
+            complex_expr.static_type == token.STRINGTYPE
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr.accept(self)
+        if bool_expr.bool_rel is not None:
+            bool_expr.rel_op = built_ins.BOOL_RELS[bool_expr.bool_rel.tokentype]
+            bool_expr.second_expr.accept(self)
+        if bool_expr.bool_connector is not None:
+            bool_expr.connector_op = \
+                built_ins.BOOL_CONNECTORS[bool_expr.bool_connector.tokentype]
+            bool_expr.rest.accept(self)
+
+    def visit_lvalue(self, lval):
+        lval.depth, lval.slot = self.__lookup(lval.path[0])
+        lval.field_refs = self.__field_refs(lval.path)
+
+    def visit_fun_param(self, fun_param):
+        struct_decl = None
+        if self.type_checked:
+            struct_decl = self.__struct_named(fun_param.param_type)
+        fun_param.slot = self.__declare(fun_param.param_name.lexeme,
+                                        struct_decl)
+
+    def visit_new_rvalue(self, new_rvalue):
+        new_rvalue.depth, new_rvalue.slot = self.__lookup(new_rvalue.struct_type)
+
+    def visit_call_rvalue(self, call_rvalue):
+        call_rvalue.built_in = built_ins.lookup(call_rvalue.fun.lexeme)
+        if call_rvalue.built_in is None:
+            call_rvalue.depth, call_rvalue.slot = self.__lookup(call_rvalue.fun)
+            fun_decl = self.__lookup_type(call_rvalue.fun.lexeme)
+            if isinstance(fun_decl, ast.FunDeclStmt):
+                call_rvalue.fun_decl = fun_decl
+        for arg in call_rvalue.args:
+            arg.accept(self)
+
+    def visit_id_rvalue(self, id_rvalue):
+        id_rvalue.depth, id_rvalue.slot = self.__lookup(id_rvalue.path[0])
+        id_rvalue.field_refs = self.__field_refs(id_rvalue.path)
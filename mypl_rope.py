@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+#
+# mypl_rope.py
+# Description:
+#   Lazily joined strings (ropes) so that building a string up with
+#   repeated + takes linear time
+#----------------------------------------------------------------------
+
+# a string concatenation result at least this long becomes a rope
+ROPE_MIN = 1024
+
+# pending parts a builder joins into one chunk
+CHUNK_PARTS = 64
+
+
+class Builder(object):
+    """The text of a rope and of the ropes it was extended to: a list of
+    chunks (each at most half as long as the one before, so there are
+    only log n of them) plus the small parts appended since the last
+    chunk was made. Text is only ever added at the end.
+    """
+    __slots__ = ('chunks', 'parts', 'length')
+
+    def __init__(self, text):
+        self.chunks = [text]
+        self.parts = []
+        self.length = len(text)
+
+    def append(self, s):
+        parts = self.parts
+        parts.append(s)
+        self.length += len(s)
+        if len(parts) >= CHUNK_PARTS:
+            chunks = self.chunks
+            chunks.append(''.join(parts))
+            parts.clear()
+            while len(chunks) > 1 and len(chunks[-1]) * 2 > len(chunks[-2]):
+                last = chunks.pop()
+                chunks[-1] += last
+
+    def text(self):
+        # all of the text (kept as a single chunk)
+        if self.parts or len(self.chunks) > 1:
+            self.chunks = [''.join(self.chunks + self.parts)]
+            self.parts.clear()
+        return self.chunks[0]
+
+
+class Rope(object):
+    """A string value made by concatenation: the first length characters
+    of a Builder's text. A rope at the end of its builder's text appends
+    to the builder (in place), so s + "x" is only a new rope. The rope is
+    joined into a python str (once) when it is observed: printed, or
+    used by length (which doesn't need the text), get, a comparison, a
+    hash, or a built-in that takes a str.
+    """
+    __slots__ = ('builder', 'length', 'flat')
+
+    def __init__(self, builder, length):
+        self.builder = builder
+        self.length = length
+        self.flat = None # the joined text (once observed)
+
+    def __add__(self, other):
+        if other.__class__ is not str:
+            if other.__class__ is not Rope:
+                return NotImplemented
+            other = other.__str__()
+        builder = self.builder
+        if builder.length != self.length:
+            # text was appended to this rope already, so start over
+            builder = Builder(self.__str__())
+        builder.append(other)
+        return Rope(builder, builder.length)
+
+    def __radd__(self, other):
+        if other.__class__ is not str:
+            return NotImplemented
+        builder = Builder(other)
+        builder.append(self.__str__())
+        return Rope(builder, builder.length)
+
+    def __str__(self):
+        if self.flat is None:
+            text = self.builder.text()
+            if len(text) != self.length:
+                text = text[:self.length]
+            self.flat = text
+        return self.flat
+
+    def __repr__(self):
+        return repr(self.__str__())
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.__str__()[index]
+
+    def __hash__(self):
+        return hash(self.__str__())
+
+    # comparisons with anything but a string fall back to identity
+    def __eq__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.__str__() == str(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.__str__() != str(other)
+        return NotImplemented
+
+    def __lt__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.__str__() < str(other)
+        return NotImplemented
+
+    def __le__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.__str__() <= str(other)
+        return NotImplemented
+
+    def __gt__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.__str__() > str(other)
+        return NotImplemented
+
+    def __ge__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.__str__() >= str(other)
+        return NotImplemented
+
+
+def concat(lhs, rhs):
+    """Returns lhs + rhs for strings (either can be a rope). A result of
+    at least ROPE_MIN characters is a rope."""
+    if lhs.__class__ is Rope or rhs.__class__ is not str or \
+       len(lhs) + len(rhs) < ROPE_MIN:
+        return lhs + rhs
+    builder = Builder(lhs)
+    builder.append(rhs)
+    return Rope(builder, builder.length)
+
+def join(values):
+    """Returns the concatenation of a list of strings (any can be a
+    rope, and then so is the result)."""
+    for value in values:
+        if value.__class__ is not str:
+            break
+    else:
+        return ''.join(values)
+    value = values[0]
+    for i in range(1, len(values)):
+        value = concat(value, values[i])
+    return value
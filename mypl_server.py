@@ -0,0 +1,297 @@
+#!/usr/bin/python3
+#
+# mypl_server.py
+# Description:
+#   Runs MyPL programs for mypl_client over a unix domain socket, so
+#   a run doesn't pay for starting python, importing the interpreter,
+#   or (once a program has been seen) preparing the program. The
+#   server forks its workers before any request arrives. Each worker
+#   runs one program at a time with a new runner, in its own process,
+#   and keeps the prepared programs it has seen in memory (backed by
+#   the on-disk AST cache, which the workers share).
+#----------------------------------------------------------------------
+import argparse
+import os
+import signal
+import socket
+import stat
+import sys
+import threading
+import traceback
+import _thread
+
+import mypl_cache as cache
+import mypl_client as client
+import hw7
+
+# the longest request read (the working directory and arguments)
+MAX_REQUEST = 1 << 20
+
+# requests a worker serves before it's replaced (0 for no limit)
+DEFAULT_MAX_REQUESTS = 1000
+
+# prepared programs each worker keeps in memory
+DEFAULT_MAX_ENTRIES = 64
+
+
+class ServerError(Exception):
+    pass
+
+
+def receive_request(conn):
+    """Reads a request from conn, returning the working directory, the
+    arguments, and the three standard stream descriptors passed with
+    it (or None if conn was closed without a request, as it is by a
+    server checking for one already listening)."""
+    data, fds, flags, address = socket.recv_fds(conn, MAX_REQUEST, 3)
+    if not data and not fds:
+        return None
+    if len(fds) != 3:
+        for fd in fds:
+            os.close(fd)
+        raise ServerError('expecting 3 file descriptors, got %i' % len(fds))
+    try:
+        while len(data) < client.HEADER.size:
+            data += _receive_some(conn)
+        (size,) = client.HEADER.unpack_from(data)
+        if size > MAX_REQUEST:
+            raise ServerError('request too long')
+        data = data[client.HEADER.size:]
+        while len(data) < size:
+            data += _receive_some(conn)
+    except Exception:
+        for fd in fds:
+            os.close(fd)
+        raise
+    cwd, argv = client.decode_request(data)
+    return cwd, argv, fds
+
+def _receive_some(conn):
+    data = conn.recv(MAX_REQUEST)
+    if not data:
+        raise ServerError('request ended early')
+    return data
+
+
+class Server(object):
+    """Listens at path and keeps worker processes forked, replacing
+    each one that exits (after max_requests runs, or if a run kills
+    it). the_cache (a mypl_cache Cache, or None) holds the prepared
+    programs.
+    """
+    def __init__(self, path, workers, max_requests=DEFAULT_MAX_REQUESTS,
+                 the_cache=None):
+        self.path = path
+        self.num_workers = workers
+        self.max_requests = max_requests
+        self.the_cache = the_cache
+        self.arg_parser = hw7.make_arg_parser()
+        self.listener = None
+        self.workers = set() # pids
+        self.stopping = False
+
+    def serve(self):
+        """Serves requests until interrupted or terminated."""
+        self.__listen()
+        # compute the cache version once, for every worker
+        cache.version()
+        signal.signal(signal.SIGTERM, self.__stop)
+        try:
+            for i in range(self.num_workers):
+                self.__fork()
+            while True:
+                pid, status = os.wait()
+                self.workers.discard(pid)
+                if not self.stopping:
+                    self.__fork()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stopping = True
+            for pid in self.workers:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in self.workers:
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+            self.listener.close()
+            os.remove(self.path)
+
+    def __stop(self, signum, frame):
+        raise KeyboardInterrupt()
+
+    def __private_directory(self):
+        # the socket's directory is made (or has to be) the user's alone,
+        # so no one else can put a socket at the path before the server
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            info = os.lstat(directory)
+            if not stat.S_ISDIR(info.st_mode) or \
+               info.st_uid != os.getuid() or info.st_mode & 0o077:
+                raise ServerError('%s is not a directory only you can use'
+                                  % directory)
+
+    def __listen(self):
+        self.__private_directory()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if os.path.exists(self.path):
+            # remove the socket of a server that is no longer running
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as other:
+                    other.connect(self.path)
+            except ConnectionRefusedError:
+                os.remove(self.path)
+            else:
+                raise ServerError('a server is listening at %s' % self.path)
+        # only the user can connect
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        listener.listen(128)
+        self.listener = listener
+
+    def __fork(self):
+        pid = os.fork()
+        if pid != 0:
+            self.workers.add(pid)
+            return
+        status = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.__work()
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+
+    def __work(self):
+        served = 0
+        while self.max_requests == 0 or served < self.max_requests:
+            conn, address = self.listener.accept()
+            with conn:
+                self.__serve(conn)
+            served += 1
+
+    def __serve(self, conn):
+        try:
+            request = receive_request(conn)
+        except (ServerError, OSError) as e:
+            sys.stderr.write('mypl_server: %s\n' % e)
+            return
+        if request is None:
+            return
+        cwd, argv, fds = request
+        # a client that goes away (e.g., is interrupted) stops its run
+        lock = threading.Lock()
+        running = [True]
+        def watch():
+            try:
+                conn.recv(1)
+            except OSError:
+                pass
+            with lock:
+                if running[0]:
+                    _thread.interrupt_main()
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            status = self.__run(cwd, argv, fds)
+        finally:
+            with lock:
+                running[0] = False
+        try:
+            conn.sendall(client.STATUS.pack(status))
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        watcher.join()
+
+    def __run(self, cwd, argv, fds):
+        # run hw7 with the client's arguments, directory, and streams
+        streams = [open(fds[0], 'r'), open(fds[1], 'w'), open(fds[2], 'w')]
+        saved = (sys.stdin, sys.stdout, sys.stderr)
+        saved_cwd = os.getcwd()
+        sys.stdin, sys.stdout, sys.stderr = streams
+        try:
+            try:
+                os.chdir(cwd)
+                args = self.arg_parser.parse_args(argv)
+                the_cache = None if args.no_cache else self.the_cache
+                hw7.run_args(args, the_cache)
+                status = 0
+            except SystemExit as e:
+                status = hw7.exit_status(e.code)
+            except KeyboardInterrupt:
+                status = 130
+            except Exception:
+                traceback.print_exc()
+                status = 1
+            for stream in streams[1:]:
+                try:
+                    stream.flush()
+                except OSError:
+                    pass
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = saved
+            os.chdir(saved_cwd)
+            for stream in streams:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+        return status
+
+
+def main(path, workers, max_requests, the_cache):
+    try:
+        Server(path, workers, max_requests, the_cache).serve()
+    except (ServerError, OSError) as e:
+        sys.exit('mypl_server: %s' % e)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='Run MyPL programs for mypl_client.py.')
+    arg_parser.add_argument('--socket', metavar='PATH',
+                            default=client.default_socket(),
+                            help='the socket to listen at, in a directory '
+                            'only you can use (default: $MYPL_SOCKET or '
+                            'mypl-<uid>/server.sock in $XDG_RUNTIME_DIR)')
+    arg_parser.add_argument('--workers', type=int, metavar='N',
+                            default=os.cpu_count() or 1,
+                            help='run up to N programs at once (default: '
+                            'the number of cpus)')
+    arg_parser.add_argument('--max-requests', type=int, metavar='N',
+                            default=DEFAULT_MAX_REQUESTS,
+                            help='replace a worker after it runs N '
+                            'programs (0 for no limit)')
+    arg_parser.add_argument('--max-entries', type=int, metavar='N',
+                            default=DEFAULT_MAX_ENTRIES,
+                            help='keep up to N prepared programs in each '
+                            "worker's memory")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="don't keep prepared programs (in memory "
+                            'or on disk)')
+    arg_parser.add_argument('--cache-dir', metavar='DIR',
+                            help='the AST cache directory (default: '
+                            '$MYPL_CACHE_DIR or ~/.cache/mypl)')
+    arg_parser.add_argument('--cache-size', type=int, metavar='MB',
+                            default=cache.DEFAULT_MAX_BYTES >> 20,
+                            help='evict least recently used AST cache '
+                            'entries over MB megabytes')
+    args = arg_parser.parse_args()
+    the_cache = None
+    if not args.no_cache:
+        the_cache = cache.Cache(args.cache_dir, args.cache_size << 20,
+                                args.max_entries)
+    main(args.socket, args.workers, args.max_requests, the_cache)
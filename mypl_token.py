@@ -1,59 +1,116 @@
-ASSIGN = 'ASSIGN'
-COMMA = 'COMMA'
-COLON = 'COLON'
-DIVIDE = 'DIVIDE'
-DOT = 'DOT'
-EQUAL = 'EQUAL'
-GREATER_THAN = 'GREATER_THAN'
-GREATER_THAN_EQUAL = 'GREATER_THAN_EQUAL'
-LESS_THAN = 'LESS_THAN'
-LESS_THAN_EQUAL = 'LESS_THAN_EQUAL'
-NOT_EQUAL = 'NOT_EQUAL'
-LPAREN = 'LPAREN'
-RPAREN = 'RPAREN'
-MINUS = 'MINUS'
-MODULO = 'MODULO'
-MULTIPLY = 'MULTIPLY'
-PLUS = 'PLUS'
-SEMICOLON = 'SEMICOLON'
-BOOLTYPE = 'BOOLTYPE'
-INTTYPE = 'INTTYPE'
-FLOATTYPE = 'FLOATTYPE'
-STRINGTYPE = 'STRINGTYPE'
-STRUCTTYPE = 'STRUCTTYPE'
-AND = 'AND'
-OR = 'OR'
-NOT = 'NOT'
-WHILE = 'WHILE'
-DO = 'DO'
-IF = 'IF'
-THEN = 'THEN'
-ELSE = 'ELSE'
-ELIF = 'ELIF'
-END = 'END'
-FUN = 'FUN'
-VAR = 'VAR'
-SET = 'SET'
-RETURN = 'RETURN'
-NEW = 'NEW'
-NIL = 'NIL'
-EOS = 'EOS'
-BOOLVAL = 'BOOLVAL'
-INTVAL = 'INTVAL'
-FLOATVAL = 'FLOATVAL'
-STRINGVAL = 'STRINGVAL'
-ID = 'ID'
+import array
 
-class Token(object):
+# token types are small ints (so the lexer and parser compare and hash
+# ints, and a TokenBuffer stores one in a byte); NAMES[t] is the name
+# of token type t
+ASSIGN = 0
+COMMA = 1
+COLON = 2
+DIVIDE = 3
+DOT = 4
+EQUAL = 5
+GREATER_THAN = 6
+GREATER_THAN_EQUAL = 7
+LESS_THAN = 8
+LESS_THAN_EQUAL = 9
+NOT_EQUAL = 10
+LPAREN = 11
+RPAREN = 12
+MINUS = 13
+MODULO = 14
+MULTIPLY = 15
+PLUS = 16
+SEMICOLON = 17
+BOOLTYPE = 18
+INTTYPE = 19
+FLOATTYPE = 20
+STRINGTYPE = 21
+STRUCTTYPE = 22
+AND = 23
+OR = 24
+NOT = 25
+WHILE = 26
+DO = 27
+IF = 28
+THEN = 29
+ELSE = 30
+ELIF = 31
+END = 32
+FUN = 33
+VAR = 34
+SET = 35
+RETURN = 36
+NEW = 37
+NIL = 38
+EOS = 39
+BOOLVAL = 40
+INTVAL = 41
+FLOATVAL = 42
+STRINGVAL = 43
+ID = 44
+
+NAMES = (
+    'ASSIGN', 'COMMA', 'COLON', 'DIVIDE', 'DOT', 'EQUAL', 'GREATER_THAN',
+    'GREATER_THAN_EQUAL', 'LESS_THAN', 'LESS_THAN_EQUAL', 'NOT_EQUAL',
+    'LPAREN', 'RPAREN', 'MINUS', 'MODULO', 'MULTIPLY', 'PLUS', 'SEMICOLON',
+    'BOOLTYPE', 'INTTYPE', 'FLOATTYPE', 'STRINGTYPE', 'STRUCTTYPE', 'AND',
+    'OR', 'NOT', 'WHILE', 'DO', 'IF', 'THEN', 'ELSE', 'ELIF', 'END', 'FUN',
+    'VAR', 'SET', 'RETURN', 'NEW', 'NIL', 'EOS', 'BOOLVAL', 'INTVAL',
+    'FLOATVAL', 'STRINGVAL', 'ID',
+)
 
+class Token(object):
+    # no attribute dict: the tree keeps the tokens of ids and literals
+    __slots__ = ('tokentype', 'lexeme', 'line', 'column')
     def __init__(self, tokentype, lexeme, line, column):
         self.tokentype = tokentype
         self.lexeme = lexeme
         self.line = line
         self.column = column
+    def __reduce__(self):
+        # pickled as constructor arguments (smaller than the attribute
+        # dict, see mypl_cache)
+        return (Token, (self.tokentype, self.lexeme, self.line, self.column))
     def __str__(self):
-        tokentype = self.tokentype
+        tokentype = NAMES[self.tokentype]
         lexeme = self.lexeme
         line = self.line
         column = self.column
         return "%s '%s' %i:%i" % (tokentype, lexeme, line, column)
+
+
+class TokenBuffer(object):
+    """The tokens of a source stored as parallel arrays: the type of
+    each token (a byte), the start and end of its text in the source,
+    and its line and column. A Token is only made when token(i) is
+    called, so a parser reading a buffer can check the type of a token
+    without making one. The few tokens whose lexeme isn't their text (a
+    string literal with escapes) keep it in lexemes. Filled by
+    mypl_lexer.BufferedLexer.tokenize; next_token reads the tokens in
+    order like a lexer (giving the last, EOS, again at the end).
+    """
+    def __init__(self, source):
+        self.source = source
+        self.types = array.array('B')
+        self.starts = array.array('i')
+        self.ends = array.array('i')
+        self.lines = array.array('i')
+        self.columns = array.array('i')
+        self.lexemes = {} # index -> lexeme (if not source[start:end])
+        self.next_index = 0
+
+    def __len__(self):
+        return len(self.types)
+
+    def token(self, i):
+        if i in self.lexemes:
+            lexeme = self.lexemes[i]
+        else:
+            lexeme = self.source[self.starts[i]:self.ends[i]]
+        return Token(self.types[i], lexeme, self.lines[i], self.columns[i])
+
+    def next_token(self):
+        i = self.next_index
+        if i < len(self.types) - 1:
+            self.next_index = i + 1
+        return self.token(i)
@@ -2,234 +2,307 @@ import mypl_token as token
 import mypl_ast as ast
 import mypl_error as error
 import mypl_symbol_table as symbol_table
+import mypl_builtins as built_ins
+
+# operand types each math operator accepts (both operands the same type)
+MATH_TYPES = {
+    token.PLUS: [token.INTTYPE, token.FLOATTYPE, token.STRINGTYPE],
+    token.MINUS: [token.INTTYPE, token.FLOATTYPE],
+    token.MULTIPLY: [token.INTTYPE, token.FLOATTYPE],
+    token.DIVIDE: [token.INTTYPE, token.FLOATTYPE],
+    token.MODULO: [token.INTTYPE],
+}
+
+# operand types that can be ordered with <, <=, >, >=
+ORDERED_TYPES = [token.INTTYPE, token.FLOATTYPE, token.STRINGTYPE]
+
 
 class TypeChecker(ast.Visitor):
     """A MyPL type checker visitor implementation where struct types
     take the form: type_id -> {v1:t1, ..., vn:tn} and function types
-    take the form: fun_id -> [[t1, t2, ..., tn,], return_type]
+    take the form: fun_id -> [[t1, t2, ..., tn,], return_type]. A type
+    is a token type (INTTYPE, ...), a struct name, or NIL. NIL is the
+    type of nil (and of a variable declared as nil without a type), and
+    it matches any type. The type of each expression is recorded in its
+    static_type, and a built-in call whose arguments can never be nil is
+    marked so its nil check can be skipped. Like the resolver, function
+    bodies are checked at the end of the enclosing block.
     """
     def __init__(self):
         # initialize the symbol table (for ids -> types)
         self.sym_table = symbol_table.SymbolTable()
         # current_type holds the type of the last expression type
         self.current_type = None
-        # global env (for return)
+        # function decls (and their types) waiting for the block end
+        self.deferred = []
+        # global env
         self.sym_table.push_environment()
-        # set global return type to int
-        self.sym_table.add_id('return')
-        self.sym_table.set_info('return', token.INTTYPE)
-        # load in built-in function types
-        self.sym_table.add_id('print')
-        self.sym_table.set_info('print', [[token.STRINGTYPE], token.NIL])
-        
-        self.sym_table.add_id('length')
-        self.sym_table.set_info('length', [[token.STRINGTYPE], token.NIL])
-        
-        self.sym_table.add_id('get')
-        self.sym_table.set_info('get', [[token.INTTYPE, token.STRINGTYPE], token.INTTYPE])#
-        
-        self.sym_table.add_id('reads')
-        self.sym_table.set_info('reads', [token.STRINGTYPE])
-        
-        self.sym_table.add_id('readi')
-        self.sym_table.set_info('readi', [token.STRINGTYPE])
-        
-        self.sym_table.add_id('readf')
-        self.sym_table.set_info('readf', [token.STRINGTYPE])
-        
-        self.sym_table.add_id('itos')
-        self.sym_table.set_info('itos', [token.INTTYPE, token.STRINGTYPE])
-        
-        self.sym_table.add_id('ftos')
-        self.sym_table.set_info('ftos', [token.FLOATTYPE, token.STRINGTYPE])
-        
-        self.sym_table.add_id('itof')
-        self.sym_table.set_info('itof', [token.INTTYPE, token.FLOATTYPE])
-        
-        self.sym_table.add_id('stoi')
-        self.sym_table.set_info('stoi', [token.STRINGTYPE, token.INTTYPE])#
-        
-        self.sym_table.add_id('stof')
-        self.sym_table.set_info('stof', [token.STRINGTYPE, token.FLOATTYPE])#
-        
+
     def __error(self, msg, the_token):
         raise error.MyPLError(msg, the_token.line, the_token.column)
-        
+
+    def __matches(self, expected, actual):
+        return expected == token.NIL or actual == token.NIL or \
+            expected == actual
+
+    def __type_of(self, type_token):
+        # the type named in a declaration
+        if type_token.tokentype != token.ID:
+            return type_token.tokentype
+        if not isinstance(self.sym_table.get_info(type_token.lexeme), dict):
+            msg = 'undefined struct type "%s"' % type_token.lexeme
+            self.__error(msg, type_token)
+        return type_token.lexeme
+
+    def __first_token(self, expr):
+        # a token to report an error in expr at
+        while not isinstance(expr, ast.SimpleExpr):
+            if isinstance(expr, ast.ComplexExpr):
+                return expr.math_rel
+            expr = expr.first_expr
+        term = expr.term
+        if isinstance(term, ast.SimpleRValue):
+            return term.val
+        elif isinstance(term, ast.NewRValue):
+            return term.struct_type
+        elif isinstance(term, ast.CallRValue):
+            return term.fun
+        return term.path[0]
+
+    def __may_be_nil(self, expr):
+        # False if expr can never evaluate to nil
+        if isinstance(expr, ast.ComplexExpr):
+            return False
+        if not isinstance(expr, ast.SimpleExpr):
+            return True
+        term = expr.term
+        if isinstance(term, ast.SimpleRValue):
+            return term.val.tokentype == token.NIL
+        elif isinstance(term, ast.NewRValue):
+            return False
+        elif isinstance(term, ast.CallRValue):
+            built_in = built_ins.lookup(term.fun.lexeme)
+            return built_in is None or built_in.return_type == token.NIL \
+                or built_in.may_return_nil
+        return True
+
+    def __path_type(self, path):
+        # the type of a variable or path expression
+        var_token = path[0]
+        if not self.sym_table.id_exists(var_token.lexeme):
+            msg = 'undefined variable "%s"' % var_token.lexeme
+            self.__error(msg, var_token)
+        the_type = self.sym_table.get_info(var_token.lexeme)
+        if not isinstance(the_type, (int, str)):
+            msg = '"%s" is not a variable' % var_token.lexeme
+            self.__error(msg, var_token)
+        prev_token = var_token
+        for path_id in path[1:]:
+            if the_type == token.NIL:
+                # fields of an untyped nil variable aren't known
+                return token.NIL
+            fields = self.sym_table.get_info(the_type)
+            if not isinstance(fields, dict):
+                msg = '"%s" is not a struct' % prev_token.lexeme
+                self.__error(msg, path_id)
+            if path_id.lexeme not in fields:
+                msg = 'no field "%s" in struct %s' % (path_id.lexeme, the_type)
+                self.__error(msg, path_id)
+            the_type = fields[path_id.lexeme]
+            prev_token = path_id
+        return the_type
+
+    def __check_fun_body(self, fun_decl, param_types, return_type):
+        # params get their own environment under the body's
+        self.sym_table.push_environment()
+        self.sym_table.add_id('return')
+        self.sym_table.set_info('return', return_type)
+        for param in fun_decl.params:
+            param.accept(self)
+        fun_decl.stmt_list.accept(self)
+        self.sym_table.pop_environment()
+
+    def check_more(self, stmt_list):
+        """Checks statements that extend the ones checked so far by
+        check_more (as the REPL does), in one global environment. If
+        they don't type check, the environment is left as it was."""
+        scopes = self.sym_table.scopes
+        global_env = scopes[0]
+        saved = dict(global_env)
+        try:
+            self.deferred = []
+            for stmt in stmt_list.stmts:
+                stmt.accept(self)
+            for fun_info in self.deferred:
+                self.__check_fun_body(*fun_info)
+        except error.MyPLError:
+            global_env.clear()
+            global_env.update(saved)
+            del scopes[1:]
+            self.sym_table.set_env_id(id(global_env))
+            raise
+        finally:
+            self.deferred = []
+
     def visit_stmt_list(self, stmt_list):
         # add new block (scope)
         self.sym_table.push_environment()
+        outer_deferred = self.deferred
+        self.deferred = []
         for stmt in stmt_list.stmts:
             stmt.accept(self)
+        deferred = self.deferred
+        self.deferred = outer_deferred
+        for fun_info in deferred:
+            self.__check_fun_body(*fun_info)
         # remove new block
         self.sym_table.pop_environment()
-        
+
     def visit_expr_stmt(self, expr_stmt):
         expr_stmt.expr.accept(self)
-        
-    ####    
+
     def visit_var_decl_stmt(self, var_decl):
-        #print(var_decl.var_expr.term.val)
         var_decl.var_expr.accept(self)
         expr_type = self.current_type
-        if (var_decl.var_type != None):
-            if var_decl.var_type.tokentype == token.ID:
-                v_type = var_decl.var_type.lexeme
-            else: 
-                v_type = var_decl.var_type.tokentype
+        if var_decl.var_type is not None:
+            var_type = self.__type_of(var_decl.var_type)
+            if not self.__matches(var_type, expr_type):
+                msg = 'mismatched type in variable declaration'
+                self.__error(msg, var_decl.var_id)
         else:
-            v_type = expr_type
-        
-        if expr_type != token.NIL and expr_type != v_type:
-            print(expr_type)
-            print(v_type)
-        
-            msg = 'mismatch type in variable expression'
-            self.__error(msg, var_decl.var_id)
-            
+            var_type = expr_type
         self.sym_table.add_id(var_decl.var_id.lexeme)
-        #print(var_decl.var_id.lexeme)
-        self.sym_table.set_info(var_decl.var_id.lexeme, v_type)
-    
-            
-    
+        self.sym_table.set_info(var_decl.var_id.lexeme, var_type)
+
     def visit_assign_stmt(self, assign_stmt):
         assign_stmt.rhs.accept(self)
         rhs_type = self.current_type
         assign_stmt.lhs.accept(self)
         lhs_type = self.current_type
-        if rhs_type != token.NIL and rhs_type != lhs_type:
-            msg = 'mismatch type in assignment'
+        if not self.__matches(lhs_type, rhs_type):
+            msg = 'mismatched type in assignment'
             self.__error(msg, assign_stmt.lhs.path[0])
-      
-    
+
     def visit_struct_decl_stmt(self, struct_decl):
-        #self.sym_table.push_environment()
+        # the struct is declared first so fields can refer to it
+        fields = {}
         self.sym_table.add_id(struct_decl.struct_id.lexeme)
-        struct_params = {}
+        self.sym_table.set_info(struct_decl.struct_id.lexeme, fields)
+        self.sym_table.push_environment()
         for var_decl in struct_decl.var_decls:
             var_decl.accept(self)
-            struct_params[var_decl.var_id.lexeme] = self.current_type
-        self.sym_table.set_info(struct_decl.struct_id.lexeme, struct_params)
-        
-        #self.sym_table.push_environment()
-        
+            name = var_decl.var_id.lexeme
+            fields[name] = self.sym_table.get_info(name)
+        self.sym_table.pop_environment()
+
     def visit_fun_decl_stmt(self, fun_decl):
-        self.sym_table.add_id(fun_decl.fun_name.lexeme)
-        fun_params = []
-        if fun_decl.return_type is None:
+        param_types = []
+        for param in fun_decl.params:
+            param_types.append(self.__type_of(param.param_type))
+        if fun_decl.return_type.tokentype == token.NIL:
             return_type = token.NIL
         else:
-            return_type = fun_decl.return_type
-            if not return_type is str:
-                return_type = return_type.tokentype
-        self.sym_table.push_environment()
-        self.sym_table.add_id('return')
-        self.sym_table.set_info('return', return_type)
-        for params in fun_decl.params:  
-            params.accept(self)
-            fun_params.append(self.current_type)
-            
-        fun_decl.stmt_list.accept(self)
-        self.sym_table.set_info(fun_decl.fun_name.lexeme, [fun_params, return_type])
+            return_type = self.__type_of(fun_decl.return_type)
+        self.sym_table.add_id(fun_decl.fun_name.lexeme)
+        self.sym_table.set_info(fun_decl.fun_name.lexeme,
+                                [param_types, return_type])
+        self.deferred.append((fun_decl, param_types, return_type))
 
-        self.sym_table.pop_environment()
-    
-    
-    
     def visit_return_stmt(self, return_stmt):
-        #if return_stmt.return_expr != None:
-        return_stmt.return_expr.accept(self)
-        return_type = self.current_type
-        #print(return_type)
-        
+        if return_stmt.return_expr is None:
+            return_type = token.NIL
+        else:
+            return_stmt.return_expr.accept(self)
+            return_type = self.current_type
+        # (a return outside of a function isn't checked)
         expected_type = self.sym_table.get_info('return')
-        if return_type != token.NIL and return_type != expected_type:
-            msg = "return types don't match"
+        if expected_type is not None and \
+           not self.__matches(expected_type, return_type):
+            msg = "return type doesn't match"
             self.__error(msg, return_stmt.return_token)
-        
-    
+
     def visit_while_stmt(self, while_stmt):
         while_stmt.bool_expr.accept(self)
-
         while_stmt.stmt_list.accept(self)
-        
+
     def visit_if_stmt(self, if_stmt):
         if_stmt.if_part.bool_expr.accept(self)
-        
         if_stmt.if_part.stmt_list.accept(self)
         for elseif in if_stmt.elseifs:
+            elseif.bool_expr.accept(self)
             elseif.stmt_list.accept(self)
         if if_stmt.has_else:
             if_stmt.else_stmts.accept(self)
-    
+
     def visit_simple_expr(self, simple_expr):
         simple_expr.term.accept(self)
-        
-        
+        simple_expr.static_type = self.current_type
+
     def visit_complex_expr(self, complex_expr):
-        complex_expr.first_operand.accept(self)
-        first_type = self.current_type
-        rel = complex_expr.math_rel.tokentype
-        complex_expr.rest.accept(self)
-        second_type = self.current_type
-        
-        if rel == token.MODULO:
-            if (first_type == token.INTTYPE and second_type == token.INTTYPE):
-                pass
-            else:
-                msg = "improper values, can only do int, int"
-                self.__error(msg, complex_expr.math_rel)
-        if rel == token.DIVIDE or rel == token.MULTIPLY or rel == token.MINUS:
-            if (first_type == token.INTTYPE and second_type == token.INTTYPE) or (first_type == token.FLOATTYPE and second_type == token.FLOATTYPE): 
-                pass
-            else:
-                msg = "improper values, can only int, int, or float, float"
-                self.__error(msg, complex_expr.math_rel)
-        if rel == token.PLUS:
-            if (first_type == token.INTTYPE and second_type == token.INTTYPE) or (first_type == token.FLOATTYPE and second_type == token.FLOATTYPE) or (first_type == token.STRINGTYPE and second_type == token.STRINGTYPE):
-                pass
-            else:
-                msg = "improper values, can only int, int, or float, float or string, string"
-                self.__error(msg, complex_expr.math_rel)
-        
-    
-    def visit_bool_expr(self, bool_expr):
+        # check the operands of a chain left to right in a loop (chains
+        # can be long), then its operators right to left (a + (b + c))
+        exprs = []
+        first_types = []
+        expr = complex_expr
+        while isinstance(expr, ast.ComplexExpr):
+            expr.first_operand.accept(self)
+            exprs.append(expr)
+            first_types.append(self.current_type)
+            expr = expr.rest
+        expr.accept(self)
+        the_type = self.current_type
+        for i in range(len(exprs) - 1, -1, -1):
+            the_type = self.__math_type(exprs[i].math_rel, first_types[i],
+                                        the_type)
+            exprs[i].static_type = the_type
+        self.current_type = the_type
 
+    def __math_type(self, math_rel, first_type, second_type):
+        # the type of first_type math_rel second_type
+        if first_type == token.NIL:
+            the_type = second_type
+        elif second_type == token.NIL or first_type == second_type:
+            the_type = first_type
+        else:
+            msg = 'mismatched operand types for "%s"' % math_rel.lexeme
+            self.__error(msg, math_rel)
+        if the_type != token.NIL and \
+           the_type not in MATH_TYPES[math_rel.tokentype]:
+            msg = 'bad operand type for "%s"' % math_rel.lexeme
+            self.__error(msg, math_rel)
+        return the_type
+
+    def visit_bool_expr(self, bool_expr):
         bool_expr.first_expr.accept(self)
-        first_expr_type = self.current_type
-        
+        first_type = self.current_type
         if bool_expr.bool_rel is None:
-            if first_expr_type != token.BOOLTYPE:
-                msg = 'missing bool expression'
-                self.__error(msg, bool_expr.bool_rel)
-            
+            if not self.__matches(token.BOOLTYPE, first_type):
+                msg = 'expecting a bool expression'
+                self.__error(msg, self.__first_token(bool_expr.first_expr))
         else:
             bool_expr.second_expr.accept(self)
-            second_expr_type = self.current_type
-            
-            if bool_expr.bool_rel.tokentype == token.EQUAL or bool_expr.bool_rel.tokentype == token.NOT_EQUAL:
-                pass
-            elif first_expr_type != second_expr_type:
-                msg = 'mismatching comparison types'
+            second_type = self.current_type
+            rel = bool_expr.bool_rel.tokentype
+            if not self.__matches(first_type, second_type):
+                msg = 'mismatched comparison types'
                 self.__error(msg, bool_expr.bool_rel)
-                
-
+            if rel != token.EQUAL and rel != token.NOT_EQUAL:
+                for the_type in [first_type, second_type]:
+                    if the_type != token.NIL and the_type not in ORDERED_TYPES:
+                        msg = 'bad comparison type'
+                        self.__error(msg, bool_expr.bool_rel)
         if bool_expr.bool_connector is not None:
             bool_expr.rest.accept(self)
-        
-    
+        bool_expr.static_type = token.BOOLTYPE
+        self.current_type = token.BOOLTYPE
+
     def visit_lvalue(self, lval):
-        # check the first id in the path
-        var_token = lval.path[0]
-        if not self.sym_table.id_exists(var_token.lexeme):
-            msg = 'undefined variable "%s"' % var_token.lexeme
-            self.__error(msg, var_token)
-        self.current_type = self.sym_table.get_info(var_token.lexeme)
-        # check if struct for a longer path expression
-    
+        self.current_type = self.__path_type(lval.path)
+
     def visit_fun_param(self, fun_param):
         self.sym_table.add_id(fun_param.param_name.lexeme)
-        self.sym_table.set_info(fun_param.param_name.lexeme, fun_param.param_type.tokentype)
+        self.sym_table.set_info(fun_param.param_name.lexeme,
+                                self.__type_of(fun_param.param_type))
 
     def visit_simple_rvalue(self, simple_rvalue):
         if simple_rvalue.val.tokentype == token.INTVAL:
@@ -240,34 +313,37 @@ class TypeChecker(ast.Visitor):
             self.current_type = token.BOOLTYPE
         elif simple_rvalue.val.tokentype == token.STRINGVAL:
             self.current_type = token.STRINGTYPE
-            #if self.sym_table.id_exists(simple_rvalue.val.lexeme):
-            #    self.current_type = self.sym_table.get_info(simple_rvalue.val.lexeme)
         elif simple_rvalue.val.tokentype == token.NIL:
             self.current_type = token.NIL
 
-      
     def visit_new_rvalue(self, new_rvalue):
-        if not self.sym_table.id_exists(new_rvalue.struct_type.lexeme):
-            msg = 'Struct ID not declared'
-            self.__error(msg, new_rvalue)
-        self.current_type = new_rvalue.struct_type.lexeme
-        
-        
-        
+        self.current_type = self.__type_of(new_rvalue.struct_type)
+
     def visit_call_rvalue(self, call_rvalue):
-        if not self.sym_table.id_exists(call_rvalue.fun.lexeme):
-            msg = 'Struct ID not declared'
+        fun_name = call_rvalue.fun.lexeme
+        built_in = built_ins.lookup(fun_name)
+        if built_in is not None:
+            param_types = built_in.param_types
+            return_type = built_in.return_type
+        else:
+            fun_info = self.sym_table.get_info(fun_name)
+            if not isinstance(fun_info, list):
+                msg = 'undefined function "%s"' % fun_name
+                self.__error(msg, call_rvalue.fun)
+            param_types, return_type = fun_info
+        if len(call_rvalue.args) != len(param_types):
+            msg = '"%s" expects %i argument(s), found %i' % \
+                (fun_name, len(param_types), len(call_rvalue.args))
             self.__error(msg, call_rvalue.fun)
-        for expr in call_rvalue.args:
-            expr.accept(self)
-        
-        
-    
+        call_rvalue.check_nil = False
+        for arg, param_type in zip(call_rvalue.args, param_types):
+            arg.accept(self)
+            if not self.__matches(param_type, self.current_type):
+                msg = 'mismatched argument type for "%s"' % fun_name
+                self.__error(msg, self.__first_token(arg))
+            if self.__may_be_nil(arg):
+                call_rvalue.check_nil = True
+        self.current_type = return_type
+
     def visit_id_rvalue(self, id_rvalue):
-        for i in id_rvalue.path:
-            if not self.sym_table.id_exists(i.lexeme):
-                msg = 'ID rval not declared'
-                self.__error(msg, i)
-        self.current_type = self.sym_table.get_info(id_rvalue.path[-1].lexeme)
-    
-    
\ No newline at end of file
+        self.current_type = self.__path_type(id_rvalue.path)
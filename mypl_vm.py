@@ -0,0 +1,334 @@
+#!/usr/bin/python3
+#
+# mypl_vm.py
+# Description:
+#   Stack-based virtual machine that runs code from mypl_compiler
+#----------------------------------------------------------------------
+
+import mypl_error as error
+import mypl_heap as mheap
+import mypl_builtins as built_ins
+import mypl_memo as memo
+import mypl_rope as rope
+from mypl_compiler import (LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, LOAD_GLOBAL,
+                           STORE_GLOBAL, LOAD_FIELD, STORE_FIELD, POP, JUMP,
+                           JUMP_IF_FALSE, CALL, CALL_BUILT_IN, RETURN,
+                           BUILD_STRUCT, ADD, SUBTRACT, MULTIPLY, DIVIDE,
+                           MODULO, EQUAL, NOT_EQUAL, LESS_THAN, LESS_THAN_EQUAL,
+                           GREATER_THAN, GREATER_THAN_EQUAL, AND, OR, NOT,
+                           ADD_CONST, SUBTRACT_CONST, JUMP_IF_NOT_EQUAL,
+                           JUMP_IF_NOT_NOT_EQUAL, JUMP_IF_NOT_LESS_THAN,
+                           JUMP_IF_NOT_LESS_THAN_EQUAL, JUMP_IF_NOT_GREATER_THAN,
+                           JUMP_IF_NOT_GREATER_THAN_EQUAL, LOAD_FIELD_INDEX,
+                           STORE_FIELD_INDEX, LOAD_TEMPLATE, NEW,
+                           BUILD_STRING, RETURN_MEMO, CALL_FUNCTION,
+                           TAIL_CALL_FUNCTION, CONCAT)
+
+
+class VM(object):
+    """Runs a compiled MyPL program. Calls push the caller's state on an
+    explicit frame stack (instead of recursing in python), so recursion
+    depth is only limited by memory, and values are passed on a single
+    operand stack. Tail calls (return f(...)) reuse the caller's place on
+    the frame stack.
+    """
+    def __init__(self, memo_size=memo.DEFAULT_CACHE_SIZE, output=None,
+                 input_source=None):
+        self.globals = None # the program's frame
+        # allocates struct instances (and keeps heap statistics)
+        self.heap = mheap.Heap()
+        # result caches of pure functions (keyed by their code)
+        self.memo = memo.Memo(memo_size)
+        # where print writes (flushed when the run ends)
+        self.output = output if output is not None else built_ins.Output()
+        # where reads, readi, and readf read from
+        if input_source is None:
+            input_source = built_ins.Input()
+        self.input_source = input_source
+
+    def __error(self, msg, the_token):
+        raise error.MyPLError(msg, the_token.line, the_token.column)
+
+    def run(self, program):
+        outer_output = built_ins.set_output(self.output)
+        outer_input = built_ins.set_input(self.input_source)
+        try:
+            self.__execute(program)
+        except (TypeError, AttributeError) as e:
+            self.__nil_error(program, e)
+        finally:
+            self.output.flush()
+            built_ins.close_files()
+            built_ins.set_output(outer_output)
+            built_ins.set_input(outer_input)
+
+    def __nil_error(self, program, e):
+        # a TypeError or AttributeError ended the run: if a math
+        # instruction failed on a nil operand or a field access on a nil
+        # struct (the other case is a program that wasn't type checked),
+        # report it at the operator or field, reading the instruction and
+        # its operands from the locals of __execute
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code is not _EXECUTE_CODE:
+            tb = tb.tb_next
+        if tb is None:
+            raise
+        state = tb.tb_frame.f_locals
+        instrs, pc, stack = state['instrs'], state['pc'] - 2, state['stack']
+        codes = [code for code in program.codes if code.instrs is instrs]
+        op_token = codes[0].tokens.get(pc) if codes else None
+        if op_token is None:
+            raise
+        op, arg = instrs[pc], instrs[pc + 1]
+        if op == BUILD_STRING:
+            # report a nil part where the chain applied right to left
+            # fails: at the rightmost operator next to a nil part (the
+            # token is the list of the chain's operators)
+            parts = stack[-arg:]
+            nils = [i for i, part in enumerate(parts) if part is None]
+            if nils:
+                self.__error('value is nil', op_token[min(nils[-1], arg - 2)])
+            raise
+        if op == LOAD_FIELD or op == LOAD_FIELD_INDEX:
+            operands = [stack[-1]]
+        elif op == STORE_FIELD or op == STORE_FIELD_INDEX:
+            operands = [state['struct_obj']]
+        elif op == ADD_CONST or op == SUBTRACT_CONST:
+            operands = [stack[-1], state['consts'][arg]]
+        else:
+            operands = [stack[-1], state.get('rhs')]
+        if any(operand is None for operand in operands):
+            self.__error('value is nil', op_token)
+        raise
+
+    def __execute(self, program):
+        instrs = program.instrs
+        consts = program.consts
+        local_vals = [None] * program.num_locals
+        global_vals = local_vals
+        self.globals = global_vals
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = [] # saved (instrs, consts, pc, local_vals) of callers
+        # calls to pure code also save (cache, key) to store the result
+        memo_on = self.memo.max_size > 0
+        MISSING = memo.MISSING
+        float_key = memo.float_key
+        ROPE_MIN = rope.ROPE_MIN
+        pc = 0
+        # most frequent instructions are tested first
+        while True:
+            op = instrs[pc]
+            arg = instrs[pc + 1]
+            pc += 2
+            if op == LOAD_LOCAL:
+                push(local_vals[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_LOCAL:
+                local_vals[arg] = pop()
+            elif op == ADD_CONST:
+                stack[-1] = stack[-1] + consts[arg]
+            elif op == JUMP_IF_NOT_LESS_THAN:
+                rhs = pop()
+                if not pop() < rhs:
+                    pc = arg
+            elif op == JUMP_IF_NOT_EQUAL:
+                rhs = pop()
+                if not pop() == rhs:
+                    pc = arg
+            elif op == SUBTRACT_CONST:
+                stack[-1] = stack[-1] - consts[arg]
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == ADD:
+                rhs = pop()
+                stack[-1] = stack[-1] + rhs
+            elif op == SUBTRACT:
+                rhs = pop()
+                stack[-1] = stack[-1] - rhs
+            elif op == CONCAT:
+                rhs = pop()
+                lhs = stack[-1]
+                if lhs.__class__ is str and rhs.__class__ is str and \
+                   len(lhs) + len(rhs) < ROPE_MIN:
+                    stack[-1] = lhs + rhs
+                else:
+                    stack[-1] = rope.concat(lhs, rhs)
+            elif op == EQUAL:
+                rhs = pop()
+                stack[-1] = stack[-1] == rhs
+            elif op == LESS_THAN:
+                rhs = pop()
+                stack[-1] = stack[-1] < rhs
+            elif op == LOAD_GLOBAL:
+                push(global_vals[arg])
+            elif op == LOAD_FIELD_INDEX:
+                stack[-1] = stack[-1][arg]
+            elif op == STORE_FIELD_INDEX:
+                struct_obj = pop()
+                struct_obj[arg] = pop()
+            elif op == CALL_FUNCTION:
+                # the params are the callee's first locals, so the
+                # arguments are its frame up to the other (blank) locals
+                code, argc = consts[arg]
+                if argc:
+                    callee_vals = stack[-argc:]
+                    del stack[-argc:]
+                    callee_vals += code.blank_locals
+                else:
+                    callee_vals = code.blank_locals[:]
+                frames.append((instrs, consts, pc, local_vals))
+                instrs = code.instrs
+                consts = code.consts
+                local_vals = callee_vals
+                pc = 0
+            elif op == TAIL_CALL_FUNCTION:
+                # a CALL_FUNCTION that drops the caller's frame (the
+                # callee returns straight to the caller's caller)
+                code, argc = consts[arg]
+                if argc:
+                    local_vals = stack[-argc:]
+                    del stack[-argc:]
+                    local_vals += code.blank_locals
+                else:
+                    local_vals = code.blank_locals[:]
+                instrs = code.instrs
+                consts = code.consts
+                pc = 0
+            elif op == CALL:
+                # the callee sits below its arguments on the stack
+                code = stack[-arg - 1]
+                callee_vals = [None] * code.num_locals
+                if arg:
+                    args = stack[-arg:]
+                    for slot, val in zip(code.param_slots, args):
+                        callee_vals[slot] = val
+                del stack[-arg - 1:]
+                if code.pure:
+                    entry = None
+                    if memo_on:
+                        cache = self.memo.cache_for(code, code.name)
+                        key = tuple(args) if arg else ()
+                        if code.float_params:
+                            key = float_key(key)
+                        value = cache.get(key)
+                        if value is not MISSING:
+                            push(value)
+                            continue
+                        entry = (cache, key)
+                    frames.append((instrs, consts, pc, local_vals, entry))
+                else:
+                    frames.append((instrs, consts, pc, local_vals))
+                instrs = code.instrs
+                consts = code.consts
+                local_vals = callee_vals
+                pc = 0
+            elif op == RETURN:
+                # the return value stays on top of the stack
+                if not frames:
+                    return
+                instrs, consts, pc, local_vals = frames.pop()
+            elif op == RETURN_MEMO:
+                instrs, consts, pc, local_vals, entry = frames.pop()
+                if entry is not None:
+                    entry[0].put(entry[1], stack[-1])
+            elif op == JUMP:
+                pc = arg
+            elif op == CALL_BUILT_IN:
+                fun, argc, fun_token, check_nil = consts[arg]
+                if argc:
+                    args = stack[-argc:]
+                    del stack[-argc:]
+                    if check_nil and None in args:
+                        self.__error('value is nil', fun_token)
+                    try:
+                        push(fun(*args))
+                    except built_ins.BuiltInError as e:
+                        self.__error(str(e), fun_token)
+                else:
+                    try:
+                        push(fun())
+                    except built_ins.BuiltInError as e:
+                        self.__error(str(e), fun_token)
+            elif op == POP:
+                pop()
+            elif op == STORE_GLOBAL:
+                global_vals[arg] = pop()
+            elif op == LOAD_FIELD:
+                stack[-1] = consts[arg].get(stack[-1])
+            elif op == STORE_FIELD:
+                struct_obj = pop()
+                consts[arg].set(struct_obj, pop())
+            elif op == MULTIPLY:
+                rhs = pop()
+                stack[-1] = stack[-1] * rhs
+            elif op == DIVIDE:
+                rhs = pop()
+                stack[-1] = stack[-1] / rhs
+            elif op == MODULO:
+                rhs = pop()
+                stack[-1] = stack[-1] % rhs
+            elif op == NOT_EQUAL:
+                rhs = pop()
+                stack[-1] = stack[-1] != rhs
+            elif op == LESS_THAN_EQUAL:
+                rhs = pop()
+                stack[-1] = stack[-1] <= rhs
+            elif op == GREATER_THAN:
+                rhs = pop()
+                stack[-1] = stack[-1] > rhs
+            elif op == GREATER_THAN_EQUAL:
+                rhs = pop()
+                stack[-1] = stack[-1] >= rhs
+            elif op == AND:
+                rhs = pop()
+                stack[-1] = stack[-1] and rhs
+            elif op == OR:
+                rhs = pop()
+                stack[-1] = stack[-1] or rhs
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == JUMP_IF_NOT_NOT_EQUAL:
+                rhs = pop()
+                if not pop() != rhs:
+                    pc = arg
+            elif op == JUMP_IF_NOT_LESS_THAN_EQUAL:
+                rhs = pop()
+                if not pop() <= rhs:
+                    pc = arg
+            elif op == JUMP_IF_NOT_GREATER_THAN:
+                rhs = pop()
+                if not pop() > rhs:
+                    pc = arg
+            elif op == JUMP_IF_NOT_GREATER_THAN_EQUAL:
+                rhs = pop()
+                if not pop() >= rhs:
+                    pc = arg
+            elif op == BUILD_STRING:
+                try:
+                    stack[-arg:] = [''.join(stack[-arg:])]
+                except TypeError:
+                    # a part is a rope
+                    stack[-arg:] = [rope.join(stack[-arg:])]
+            elif op == NEW:
+                code = stack[-1]
+                if code.template is not None:
+                    stack[-1] = self.heap.allocate(code.layout, code.template)
+                else:
+                    pop()
+                    frames.append((instrs, consts, pc, local_vals))
+                    instrs = code.instrs
+                    consts = code.consts
+                    local_vals = [None] * code.num_locals
+                    pc = 0
+            elif op == LOAD_TEMPLATE:
+                local_vals[:] = consts[arg]
+            elif op == BUILD_STRUCT:
+                # a struct's locals are exactly its field values
+                push(self.heap.allocate(consts[arg], local_vals))
+
+
+_EXECUTE_CODE = VM._VM__execute.__code__
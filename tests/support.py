@@ -0,0 +1,55 @@
+#
+# Description:
+# Helpers shared by the tests: running a MyPL program from a string
+# with hw7.py, with given options and standard input.
+#----------------------------------------------------------------------
+import atexit
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+# the programs run, and the AST cache of their runs
+TEMP_DIR = tempfile.mkdtemp(prefix='mypl-tests-')
+atexit.register(shutil.rmtree, TEMP_DIR, True)
+
+def hw7_args(options):
+    # the command line options of hw7.py for options (e.g. memo_size=0
+    # is --memo-size 0)
+    args = []
+    for name, value in options.items():
+        flag = '--' + name.replace('_', '-')
+        if value is True:
+            args.append(flag)
+        elif value is not False and value is not None:
+            args += [flag, str(value)]
+    return args
+
+def run_hw7(source, stdin='', **options):
+    """Runs the MyPL program source with hw7.py and the options (named
+    like its command line options, e.g. vm=True), reading stdin. Gives
+    back the finished process, with its stdout and stderr."""
+    fd, path = tempfile.mkstemp(suffix='.txt', dir=TEMP_DIR)
+    with os.fdopen(fd, 'w', encoding='utf-8') as source_file:
+        source_file.write(source)
+    try:
+        return subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'hw7.py')] +
+            hw7_args(options) + [path], input=stdin, capture_output=True,
+            encoding='utf-8',
+            env=dict(os.environ, MYPL_CACHE_DIR=os.path.join(TEMP_DIR,
+                                                             'cache')))
+    finally:
+        os.remove(path)
+
+def run(source, stdin='', **options):
+    """Runs source like run_hw7. Gives back what it printed and the
+    error that ended it (None if it didn't)."""
+    process = run_hw7(source, stdin, **options)
+    if process.returncode != 0:
+        return process.stdout, process.stderr.strip()
+    return process.stdout, None
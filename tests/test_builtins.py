@@ -0,0 +1,76 @@
+#
+# Description:
+# Tests of the built-in functions that read input: at the end of the
+# input they give back nil, which has to be reported as a MyPL error
+# where it's used (and never printed or added to).
+#----------------------------------------------------------------------
+import os
+import tempfile
+import unittest
+
+from support import run
+
+ENGINES = [{}, {'vm': True}, {'optimize': True}, {'no_type_check': True}]
+
+
+class ReadAtEndTest(unittest.TestCase):
+
+    def assertNilError(self, source, stdin=''):
+        for options in ENGINES:
+            with self.subTest(**options):
+                output, message = run(source, stdin, **options)
+                self.assertEqual(output, '')
+                self.assertIsNotNone(message)
+                self.assertIn('value is nil', message)
+
+    def test_reads(self):
+        self.assertNilError('print(reads());')
+
+    def test_readi(self):
+        self.assertNilError('print(itos(readi()));')
+
+    def test_readf(self):
+        self.assertNilError('print(ftos(readf()));')
+
+    def test_freadl(self):
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            path = f.name
+        try:
+            self.assertNilError('var f = fopen("%s");\n'
+                                'print(freadl(f));\n' % path)
+        finally:
+            os.remove(path)
+
+    def test_math_on_nil(self):
+        self.assertNilError('print(itos(readi() + 1));')
+        self.assertNilError('print(ftos(2.0 * readf()));')
+        self.assertNilError('print("[" + reads() + "]");')
+
+    def test_reads_before_end(self):
+        for options in ENGINES:
+            with self.subTest(**options):
+                output, message = run('print(itos(readi() + 1));', '41\n',
+                                      **options)
+                self.assertEqual((output, message), ('42', None))
+
+
+class FileNewlineTest(unittest.TestCase):
+
+    def test_crlf_file(self):
+        # a file's lines end in \n (like those of reads), whatever it
+        # was written with
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(b'one\r\ntwo\rthree\r\n')
+            path = f.name
+        self.addCleanup(os.remove, path)
+        source = ('var f = fopen("%s");\n'
+                  'print(freadl(f) + "|" + freadl(f) + "|");\n'
+                  'print(freadl(f) + "|" + fread("%s"));\n' % (path, path))
+        for options in ENGINES:
+            with self.subTest(**options):
+                self.assertEqual(run(source, **options),
+                                 ('one|two|three|one\ntwo\nthree\n', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#
+# Description:
+# Tests of the AST cache's directory: entries are unpickled, so the
+# cache only uses a directory no one else can write to.
+#----------------------------------------------------------------------
+import os
+import stat
+import tempfile
+import unittest
+
+import support # (puts the modules on the path)
+import mypl_cache as cache
+
+
+class CacheDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_made_private(self):
+        directory = os.path.join(self.temp_dir.name, 'a', 'cache')
+        the_cache = cache.Cache(directory)
+        self.assertTrue(the_cache.store('key', [1, 2]))
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+        self.assertEqual(cache.Cache(directory).load('key'), [1, 2])
+
+    def test_writable_by_others(self):
+        directory = os.path.join(self.temp_dir.name, 'cache')
+        cache.Cache(directory).store('key', [1, 2])
+        os.chmod(directory, 0o777)
+        the_cache = cache.Cache(directory)
+        self.assertIsNone(the_cache.load('key'))
+        self.assertFalse(the_cache.store('other', [3]))
+        self.assertEqual(os.listdir(directory), ['key' + cache.SUFFIX])
+
+    def test_not_a_directory(self):
+        path = os.path.join(self.temp_dir.name, 'cache')
+        os.symlink(self.temp_dir.name, path)
+        self.assertFalse(cache.Cache(path).store('key', [1, 2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
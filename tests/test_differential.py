@@ -0,0 +1,128 @@
+#
+# Description:
+# Differential tests: each of the hw7_t*.txt programs and the
+# regression programs below has to print the same thing (and end with
+# the same error, if any) however it's run: on the interpreter or the
+# VM, with the streaming lexer, optimized, without the type checker, or
+# without memoization.
+#----------------------------------------------------------------------
+import glob
+import os
+import unittest
+
+from support import ROOT, run
+
+MODES = [{'vm': True}, {'stream_lexer': True}, {'optimize': True},
+         {'no_type_check': True}, {'no_type_check': True, 'vm': True},
+         {'memo_size': 0}]
+
+# the input of the programs that read it
+STDIN = 'Bob\n' * 10
+
+# reading at the end of the input gives nil (these are run on no input)
+NIL_PROGRAMS = {
+    'nil reads': 'print("[" + reads() + "]\\n");',
+    'nil readi': 'print(itos(readi() + 1) + "\\n");',
+    'nil readf': 'print(ftos(2.0 * readf()) + "\\n");',
+    'nil in a chain': 'print("a" + reads() + "b" + "c" + "\\n");',
+}
+
+PROGRAMS = {
+    # a field of a nil struct
+    'nil field': '''
+struct N
+    var v = 0;
+    var next: N = nil;
+end
+var n = new N;
+print(itos(n.next.v));
+''',
+    'nil field store': '''
+struct N
+    var v = 0;
+    var next: N = nil;
+end
+var n = new N;
+set n.next.next.v = 3;
+''',
+    # a struct variable given a new value of the same type
+    'struct assign': '''
+struct A
+    var x = 1;
+    var y = 2;
+end
+var a = new A;
+var b = new A;
+set b.y = 10;
+set a = b;
+var c: A = nil;
+set c = a;
+print(itos(a.x + a.y) + " " + itos(c.y) + "\\n");
+''',
+    # memoized calls on 0.0 and -0.0
+    'signed zero': '''
+fun string show(x: float)
+    return ftos(x);
+end
+print(show(0.0) + " " + show(stof("-0.0")) + " " + show(0.0) + "\\n");
+''',
+}
+
+# a variable given a struct of another type, which only runs without
+# the type checker (so it's only compared between untyped runs)
+UNTYPED_PROGRAMS = {
+    'struct reassign': '''
+struct A
+    var x = 1;
+end
+struct B
+    var y = 2;
+    var x = 10;
+end
+var s = new A;
+set s = new B;
+print(itos(s.x) + "\\n");
+''',
+}
+
+
+def hw7_programs():
+    programs = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, 'hw7_t*.txt'))):
+        with open(path) as source_file:
+            programs[os.path.basename(path)] = source_file.read()
+    return programs
+
+
+class DifferentialTest(unittest.TestCase):
+
+    def assertSameRuns(self, programs, base, modes, stdin=STDIN):
+        for name, source in programs.items():
+            expected = run(source, stdin, **base)
+            for options in modes:
+                with self.subTest(program=name, **options):
+                    self.assertEqual(run(source, stdin,
+                                         **dict(base, **options)), expected)
+
+    def test_hw7_programs(self):
+        programs = hw7_programs()
+        self.assertTrue(programs)
+        self.assertSameRuns(programs, {}, MODES)
+
+    def test_regression_programs(self):
+        self.assertSameRuns(PROGRAMS, {}, MODES)
+
+    def test_nil_programs(self):
+        self.assertSameRuns(NIL_PROGRAMS, {}, MODES, stdin='')
+
+    def test_untyped_programs(self):
+        modes = [options for options in MODES
+                 if 'no_type_check' not in options]
+        self.assertSameRuns(UNTYPED_PROGRAMS, {'no_type_check': True}, modes)
+        # (and it doesn't pass the type checker)
+        output, message = run(UNTYPED_PROGRAMS['struct reassign'])
+        self.assertIn('mismatched type', message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#
+# Description:
+# Tests of the struct heap: structs a program drops are reclaimed, as
+# counted by --heap-stats.
+#----------------------------------------------------------------------
+import unittest
+
+from support import run_hw7
+
+ENGINES = [{}, {'vm': True}]
+
+# makes 1000 structs, each dropped by the next time around the loop
+DROPS = '''
+struct P
+    var x = 0;
+end
+var i = 0;
+while i < 1000 do
+    var p = new P;
+    set p.x = i;
+    set i = i + 1;
+end
+'''
+
+
+def heap_stats(report):
+    # name -> count of each line of a --heap-stats report
+    stats = {}
+    for line in report.splitlines():
+        name, sep, count = line.rpartition(':')
+        if sep:
+            stats[name] = int(count)
+    return stats
+
+
+class HeapStatsTest(unittest.TestCase):
+
+    def test_dropped_structs_are_reclaimed(self):
+        for options in ENGINES:
+            with self.subTest(**options):
+                process = run_hw7(DROPS, heap_stats=True, **options)
+                self.assertEqual(process.returncode, 0, process.stderr)
+                stats = heap_stats(process.stderr)
+                self.assertEqual(stats['allocated'], 1000)
+                # the last one can still be held by p
+                self.assertGreaterEqual(stats['reclaimed'], 999)
+                self.assertEqual(stats['live objects'],
+                                 stats['allocated'] - stats['reclaimed'])
+                self.assertEqual(stats['collections'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
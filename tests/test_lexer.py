@@ -0,0 +1,83 @@
+#
+# Description:
+# Tests of the lexers: BufferedLexer (the default) gives the same
+# tokens, with the same lines and columns, as the streaming Lexer, and
+# a TokenBuffer holds the same tokens again.
+#----------------------------------------------------------------------
+import glob
+import io
+import os
+import tempfile
+import unittest
+
+from support import ROOT
+import mypl_token as token
+import mypl_lexer as lexer
+
+
+def tokens_of(the_lexer):
+    # (type, lexeme, line, column) of each token, up to EOS
+    tokens = []
+    while True:
+        the_token = the_lexer.next_token()
+        tokens.append((the_token.tokentype, the_token.lexeme,
+                       the_token.line, the_token.column))
+        if the_token.tokentype == token.EOS:
+            return tokens
+
+
+def lex_file(lexer_class, path):
+    with open(path) as source_file:
+        return tokens_of(lexer_class(source_file))
+
+
+class SameTokensTest(unittest.TestCase):
+
+    def assertSameTokens(self, path):
+        expected = lex_file(lexer.Lexer, path)
+        self.assertEqual(lex_file(lexer.BufferedLexer, path), expected)
+        return expected
+
+    def test_hw7_programs(self):
+        paths = sorted(glob.glob(os.path.join(ROOT, 'hw7_t*.txt')))
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(program=os.path.basename(path)):
+                self.assertSameTokens(path)
+
+    def test_token_across_buffer_boundary(self):
+        # Lexer reads the file a character at a time through its read
+        # buffer: put an id, a string, and a number across the end of
+        # the first block (after a comment filling the rest of it)
+        size = io.DEFAULT_BUFFER_SIZE
+        for text in ['var long_name_%s = 1;\n' % ('x' * 40),
+                     'var s = "%s";\n' % ('y' * 40),
+                     'var f = 1234567890.0987654321;\n']:
+            for shift in range(0, len(text), 5):
+                source = '#' + ' ' * (size - shift - 2) + '\n' + text + \
+                    'print(s);\n'
+                with tempfile.NamedTemporaryFile('w', suffix='.txt',
+                                                 delete=False) as f:
+                    f.write(source)
+                self.addCleanup(os.remove, f.name)
+                with self.subTest(text=text, shift=shift):
+                    tokens = self.assertSameTokens(f.name)
+                    self.assertEqual(tokens[1][1], text.split()[1])
+
+
+class TokenBufferTest(unittest.TestCase):
+
+    def test_hw7_programs(self):
+        for path in sorted(glob.glob(os.path.join(ROOT, 'hw7_t*.txt'))):
+            with open(path) as source_file:
+                source = source_file.read()
+            with self.subTest(program=os.path.basename(path)):
+                tokens = lexer.BufferedLexer(io.StringIO(source)).tokenize()
+                expected = tokens_of(lexer.BufferedLexer(
+                    io.StringIO(source)))
+                self.assertEqual(len(tokens), len(expected))
+                self.assertEqual(tokens_of(tokens), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#
+# Description:
+# Tests of memoized calls to pure functions: a cached result is only
+# reused for arguments the function can't tell apart.
+#----------------------------------------------------------------------
+import unittest
+
+from support import run
+
+ENGINES = [{}, {'vm': True}, {'optimize': True}]
+
+SIGNED_ZERO = '''
+fun string show(x: float)
+    return ftos(x);
+end
+print(show(0.0) + " " + show(stof("-0.0")) + " " + show(0.0) + "\\n");
+'''
+
+# the same, with the float after another argument
+SIGNED_ZERO_PAIR = '''
+fun string show(n: int, x: float)
+    return itos(n) + ":" + ftos(x);
+end
+print(show(1, stof("-0.0")) + " " + show(1, 0.0) + "\\n");
+'''
+
+
+class FloatKeyTest(unittest.TestCase):
+
+    def assertOutput(self, source, expected):
+        for options in ENGINES:
+            with self.subTest(**options):
+                self.assertEqual(run(source, **options), (expected, None))
+        # and the same as without memoization
+        self.assertEqual(run(source, memo_size=0), (expected, None))
+
+    def test_signed_zero(self):
+        self.assertOutput(SIGNED_ZERO, '0.0 -0.0 0.0\n')
+
+    def test_signed_zero_after_int(self):
+        self.assertOutput(SIGNED_ZERO_PAIR, '1:-0.0 1:0.0\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
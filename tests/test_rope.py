@@ -0,0 +1,71 @@
+#
+# Description:
+# Tests of ropes: a string built with rope.concat or rope.join (a rope
+# once it reaches ROPE_MIN characters) acts like the same python str.
+#----------------------------------------------------------------------
+import unittest
+
+import support # (puts the modules on the path)
+import mypl_rope as rope
+
+# lengths around the one where results become ropes
+LENGTHS = [rope.ROPE_MIN - 1, rope.ROPE_MIN, rope.ROPE_MIN + 1,
+           3 * rope.ROPE_MIN]
+
+
+def pieces(length):
+    # short strings adding up to length characters
+    text = ''.join(chr(ord('a') + i % 26) for i in range(length))
+    return [text[i:i + 7] for i in range(0, length, 7)]
+
+
+class RopeTest(unittest.TestCase):
+
+    def assertActsLike(self, value, expected):
+        self.assertEqual(len(value), len(expected))
+        self.assertEqual(str(value), expected)
+        for i in [0, 1, len(expected) // 2, -1, -len(expected)]:
+            self.assertEqual(value[i], expected[i])
+        self.assertTrue(value == expected)
+        self.assertTrue(expected == value)
+        self.assertFalse(value != expected)
+        self.assertFalse(value == expected + 'x')
+        self.assertTrue(value < expected + 'x')
+        self.assertEqual(hash(value), hash(expected))
+        self.assertEqual({expected: 1}[value], 1)
+
+    def test_concat(self):
+        for length in LENGTHS:
+            with self.subTest(length=length):
+                value = ''
+                for piece in pieces(length):
+                    value = rope.concat(value, piece)
+                self.assertActsLike(value, ''.join(pieces(length)))
+                self.assertEqual(value.__class__ is rope.Rope,
+                                 length >= rope.ROPE_MIN)
+
+    def test_join(self):
+        for length in LENGTHS:
+            with self.subTest(length=length):
+                parts = pieces(length)
+                self.assertActsLike(rope.join(parts), ''.join(parts))
+                # with a rope among the parts
+                head = rope.concat('x' * rope.ROPE_MIN, 'y')
+                self.assertActsLike(rope.join([head] + parts),
+                                    'x' * rope.ROPE_MIN + 'y' + ''.join(parts))
+
+    def test_branches(self):
+        # two strings extended from the same rope keep their own text
+        base = rope.concat('x' * rope.ROPE_MIN, 'y')
+        first = rope.concat(base, 'a')
+        second = rope.concat(base, 'b')
+        self.assertActsLike(base, 'x' * rope.ROPE_MIN + 'y')
+        self.assertActsLike(first, 'x' * rope.ROPE_MIN + 'ya')
+        self.assertActsLike(second, 'x' * rope.ROPE_MIN + 'yb')
+        self.assertActsLike(rope.concat(first, second),
+                            'x' * rope.ROPE_MIN + 'ya' +
+                            'x' * rope.ROPE_MIN + 'yb')
+
+
+if __name__ == '__main__':
+    unittest.main()